@@ -0,0 +1,237 @@
+"""Benchmark of reading, writing and looking up elements of NPF files.
+
+Runs on synthetic cases of increasing size (see psr.npf.generate_case) and
+reports throughput in records/s and MB/s, plus the time taken by each
+section while reading.
+
+Usage:
+    python benchmark.py [--sizes 1000 10000 100000] [--repeat 3]
+                        [--baseline FILE [--save-baseline]]
+                        [--threshold 0.2]
+
+With --baseline, the results are compared with those stored in FILE and
+the script exits with status 1 if any throughput fell by more than the
+threshold (a fraction of the baseline value). With --save-baseline the
+results are stored in FILE instead.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import psr.npf
+
+
+# Throughput metrics compared against the baseline.
+_THROUGHPUT_METRICS = ("records_per_s", "mb_per_s", "lookups_per_s")
+
+# Benchmarks faster than this (seconds) in the baseline are too noisy to be
+# compared.
+_MIN_SECONDS = 0.01
+
+
+def _best_time(function, repeat):
+    """Smallest wall time of repeated calls of function."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _record_count(data):
+    return sum(len(getattr(data, collection))
+               for collection in data.COLLECTIONS)
+
+
+def _throughput(seconds, records, size_bytes=None):
+    result = {"seconds": seconds,
+              "records_per_s": records / seconds if seconds > 0 else 0.0}
+    if size_bytes is not None:
+        result["mb_per_s"] = size_bytes / 1e6 / seconds \
+            if seconds > 0 else 0.0
+    return result
+
+
+def _section_timings(file_path):
+    """Time of reading each section, in file order.
+
+    The file is loaded lazily and its sections are parsed one at a time,
+    in the order they appear, so each timing covers the parsing of one
+    section and the lookups of the elements it refers to.
+    """
+    data = psr.npf.NpFile.from_file(file_path, lazy=True)
+    chunks = sorted((offset, collection)
+                    for collection, offset, _ in data._lazy.chunks())
+    timings = {}
+    for _, collection in chunks:
+        if collection in timings:
+            continue
+        start = time.perf_counter()
+        records = len(getattr(data, collection))
+        timings[collection] = _throughput(time.perf_counter() - start,
+                                          records)
+    return timings
+
+
+def _lookup_timings(data, repeat):
+    """Time of looking up every bus, line and transformer by its key."""
+    lookups = {
+        "find_bus": [(bus.number,) for bus in data.buses],
+        "find_line": [(line.from_bus.number, line.to_bus.number,
+                       line.parallel_circuit_number)
+                      for line in data.lines],
+        "find_transformer": [(transformer.from_bus.number,
+                              transformer.to_bus.number,
+                              transformer.parallel_circuit_number)
+                             for transformer in data.transformers],
+    }
+    timings = {}
+    for name, keys in lookups.items():
+        if len(keys) == 0:
+            continue
+
+        def run():
+            # Fresh indexes, so that building them is part of the timing.
+            data._indexes.clear()
+            find = getattr(data, name)
+            for key in keys:
+                find(*key)
+        seconds = _best_time(run, repeat)
+        timings[name] = {"seconds": seconds,
+                         "lookups_per_s": len(keys) / seconds}
+    return timings
+
+
+def run_benchmarks(sizes, repeat, seed=0):
+    """Run every benchmark on cases of the given numbers of buses."""
+    results = {}
+    directory = tempfile.mkdtemp()
+    try:
+        for size in sizes:
+            data = psr.npf.generate_case(seed, size)
+            records = _record_count(data)
+            file_path = os.path.join(directory, "case{}.npf".format(size))
+            data.save(file_path)
+            size_bytes = os.path.getsize(file_path)
+            case = {"records": records, "bytes": size_bytes}
+            case["read"] = _throughput(
+                _best_time(lambda: psr.npf.NpFile.from_file(file_path),
+                           repeat), records, size_bytes)
+            case["write"] = _throughput(
+                _best_time(lambda: data.save(file_path), repeat), records,
+                size_bytes)
+            case["str"] = _throughput(
+                _best_time(lambda: str(data), repeat), records, size_bytes)
+            case["sections"] = _section_timings(file_path)
+            case["lookups"] = _lookup_timings(data, repeat)
+            results[str(size)] = case
+            os.remove(file_path)
+    finally:
+        os.rmdir(directory)
+    return results
+
+
+def _flatten(results, prefix=""):
+    """Map of metric path (e.g. "10000/read/records_per_s") to value."""
+    values = {}
+    for key, value in results.items():
+        path = prefix + key
+        if isinstance(value, dict):
+            values.update(_flatten(value, path + "/"))
+        else:
+            values[path] = value
+    return values
+
+
+def find_regressions(results, baseline, threshold):
+    """Throughput metrics that fell below (1 - threshold) times their
+    baseline value, as (path, baseline, current) tuples."""
+    current = _flatten(results)
+    reference_values = _flatten(baseline)
+    regressions = []
+    for path, reference in sorted(reference_values.items()):
+        if not path.endswith(_THROUGHPUT_METRICS) or path not in current:
+            continue
+        seconds_path = path.rsplit("/", 1)[0] + "/seconds"
+        if reference_values.get(seconds_path, 0.0) < _MIN_SECONDS:
+            continue
+        if current[path] < reference * (1.0 - threshold):
+            regressions.append((path, reference, current[path]))
+    return regressions
+
+
+def print_report(results, stream=sys.stdout):
+    for size, case in results.items():
+        stream.write("{} buses: {} records, {:.1f} MB\n".format(
+            size, case["records"], case["bytes"] / 1e6))
+        for operation in ("read", "write", "str"):
+            timing = case[operation]
+            stream.write("  {:<32s}{:9.3f} s {:12.0f} records/s "
+                         "{:8.1f} MB/s\n".format(operation,
+                                                 timing["seconds"],
+                                                 timing["records_per_s"],
+                                                 timing["mb_per_s"]))
+        for name, timing in case["lookups"].items():
+            stream.write("  {:<32s}{:9.3f} s {:12.0f} lookups/s\n".format(
+                name, timing["seconds"], timing["lookups_per_s"]))
+        for collection, timing in case["sections"].items():
+            stream.write("  read {:<27s}{:9.3f} s {:12.0f} records/s\n"
+                         .format(collection, timing["seconds"],
+                                 timing["records_per_s"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark reading, writing and lookups of NPF files.")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000],
+                        help="numbers of buses of the benchmark cases")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs of each benchmark, the best is kept")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the synthetic cases")
+    parser.add_argument("--baseline",
+                        help="JSON file with the baseline results")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="largest accepted throughput loss, as a "
+                             "fraction of the baseline")
+    parser.add_argument("--output", help="JSON file to store the results")
+    args = parser.parse_args(argv)
+    if args.save_baseline and args.baseline is None:
+        parser.error("--save-baseline requires --baseline FILE")
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print("Baseline saved to {}".format(args.baseline))
+        return 0
+    with open(args.baseline, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = find_regressions(results, baseline, args.threshold)
+    for path, reference, current in regressions:
+        print("REGRESSION {}: {:.1f} -> {:.1f} ({:+.1%})".format(
+            path, reference, current, current / reference - 1.0))
+    if len(regressions) > 0:
+        return 1
+    print("No regressions beyond {:.0%} of the baseline."
+          .format(args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
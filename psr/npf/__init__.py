@@ -1 +1,13 @@
 from .rev1 import *
+from .cache import SnapshotCache
+from .stats import NpfStats
+from .aio import AsyncPool
+
+
+def __getattr__(name):
+    # generate_case needs NumPy, which is optional: import it on first use.
+    if name == "generate_case":
+        from .synthetic import generate_case
+        return generate_case
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
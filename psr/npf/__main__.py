@@ -0,0 +1,338 @@
+"""Batch conversion, validation and statistics of NPF files.
+
+Usage:
+    python -m psr.npf convert PATH [PATH ...] --output DIR
+                                  [--to {npf,gz,bz2,xz,ipc,parquet}]
+    python -m psr.npf validate PATH [PATH ...]
+    python -m psr.npf stats PATH [PATH ...] [--json FILE]
+
+Directories are searched recursively for NPF files (see --pattern). Files
+are processed by a pool of --workers processes; a file that fails is
+reported and the others are still processed. The exit status is 1 if any
+file failed.
+"""
+import argparse
+import collections
+import concurrent.futures
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from .rev1 import NpFile, NpfException, _COLLECTION_TYPES, _COMPRESSIONS
+
+
+# File name patterns of the NPF files searched in directories.
+DEFAULT_PATTERNS = ("*.npf", "*.npf.gz", "*.npf.bz2", "*.npf.xz")
+
+# Output formats of convert and the extension of their files. ipc and
+# parquet outputs are directories of section files (see NpFile.save_arrow).
+_TARGET_EXTENSIONS = {
+    "npf": "",
+    "gz": ".gz",
+    "bz2": ".bz2",
+    "xz": ".xz",
+    "ipc": "",
+    "parquet": "",
+}
+
+
+def find_files(paths, patterns=DEFAULT_PATTERNS):
+    # type: (list, tuple) -> list
+    """(path, path relative to its input) of every file given or found in
+    the given directories, in name order."""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append((path, os.path.basename(path)))
+            continue
+        for directory, subdirectories, names in os.walk(path):
+            subdirectories.sort()
+            for name in sorted(names):
+                if any(fnmatch.fnmatch(name.lower(), pattern)
+                       for pattern in patterns):
+                    file_path = os.path.join(directory, name)
+                    files.append((file_path,
+                                  os.path.relpath(file_path, path)))
+    return files
+
+
+def target_path(output, relative_path, target_format):
+    # type: (str, str, str) -> str
+    """Path of the converted file of an input."""
+    name = relative_path
+    for _, extension, _ in _COMPRESSIONS:
+        if name.lower().endswith(extension):
+            name = name[:-len(extension)]
+            break
+    if target_format in ("ipc", "parquet"):
+        root, extension = os.path.splitext(name)
+        if extension.lower() == ".npf":
+            name = root
+    return os.path.join(output, name + _TARGET_EXTENSIONS[target_format])
+
+
+def _result(file_path, start, data=None, error=None):
+    # type: (str, float, NpFile, str) -> dict
+    return {"path": file_path,
+            "ok": error is None,
+            "error": error,
+            "seconds": time.perf_counter() - start,
+            "records": 0 if data is None else data._record_count(),
+            "bytes": os.path.getsize(file_path)
+            if os.path.isfile(file_path) else 0}
+
+
+def convert_file(file_path, target, target_format, deferred=False):
+    # type: (str, str, str, bool) -> dict
+    """Read a file and write it in another format."""
+    start = time.perf_counter()
+    try:
+        if os.path.abspath(target) == os.path.abspath(file_path):
+            raise NpfException("Output would overwrite the input")
+        data = NpFile.from_file(file_path, deferred=deferred)
+        directory = os.path.dirname(target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if target_format in ("ipc", "parquet"):
+            data.save_arrow(target, target_format)
+        else:
+            data.save(target)
+    except Exception as exception:
+        return _result(file_path, start, error=_message(exception))
+    return _result(file_path, start, data)
+
+
+def _duplicates(elements, key_function):
+    # type: (list, callable) -> list
+    counts = collections.Counter(key_function(element)
+                                 for element in elements)
+    return sorted(key for key, count in counts.items() if count > 1)
+
+
+def validate_file(file_path, deferred=False):
+    # type: (str, bool) -> dict
+    """Read a file and check that its element keys are unique."""
+    start = time.perf_counter()
+    try:
+        data = NpFile.from_file(file_path, deferred=deferred)
+        problems = []
+        checks = (
+            ("bus numbers", data.buses + data.middlepoint_buses,
+             lambda bus: bus.number),
+            ("DC bus numbers", data.dcbuses, lambda bus: bus.number),
+            ("line circuits", data.lines,
+             lambda line: (line.from_bus_number(), line.to_bus_number(),
+                           line.parallel_circuit_number)),
+            ("transformer circuits",
+             data.transformers + data.equivalent_transformers,
+             lambda transformer: (transformer.from_bus_number(),
+                                  transformer.to_bus_number(),
+                                  transformer.parallel_circuit_number)),
+        )
+        for description, elements, key_function in checks:
+            duplicates = _duplicates(elements, key_function)
+            if len(duplicates) > 0:
+                problems.append("duplicate {}: {}".format(
+                    description, ", ".join(str(key)
+                                           for key in duplicates[:10])))
+        if len(problems) > 0:
+            return _result(file_path, start, data, "; ".join(problems))
+    except Exception as exception:
+        return _result(file_path, start, error=_message(exception))
+    return _result(file_path, start, data)
+
+
+def stats_file(file_path, deferred=False):
+    # type: (str, bool) -> dict
+    """Read a file and count the records of each section."""
+    start = time.perf_counter()
+    try:
+        data = NpFile.from_file(file_path, deferred=deferred)
+    except Exception as exception:
+        return _result(file_path, start, error=_message(exception))
+    result = _result(file_path, start, data)
+    result["sections"] = {
+        element_class.header: len(getattr(data, collection))
+        for collection, element_class in _COLLECTION_TYPES.items()
+        if len(getattr(data, collection)) > 0}
+    return result
+
+
+def _message(exception):
+    # type: (BaseException) -> str
+    # On one line, to fit the progress output.
+    return "{}: {}".format(type(exception).__name__,
+                           " ".join(str(exception).split()))
+
+
+def _failure(file_path, exception):
+    # type: (str, BaseException) -> dict
+    return {"path": file_path, "ok": False, "error": _message(exception),
+            "seconds": 0.0, "records": 0, "bytes": 0}
+
+
+def run(function, jobs, workers=None, progress=None):
+    # type: (callable, list, int, object) -> list
+    """Call function with the arguments of each job in a process pool.
+
+    Results are returned in job order. When a process dies, the pool is
+    started again for the jobs left unfinished; a job left unfinished by
+    two dead pools is then run alone, and reported as failed if its
+    process dies too. progress, if given, is called with the number of
+    jobs done, the number of jobs and the result of each job as it
+    completes.
+    """
+    results = [None] * len(jobs)
+    done = 0
+    if workers == 1:
+        for index, job in enumerate(jobs):
+            results[index] = function(*job)
+            done += 1
+            if progress is not None:
+                progress(done, len(jobs), results[index])
+        return results
+    pending = list(range(len(jobs)))
+    # Number of dead pools that left each job unfinished.
+    breaks = [0] * len(jobs)
+    while pending:
+        suspects = [index for index in pending if breaks[index] > 1]
+        batch = suspects[:1] or pending
+        unfinished = []
+        with concurrent.futures.ProcessPoolExecutor(
+                1 if suspects else workers) as executor:
+            futures = {executor.submit(function, *jobs[index]): index
+                       for index in batch}
+            for future in concurrent.futures.as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool as exception:
+                    if not suspects:
+                        breaks[index] += 1
+                        unfinished.append(index)
+                        continue
+                    result = _failure(jobs[index][0], exception)
+                except Exception as exception:
+                    result = _failure(jobs[index][0], exception)
+                results[index] = result
+                done += 1
+                if progress is not None:
+                    progress(done, len(jobs), result)
+        pending = sorted(set(pending).difference(batch).union(unfinished))
+    return results
+
+
+def _progress_printer(stream):
+    def progress(done, total, result):
+        width = len(str(total))
+        if result["ok"]:
+            stream.write("[{:{}d}/{}] ok     {} ({:.2f} s)\n".format(
+                done, width, total, result["path"], result["seconds"]))
+        else:
+            stream.write("[{:{}d}/{}] FAILED {}: {}\n".format(
+                done, width, total, result["path"], result["error"]))
+        stream.flush()
+    return progress
+
+
+def summary(results, seconds):
+    # type: (list, float) -> str
+    failed = sum(1 for result in results if not result["ok"])
+    records = sum(result["records"] for result in results)
+    size = sum(result["bytes"] for result in results if result["ok"])
+    rate = (lambda value: value / seconds) if seconds > 0 \
+        else (lambda value: 0.0)
+    return "{} files ({} ok, {} failed) in {:.2f} s: {:.1f} files/s, " \
+           "{:.0f} records/s, {:.1f} MB/s".format(
+               len(results), len(results) - failed, failed, seconds,
+               rate(len(results)), rate(records), rate(size / 1e6))
+
+
+def _section_totals(results):
+    # type: (list) -> dict
+    totals = collections.OrderedDict()
+    for result in results:
+        for header, count in result.get("sections", {}).items():
+            totals[header] = totals.get(header, 0) + count
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m psr.npf",
+        description="Convert, validate or summarize NPF files.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("paths", nargs="+", metavar="PATH",
+                        help="NPF files, or directories searched for them")
+    common.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: number "
+                             "of CPUs)")
+    common.add_argument("--pattern", action="append", default=None,
+                        help="file name pattern searched in directories, "
+                             "may be repeated (default: {})".format(
+                                 " ".join(DEFAULT_PATTERNS)))
+    common.add_argument("--deferred", action="store_true",
+                        help="resolve references after reading every "
+                             "section, for files whose sections are not "
+                             "in the usual order")
+    common.add_argument("--quiet", action="store_true",
+                        help="only print failures and the summary")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    convert = subparsers.add_parser(
+        "convert", parents=[common],
+        help="re-save files, compressed or as Arrow/Parquet sections")
+    convert.add_argument("--output", "-o", required=True,
+                         help="output directory; the structure of input "
+                              "directories is kept")
+    convert.add_argument("--to", choices=sorted(_TARGET_EXTENSIONS),
+                         default="npf", help="output format")
+    subparsers.add_parser("validate", parents=[common],
+                          help="check that files load and that element "
+                               "keys are unique")
+    stats = subparsers.add_parser(
+        "stats", parents=[common], help="count the records of each section")
+    stats.add_argument("--json", help="file to store the counts of each "
+                                      "file as JSON")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    patterns = tuple(pattern.lower() for pattern in args.pattern) \
+        if args.pattern else DEFAULT_PATTERNS
+    files = find_files(args.paths, patterns)
+    if args.command == "convert":
+        function = convert_file
+        jobs = [(file_path, target_path(args.output, relative_path, args.to),
+                 args.to, args.deferred)
+                for file_path, relative_path in files]
+    else:
+        function = validate_file if args.command == "validate" \
+            else stats_file
+        jobs = [(file_path, args.deferred) for file_path, _ in files]
+
+    printer = _progress_printer(sys.stderr)
+
+    def progress(done, total, result):
+        if not args.quiet or not result["ok"]:
+            printer(done, total, result)
+
+    start = time.perf_counter()
+    results = run(function, jobs, args.workers, progress)
+    seconds = time.perf_counter() - start
+
+    if args.command == "stats":
+        for header, count in _section_totals(results).items():
+            print("{:<32s}{:12d}".format(header, count))
+        if args.json:
+            with open(args.json, "w") as output:
+                json.dump(results, output, indent=2)
+    print(summary(results, seconds))
+    return 0 if all(result["ok"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Reading and writing NPF files from asyncio code."""
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import weakref
+from typing import Optional
+
+from .rev1 import NpFile, NpfException
+from .stats import NpfStats
+
+
+# Default number of worker processes of an AsyncPool.
+DEFAULT_WORKERS = 4
+# Default maximum number of files an AsyncPool loads or saves at once.
+DEFAULT_MAX_LOADS = 2
+
+
+class AsyncPool(object):
+    """Runs NPF file loads and saves off the asyncio event loop.
+
+    Files are parsed by a pool of workers processes, as NpFile.from_file
+    does with workers > 1, so the parse does not hold the interpreter lock
+    of the event loop thread. Reading the chunks back and linking the
+    references, and formatting and writing saved files, run in a thread
+    each. At most max_loads loads and saves run at once; further ones wait
+    for one of them to finish without taking a thread, which bounds the
+    memory held by files being parsed or formatted.
+
+    Compressed and lazily loaded files, which from_file does not parse in
+    processes, are parsed in the thread.
+
+    The elements of an NpFile being saved must not be modified until
+    asave returns.
+    """
+    def __init__(self, workers=DEFAULT_WORKERS, max_loads=DEFAULT_MAX_LOADS):
+        # type: (int, int) -> None
+        if workers < 1 or max_loads < 1:
+            raise NpfException("AsyncPool needs at least one worker and "
+                               "one concurrent load")
+        self.workers = workers
+        self.max_loads = max_loads
+        self._executor = None
+        self._threads = None
+        self._lock = threading.Lock()
+        # Semaphores limiting the concurrent loads, by event loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_executor(self):
+        # type: () -> concurrent.futures.ProcessPoolExecutor
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    self.workers)
+            return self._executor
+
+    def _get_threads(self):
+        # type: () -> concurrent.futures.ThreadPoolExecutor
+        with self._lock:
+            if self._threads is None:
+                self._threads = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_loads, thread_name_prefix="npf")
+            return self._threads
+
+    def _semaphore(self, loop):
+        # type: (asyncio.AbstractEventLoop) -> asyncio.Semaphore
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_loads)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+    async def load(self, file_path, **options):
+        # type: (str, ...) -> NpFile
+        """Read an NPF file, with the options of NpFile.from_file.
+
+        The file is parsed by the worker processes of the pool unless
+        workers is given.
+        """
+        loop = asyncio.get_running_loop()
+        if "workers" not in options:
+            options["workers"] = self._get_executor()
+        async with self._semaphore(loop):
+            return await loop.run_in_executor(
+                self._get_threads(),
+                functools.partial(NpFile.from_file, file_path, **options))
+
+    async def save(self, data, file_path, stats=None):
+        # type: (NpFile, str, Optional[NpfStats]) -> None
+        """Write an NpFile, as NpFile.save does."""
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(loop):
+            await loop.run_in_executor(
+                self._get_threads(),
+                functools.partial(data.save, file_path, stats))
+
+    def shutdown(self, wait=True):
+        # type: (bool) -> None
+        """Stop the worker processes and threads. The pool can still be
+        used afterwards, starting new ones."""
+        with self._lock:
+            executors = (self._executor, self._threads)
+            self._executor = None
+            self._threads = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    # type: () -> AsyncPool
+    """The pool used by NpFile.aload and NpFile.asave when none is given."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = AsyncPool()
+        return _default_pool
@@ -0,0 +1,195 @@
+"""NPF data stored as Arrow IPC or Parquet files.
+
+Requires PyArrow and NumPy. A case is a directory with one file per section,
+named after its collection (e.g. buses.arrow), holding the table of
+psr.npf.frames.to_arrow. The file revision and description are stored in
+the schema metadata of every section file.
+
+Arrow IPC files are memory-mapped when read, so numeric columns of columnar
+tables are views of the file until they are written to.
+"""
+import os
+import tempfile
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet
+
+from .columnar import COLUMNAR_SECTIONS
+from .frames import _build_records, _build_table, _read_header, to_arrow
+from .rev1 import NpFile, NpfException, _COLLECTION_TYPES
+
+
+# File extension of the section files of each format.
+FORMATS = {
+    "ipc": ".arrow",
+    "parquet": ".parquet",
+}
+
+def _write_table(table, path, file_format, compression):
+    # type: (pa.Table, str, str, Optional[str]) -> None
+    # Written to a temporary file first: replacing the file keeps readers
+    # that memory-mapped the previous one valid.
+    handle, temp_path = tempfile.mkstemp(suffix=".tmp",
+                                         dir=os.path.dirname(path))
+    os.close(handle)
+    try:
+        if file_format == "ipc":
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            with pa.OSFile(temp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema,
+                                     options=options) as writer:
+                    writer.write_table(table)
+        else:
+            pa.parquet.write_table(table, temp_path,
+                                   compression=compression or "snappy")
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def save(data, directory, file_format="ipc", compression=None):
+    # type: (NpFile, str, str, Optional[str]) -> None
+    """Write every section of an NpFile to a directory.
+
+    compression is a codec supported by the format ("lz4" or "zstd" for
+    IPC, also "snappy" (the default) or "gzip" for Parquet). Compressed
+    IPC files are not read in place. Section files of a previous save to
+    the directory, in any format, are replaced or removed; other files
+    are left alone.
+    """
+    extension = FORMATS.get(file_format)
+    if extension is None:
+        raise NpfException("Unknown format {}".format(file_format))
+    os.makedirs(directory, exist_ok=True)
+    written = set()
+    for collection, table in to_arrow(data).items():
+        path = os.path.join(directory, collection + extension)
+        _write_table(table, path, file_format, compression)
+        written.add(path)
+    # Stale sections would be loaded with the new ones.
+    for section_extension in FORMATS.values():
+        for collection in _COLLECTION_TYPES:
+            path = os.path.join(directory, collection + section_extension)
+            if path not in written and os.path.exists(path):
+                os.remove(path)
+
+
+def _section_paths(directory, file_format):
+    # type: (str, Optional[str]) -> dict
+    """Path of the file of each section found in a directory."""
+    if not os.path.isdir(directory):
+        raise NpfException("Could not find directory {}".format(directory))
+    formats = [file_format] if file_format is not None else list(FORMATS)
+    found = {}
+    for name in formats:
+        extension = FORMATS.get(name)
+        if extension is None:
+            raise NpfException("Unknown format {}".format(name))
+        paths = {}
+        for collection in _COLLECTION_TYPES:
+            path = os.path.join(directory, collection + extension)
+            if os.path.exists(path):
+                paths[collection] = (path, name)
+        if len(paths) > 0:
+            found[name] = paths
+    if len(found) > 1:
+        raise NpfException("Directory {} holds sections in several formats"
+                           .format(directory))
+    if len(found) == 0:
+        raise NpfException("Could not find NPF sections in {}"
+                           .format(directory))
+    return found.popitem()[1]
+
+
+def _read_table(path, file_format):
+    # type: (str, str) -> pa.Table
+    if file_format == "ipc":
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pa.parquet.read_table(path, memory_map=True)
+
+
+def _read_schema(path, file_format):
+    # type: (str, str) -> pa.Schema
+    if file_format == "ipc":
+        return pa.ipc.open_file(pa.memory_map(path, "r")).schema
+    return pa.parquet.read_schema(path, memory_map=True)
+
+
+class _ArrowSections(object):
+    """Section files of a directory that were not loaded yet.
+
+    Stands in for _SectionOffsets in NpFile objects loaded from Arrow
+    files: sections are read the first time their collection is accessed.
+    """
+    def __init__(self, paths, columnar):
+        # type: (dict, bool) -> None
+        self._paths = paths
+        self.tables = dict(COLUMNAR_SECTIONS) if columnar else {}
+        # String table of the interned fields, shared by the sections
+        # until the last one is read.
+        self._strings = {}
+
+    def collections(self):
+        # type: () -> list
+        return list(self._paths.keys())
+
+    def has_section(self, collection):
+        # type: (str) -> bool
+        return collection in self._paths
+
+    def read_header(self, data):
+        # type: (NpFile) -> None
+        path, file_format = next(iter(self._paths.values()))
+        revision, description = \
+            _read_header(_read_schema(path, file_format).metadata)
+        if revision is not None:
+            data.revision = revision
+        if description is not None:
+            data.description = description
+
+    def load(self, data, collection):
+        # type: (NpFile, str) -> None
+        """Read the section of a collection into the NpFile. The section
+        stays pending if reading it fails."""
+        entry = self._paths.get(collection)
+        if entry is None:
+            return
+        table = _read_table(*entry)
+        columns = {name: table.column(name).to_numpy()
+                   for name in table.column_names}
+        table_class = self.tables.get(collection)
+        if table_class is not None:
+            elements = _build_table(data, table_class, collection, columns)
+        else:
+            elements = _build_records(_COLLECTION_TYPES[collection],
+                                      collection, columns, data,
+                                      self._strings)
+        del self._paths[collection]
+        setattr(data, collection, elements)
+        if len(self._paths) == 0:
+            self._strings = {}
+
+
+def load(directory, columnar=False, lazy=True, file_format=None):
+    # type: (str, bool, bool, Optional[str]) -> NpFile
+    """Read an NpFile from the section files of a directory.
+
+    With lazy=True each section is read the first time its collection is
+    accessed. With columnar=True buses, lines and transformers are stored
+    as columnar tables.
+    """
+    sections = _ArrowSections(_section_paths(directory, file_format),
+                              columnar)
+    data = NpFile()
+    sections.read_header(data)
+    data._lazy = sections
+    for collection in sections.collections():
+        delattr(data, collection)
+    if not lazy:
+        for collection in NpFile.COLLECTIONS:
+            sections.load(data, collection)
+    return data
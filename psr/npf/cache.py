@@ -0,0 +1,202 @@
+"""Binary snapshots of parsed NPF files, used to speed up reloads."""
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Optional
+
+
+# Default maximum size (bytes) of a cache directory.
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Name of the default cache directory, in the user cache directory.
+_DEFAULT_DIRECTORY_NAME = "psr-npf"
+
+# Extension of snapshot files.
+SNAPSHOT_SUFFIX = ".npfcache"
+
+# Incremented when the layout of the cached objects changes.
+_FORMAT_VERSION = 2
+
+# Size of the blocks read while hashing source files.
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _content_hash(file_path):
+    # type: (str) -> str
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as source:
+        while True:
+            block = source.read(_HASH_BLOCK_SIZE)
+            if len(block) == 0:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_directory():
+    # type: () -> str
+    """Directory of the snapshots of a SnapshotCache created without one:
+    psr-npf in $XDG_CACHE_HOME, or in ~/.cache."""
+    root = os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, _DEFAULT_DIRECTORY_NAME)
+
+
+class SnapshotCache(object):
+    """Stores pickled snapshots of parsed files.
+
+    Snapshots are stored in a directory, default_directory() if none is
+    given, and the least recently used ones are evicted once the directory
+    grows beyond max_bytes.
+
+    With sidecar=True, the snapshot of a file is stored next to it instead,
+    with SNAPSHOT_SUFFIX appended to its name. There is no directory to
+    bound then: max_bytes only limits the size of each snapshot, and larger
+    ones are not stored.
+
+    A snapshot is valid while the path, size, modification time and
+    content hash of its source file are unchanged. Snapshots are pickles:
+    only use cache directories that are not writable by untrusted users.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES,
+                 sidecar=False):
+        # type: (Optional[str], int, bool) -> None
+        if sidecar and directory is not None:
+            raise ValueError("a sidecar cache has no directory")
+        if not sidecar and directory is None:
+            directory = default_directory()
+        self.directory = directory  # type: Optional[str]
+        self.max_bytes = max_bytes
+
+    def snapshot_path(self, file_path):
+        # type: (str) -> str
+        """Path of the snapshot of a source file."""
+        file_path = os.path.abspath(file_path)
+        if self.directory is None:
+            return file_path + SNAPSHOT_SUFFIX
+        name = hashlib.sha256(file_path.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + SNAPSHOT_SUFFIX)
+
+    @staticmethod
+    def source_key(file_path):
+        # type: (str) -> dict
+        """Key of the current state of a source file, which a snapshot must
+        match to be valid."""
+        status = os.stat(file_path)
+        return {"version": _FORMAT_VERSION,
+                "path": os.path.abspath(file_path),
+                "size": status.st_size,
+                "mtime": status.st_mtime_ns,
+                "hash": _content_hash(file_path)}
+
+    def load(self, file_path, key=None):
+        # type: (str, Optional[dict]) -> Optional[object]
+        """Return the cached object of a file, None if there is no valid
+        snapshot.
+
+        key is the source_key of the file, computed if not given.
+        """
+        snapshot_path = self.snapshot_path(file_path)
+        if not os.path.exists(snapshot_path):
+            return None
+        try:
+            with open(snapshot_path, "rb") as snapshot:
+                stored_key = pickle.load(snapshot)
+                if key is None:
+                    key = self.source_key(file_path)
+                if stored_key != key:
+                    return None
+                # Unpickling creates many small objects that cannot form
+                # cycles; garbage collection would only slow it down.
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    value = pickle.load(snapshot)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+                ImportError, TypeError, ValueError):
+            return None
+        if self.directory is not None:
+            # Mark as recently used.
+            os.utime(snapshot_path)
+        return value
+
+    def store(self, file_path, value, key=None):
+        # type: (str, object, Optional[dict]) -> None
+        """Store the snapshot of the object read from a file.
+
+        key is the source_key of the file taken before it was read. If the
+        file changed since, the snapshot does not match the new file and is
+        never used. Without it the key is taken now, which is only safe if
+        the file cannot have changed while it was read.
+        """
+        snapshot_path = self.snapshot_path(file_path)
+        directory = os.path.dirname(snapshot_path)
+        if self.directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        if key is None:
+            key = self.source_key(file_path)
+        handle, temp_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(handle, "wb") as snapshot:
+                pickle.dump(key, snapshot, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(value, snapshot, pickle.HIGHEST_PROTOCOL)
+            if self.directory is None and \
+                    os.path.getsize(temp_path) > self.max_bytes:
+                os.remove(temp_path)
+                return
+            os.replace(temp_path, snapshot_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        if self.directory is not None:
+            self.evict()
+
+    def evict(self):
+        # type: () -> None
+        """Remove the least recently used snapshots of the cache directory
+        until it fits in max_bytes."""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(SNAPSHOT_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime_ns, status.st_size, path))
+            total += status.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self, file_path=None):
+        # type: (Optional[str]) -> None
+        """Remove the snapshot of a file, or every snapshot of the cache
+        directory."""
+        if file_path is not None:
+            paths = [self.snapshot_path(file_path)]
+        elif self.directory is not None and os.path.isdir(self.directory):
+            paths = [os.path.join(self.directory, name)
+                     for name in os.listdir(self.directory)
+                     if name.endswith(SNAPSHOT_SUFFIX)]
+        else:
+            paths = []
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
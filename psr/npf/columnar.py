@@ -0,0 +1,435 @@
+"""Columnar (struct-of-arrays) storage of NpFile sections.
+
+Requires NumPy. Numeric fields are stored as one array per field, references
+to other elements as integer indexes into the referenced NpFile collections
+(see RecordTable.reference_fields) and the remaining fields as object
+arrays.
+"""
+import inspect
+
+import numpy as np
+
+from .rev1 import (Bus, Line, NpfException, Transformer, _KEY_FIELD_NAMES,
+                   _key_edited)
+
+
+# Initial number of rows allocated by an empty table.
+_INITIAL_CAPACITY = 16
+
+
+class RowView(object):
+    """A table row that behaves like the record it represents."""
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        # type: ("RecordTable", int) -> None
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_index", index)
+
+    def __getattr__(self, name):
+        return self._table._get(self._index, name, self)
+
+    def __setattr__(self, name, value):
+        self._table._set(self._index, name, value)
+        if name in _KEY_FIELD_NAMES:
+            _key_edited()
+
+    def __eq__(self, other):
+        return isinstance(other, RowView) and \
+            other._table is self._table and other._index == self._index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self._table), self._index))
+
+    def __str__(self):
+        return self._table.record_class.__str__(self)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __reduce__(self):
+        return RowView, (self._table, self._index)
+
+    def __copy__(self):
+        return self.to_record()
+
+    def to_record(self):
+        # type: () -> "RecordType"
+        """Return a standalone record with the values of this row."""
+        record = self._table.record_class()
+        for name in self._table.record_class.field_names():
+            setattr(record, name, self._table._get(self._index, name, self))
+        return record
+
+
+class RecordTable(object):
+    """Struct-of-arrays storage of the records of one NpFile section.
+
+    Rows are accessed as RowView objects and whole columns as attributes of
+    the table, e.g. ``data.buses.kvbase``, which returns a NumPy array view
+    without copying. Rows can be appended or replaced, but not removed,
+    since other tables hold their positions as references.
+    """
+    record_class = None
+    # Numeric fields and their array types.
+    numeric_fields = {}
+    # Reference fields and the NpFile collections they point into: positions
+    # 0, 1, ... are elements of the first collection, -2, -3, ... elements
+    # of the second one, if any, and -1 is no reference.
+    reference_fields = {}
+
+    def __init__(self, data, capacity=_INITIAL_CAPACITY):
+        # type: ("NpFile", int) -> None
+        self._data = data
+        self._size = 0
+        # Incremented when rows are replaced, but not on appends, see
+        # _RecordList.
+        self._version = 0
+        self._positions = {}
+        self._columns = {}
+        capacity = max(capacity, 1)
+        for name in self.record_class.field_names():
+            self._columns[name] = np.empty(capacity,
+                                           dtype=self._dtype(name))
+
+    @classmethod
+    def _dtype(cls, name):
+        # type: (str) -> np.dtype
+        if name in cls.numeric_fields:
+            return cls.numeric_fields[name]
+        elif name in cls.reference_fields:
+            return np.intp
+        return object
+
+    @classmethod
+    def from_records(cls, data, records):
+        # type: ("NpFile", list) -> "RecordTable"
+        """Build a table from a list of records."""
+        table = cls(data, len(records))
+        for name in cls.record_class.field_names():
+            values = [getattr(record, name) for record in records]
+            if name in cls.reference_fields:
+                values = table._positions_of(name, values)
+            table._columns[name][:len(records)] = values
+        table._size = len(records)
+        return table
+
+    @classmethod
+    def from_columns(cls, data, columns):
+        # type: ("NpFile", dict) -> "RecordTable"
+        """Build a table on arrays of every field, references given as
+        positions. Arrays are used without copying."""
+        sizes = set(len(columns[name])
+                    for name in cls.record_class.field_names())
+        if len(sizes) != 1:
+            raise NpfException("Columns of a {} table differ in length"
+                               .format(cls.record_class.__name__))
+        table = cls(data, 1)
+        for name in cls.record_class.field_names():
+            table._columns[name] = np.asarray(columns[name],
+                                              dtype=cls._dtype(name))
+        table._size = sizes.pop()
+        return table
+
+    def _collection(self, name, which=0):
+        # type: (str, int) -> list
+        return getattr(self._data, self.reference_fields[name][which])
+
+    def _element(self, name, position):
+        # type: (str, int) -> Optional["RecordType"]
+        """Element referenced by a position of a reference column."""
+        if position >= 0:
+            return self._collection(name)[position]
+        elif position == -1:
+            return None
+        return self._collection(name, 1)[-2 - position]
+
+    def _position_map(self, collection_name):
+        # type: (str) -> dict
+        """Position of each element of a collection, by id."""
+        collection = getattr(self._data, collection_name)
+        if isinstance(collection, RecordTable):
+            return {}
+        cached = self._positions.get(collection_name)
+        if cached is None or cached[0] is not collection or \
+                cached[1] != collection._version or \
+                cached[2] != len(collection):
+            position_map = {id(element): position
+                            for position, element in enumerate(collection)}
+            cached = (collection, collection._version, len(collection),
+                      position_map)
+            self._positions[collection_name] = cached
+        return cached[3]
+
+    def _positions_of(self, name, elements):
+        # type: (str, list) -> list
+        collections = self.reference_fields[name]
+        tables = [getattr(self._data, collection)
+                  for collection in collections]
+        position_maps = [self._position_map(collection)
+                         for collection in collections]
+        positions = []
+        for element in elements:
+            if element is None:
+                positions.append(-1)
+                continue
+            for which, (table, position_map) in enumerate(
+                    zip(tables, position_maps)):
+                if isinstance(element, RowView) and element._table is table:
+                    position = element._index
+                else:
+                    position = position_map.get(id(element))
+                    if position is None:
+                        continue
+                positions.append(position if which == 0 else -2 - position)
+                break
+            else:
+                raise NpfException("{} {} is not in the NpFile {}".format(
+                    name, element.number, " or ".join(collections)))
+        return positions
+
+    def _get(self, index, name, row):
+        # type: (int, str, RowView) -> object
+        column = self._columns.get(name)
+        if column is None:
+            value = inspect.getattr_static(self.record_class, name)
+            if hasattr(value, "__get__"):
+                return value.__get__(row, self.record_class)
+            return value
+        value = column[index]
+        if name in self.reference_fields:
+            return self._element(name, value)
+        elif name in self.numeric_fields:
+            return value.item()
+        return value
+
+    def _set(self, index, name, value):
+        # type: (int, str, object) -> None
+        if name not in self._columns:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                self.record_class.__name__, name))
+        if name in self.reference_fields:
+            value = self._positions_of(name, [value])[0]
+        column = self._columns[name]
+        if not column.flags.writeable:
+            # Columns built on memory-mapped files are read-only; they are
+            # copied on the first write.
+            column = column.copy()
+            self._columns[name] = column
+        column[index] = value
+
+    def _reserve(self, capacity):
+        # type: (int) -> None
+        current = len(self._columns["tag"])
+        if capacity <= current:
+            return
+        capacity = max(capacity, current * 2)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("_columns")
+        if columns is None or name not in columns:
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name))
+        return columns[name][:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield RowView(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RowView(self, i)
+                    for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if index < 0 or index >= self._size:
+            raise IndexError("table index out of range")
+        return RowView(self, index)
+
+    def _store(self, index, record):
+        # type: (int, "RecordType") -> None
+        for name in self.record_class.field_names():
+            self._set(index, name, getattr(record, name))
+
+    def __setitem__(self, index, record):
+        self._store(self[index]._index, record)
+        self._version += 1
+
+    def append(self, record):
+        # type: ("RecordType") -> None
+        self._reserve(self._size + 1)
+        self._size += 1
+        try:
+            self._store(self._size - 1, record)
+        except Exception:
+            self._size -= 1
+            raise
+
+    def extend(self, records):
+        # type: (Iterable["RecordType"]) -> None
+        for record in records:
+            self.append(record)
+
+    def format_rows(self, start=0, stop=None):
+        # type: (int, Optional[int]) -> list
+        """Lines of rows start to stop in an NPF file.
+
+        Fields and the fields of referenced rows are gathered from the
+        columns a whole array at a time; other fields are read through
+        RowView objects.
+        """
+        start, stop, _ = slice(start, stop).indices(self._size)
+        formatter = self.record_class.row_formatter()
+        if formatter is None:
+            return [str(RowView(self, index))
+                    for index in range(start, stop)]
+        columns = []
+        for field, get, default in zip(formatter.fields, formatter.getters,
+                                       formatter.defaults):
+            path = () if callable(field) else tuple(field.split("."))
+            if len(path) == 1 and path[0] in self._columns:
+                values = self._columns[path[0]][start:stop].tolist()
+            elif len(path) == 2 and path[0] in self.reference_fields:
+                values = self._gather(path[0], path[1],
+                                      self._columns[path[0]][start:stop],
+                                      default)
+            else:
+                values = [get(RowView(self, index))
+                          for index in range(start, stop)]
+            columns.append(values)
+        return formatter.format_columns(columns)
+
+    def _gather(self, name, attribute, positions, default):
+        # type: (str, str, np.ndarray, object) -> list
+        """Values of an attribute of the elements referenced by positions
+        of a reference column, default for no reference."""
+        collection = self._collection(name)
+        if isinstance(collection, RecordTable) and \
+                attribute in collection._columns and \
+                attribute not in collection.reference_fields:
+            values = collection._columns[attribute][:len(collection)]
+            if len(values) == 0:
+                values = [default] * len(positions)
+            else:
+                values = values[np.maximum(positions, 0)].tolist()
+            for index in np.flatnonzero(positions < 0).tolist():
+                element = self._element(name, int(positions[index]))
+                values[index] = default if element is None \
+                    else getattr(element, attribute)
+            return values
+        values = []
+        for position in positions.tolist():
+            element = self._element(name, position)
+            values.append(default if element is None
+                          else getattr(element, attribute))
+        return values
+
+    def to_records(self):
+        # type: () -> list
+        """Return standalone records with the values of every row."""
+        return [row.to_record() for row in self]
+
+
+class BusTable(RecordTable):
+    record_class = Bus
+    numeric_fields = {
+        "number": np.int64, "kvbase": np.float64, "cost": np.float64,
+        "type": np.int64, "loadshed": np.int64, "volt": np.float64,
+        "angle": np.float64, "vmax": np.float64, "vmin": np.float64,
+        "evmax": np.float64, "evmin": np.float64, "stt": np.int64,
+    }
+    reference_fields = {
+        "area": ("areas",), "region": ("regions",), "system": ("systems",),
+    }
+
+
+class LineTable(RecordTable):
+    record_class = Line
+    numeric_fields = {
+        "parallel_circuit_number": np.int64, "number": np.int64,
+        "r_pct": np.float64, "x_pct": np.float64, "mvar": np.float64,
+        "normal_rating": np.float64, "emergency_rating": np.float64,
+        "power_factor": np.float64, "cost": np.float64,
+        "series_number": np.int64, "type": np.int64,
+        "env_factor": np.int64, "length_km": np.float64, "stt": np.int64,
+    }
+    reference_fields = {
+        "from_bus": ("buses", "middlepoint_buses"),
+        "to_bus": ("buses", "middlepoint_buses"),
+    }
+
+
+class TransformerTable(RecordTable):
+    record_class = Transformer
+    numeric_fields = {
+        "parallel_circuit_number": np.int64, "r_pct": np.float64,
+        "x_pct": np.float64, "tap_min": np.float64, "tap_max": np.float64,
+        "phase_min": np.float64, "phase_max": np.float64,
+        "control_type": np.int64, "tap_steps": np.int64,
+        "normal_rating": np.float64, "emergency_rating": np.float64,
+        "power_factor": np.float64, "cost": np.float64,
+        "series_number": np.int64, "env": np.int64, "stt": np.int64,
+        "tap": np.float64, "phase": np.float64, "minflow": np.float64,
+        "maxflow": np.float64, "emergency_minflow": np.float64,
+        "emergency_maxflow": np.float64,
+    }
+    reference_fields = {
+        "from_bus": ("buses", "middlepoint_buses"),
+        "to_bus": ("buses", "middlepoint_buses"),
+        "ctr_bus": ("buses", "middlepoint_buses"),
+    }
+
+
+# NpFile collection name and table class of the columnar sections, in the
+# order they have to be converted.
+COLUMNAR_SECTIONS = (
+    ("buses", BusTable),
+    ("lines", LineTable),
+    ("transformers", TransformerTable),
+)
+
+
+def _replace_references(records, replacements):
+    # type: (Iterable["RecordType"], dict) -> None
+    for record in records:
+        for name in record.field_names():
+            value = getattr(record, name, None)
+            if value is not None and id(value) in replacements:
+                setattr(record, name, replacements[id(value)])
+
+
+def to_columnar(data):
+    # type: ("NpFile") -> None
+    """Store buses, lines and transformers of an NpFile as tables.
+
+    References to the converted records held by the other sections are
+    replaced by the corresponding rows.
+    """
+    replacements = {}
+    for collection, table_class in COLUMNAR_SECTIONS:
+        records = getattr(data, collection)
+        if isinstance(records, RecordTable):
+            continue
+        _replace_references(records, replacements)
+        table = table_class.from_records(data, records)
+        setattr(data, collection, table)
+        for index, record in enumerate(records):
+            replacements[id(record)] = table[index]
+    if len(replacements) == 0:
+        return
+    for name in data.COLLECTIONS:
+        # Sections of lazily loaded files that were not parsed yet will
+        # refer to the rows when they are.
+        records = vars(data).get(name)
+        if records is not None and not isinstance(records, RecordTable):
+            _replace_references(records, replacements)
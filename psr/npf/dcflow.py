@@ -0,0 +1,218 @@
+"""DC power flow of NpFile data.
+
+Requires NumPy and SciPy. The susceptance matrix of the branches in service
+is factorized once, when a DcPowerFlow is created, and the factorization is
+reused by every solve, which takes one injection vector or a batch of them
+as the columns of a matrix. Buses are indexed as in psr.npf.network.
+"""
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+import scipy.sparse.linalg
+
+from .network import _BusRows, _column, _in_service, bus_numbers
+from .rev1 import MVABASE, NpfException
+
+
+def _concatenate(arrays, dtype):
+    # type: (list, type) -> np.ndarray
+    return np.concatenate(arrays) if len(arrays) > 0 \
+        else np.zeros(0, dtype=dtype)
+
+
+def _components(size, first, second):
+    # type: (int, np.ndarray, np.ndarray) -> tuple
+    """Number of connected components of a graph given by the ends of its
+    edges, and the component of each node."""
+    graph = scipy.sparse.coo_matrix(
+        (np.ones(len(first)), (first, second)), shape=(size, size))
+    return scipy.sparse.csgraph.connected_components(graph, directed=False)
+
+
+class DcPowerFlow(object):
+    """DC power flow of the network of an NpFile.
+
+    Branches are the lines, transformers and equivalent transformers in
+    service, with the susceptance 1 / (x * tap) and the phase shift of
+    their transformer at the from bus; resistances, charging and shunts
+    are neglected. Buses joined by branches without reactance (e.g.
+    breakers) are solved as one, and the flows of those branches are NaN.
+
+    Each island has a slack bus, which takes up the imbalance of its
+    injections and has angle 0: the buses given as slack, by number, or
+    else the first bus of the island.
+
+    The network is read when the object is created: later changes to the
+    NpFile are not seen, so create a new DcPowerFlow after changing it.
+    """
+    def __init__(self, data, slack=None, base_mva=MVABASE):
+        # type: ("NpFile", Optional[Union[int, Iterable[int]]], float) -> None
+        self.base_mva = base_mva
+        numbers = bus_numbers(data)
+        self._numbers = numbers
+        rows = _BusRows(numbers)
+        size = len(numbers)
+        # Matrix row of each bus, by bus number.
+        self.bus_index = {number: row
+                          for row, number in enumerate(numbers.tolist())}
+        # (collection, position) of each branch in service, in the order
+        # of the flows.
+        self.branches = []
+        from_rows = []
+        to_rows = []
+        reactances = []
+        shifts = []
+        for collection in ("lines", "transformers",
+                           "equivalent_transformers"):
+            elements = getattr(data, collection)
+            on = _in_service(elements)
+            if not on.any():
+                continue
+            self.branches.extend((collection, position)
+                                 for position in np.flatnonzero(on).tolist())
+            from_rows.append(rows(_column(elements,
+                                          "from_bus.number")[on], collection))
+            to_rows.append(rows(_column(elements, "to_bus.number")[on],
+                                collection))
+            reactance = _column(elements, "x_pct", np.float64)[on] / 100.0
+            if collection == "lines":
+                reactances.append(reactance)
+                shifts.append(np.zeros(len(reactance)))
+            else:
+                taps = _column(elements, "tap", np.float64)[on]
+                reactances.append(reactance * np.where(taps == 0, 1.0, taps))
+                shifts.append(np.deg2rad(_column(elements, "phase",
+                                                 np.float64)[on]))
+        self._from_rows = _concatenate(from_rows, np.intp)
+        self._to_rows = _concatenate(to_rows, np.intp)
+        reactances = _concatenate(reactances, np.float64)
+        self._shifts = _concatenate(shifts, np.float64)
+        zero = reactances == 0
+        if (zero & (self._shifts != 0)).any():
+            branch = int(np.flatnonzero(zero & (self._shifts != 0))[0])
+            raise NpfException(
+                "Phase shifter from bus #{} to bus #{} of {} has no "
+                "reactance".format(numbers[self._from_rows[branch]],
+                                   numbers[self._to_rows[branch]],
+                                   self.branches[branch][0]))
+        self._susceptances = np.full(len(reactances), np.nan)
+        self._susceptances[~zero] = 1.0 / reactances[~zero]
+
+        # Buses joined by branches without reactance share a node of the
+        # susceptance matrix.
+        node_count, self._nodes = _components(
+            size, self._from_rows[zero], self._to_rows[zero])
+        # Sums the injections of the buses of each node.
+        self._gather = scipy.sparse.csr_matrix(
+            (np.ones(size), (self._nodes, np.arange(size))),
+            shape=(node_count, size))
+        from_nodes = self._nodes[self._from_rows[~zero]]
+        to_nodes = self._nodes[self._to_rows[~zero]]
+        susceptances = self._susceptances[~zero]
+        # Parallel circuits are summed.
+        matrix = scipy.sparse.coo_matrix(
+            (np.concatenate((susceptances, -susceptances, -susceptances,
+                             susceptances)),
+             (np.concatenate((from_nodes, from_nodes, to_nodes, to_nodes)),
+              np.concatenate((from_nodes, to_nodes, from_nodes, to_nodes)))),
+            shape=(node_count, node_count)).tocsr()
+
+        self._slack_rows = self._slack(matrix, slack)
+        free = np.ones(node_count, dtype=bool)
+        free[self._nodes[self._slack_rows]] = False
+        self._free = np.flatnonzero(free)
+        self._factor = scipy.sparse.linalg.splu(
+            matrix[self._free][:, self._free].tocsc()) \
+            if len(self._free) > 0 else None
+
+        # Node injections (pu) equivalent to the phase shifts.
+        shift_flows = -susceptances * self._shifts[~zero]
+        self._shift_injections = \
+            np.bincount(from_nodes, shift_flows, node_count) - \
+            np.bincount(to_nodes, shift_flows, node_count)
+        # Base case injections (MW).
+        self.injections = np.zeros(size)
+        on = _column(data.generators, "units_on", np.int64) > 0
+        np.add.at(self.injections,
+                  rows(_column(data.generators, "bus.number")[on],
+                       "generators"),
+                  _column(data.generators, "pgen", np.float64)[on])
+        np.subtract.at(self.injections,
+                       rows(_column(data.demands, "bus.number"), "demands"),
+                       _column(data.demands, "p_mw", np.float64))
+
+    def _slack(self, matrix, slack):
+        # type: (scipy.sparse.csr_matrix, object) -> np.ndarray
+        """Bus rows of the slack bus of each island."""
+        _, node_islands = scipy.sparse.csgraph.connected_components(
+            matrix, directed=False)
+        islands = node_islands[self._nodes]
+        if slack is None:
+            slack = []
+        elif isinstance(slack, int):
+            slack = [slack]
+        chosen = {}
+        for number in slack:
+            row = self.bus_index.get(number)
+            if row is None:
+                raise NpfException("Could not find bus #{}".format(number))
+            island = int(islands[row])
+            if island in chosen:
+                raise NpfException("Buses #{} and #{} are slack buses of "
+                                   "the same island".format(
+                                       chosen[island][1], number))
+            chosen[island] = (row, number)
+        # First bus of each island.
+        _, first_rows = np.unique(islands, return_index=True)
+        slack_rows = [chosen[island][0] if island in chosen else int(row)
+                      for island, row in enumerate(first_rows.tolist())]
+        return np.array(slack_rows, dtype=np.intp)
+
+    @property
+    def slack_buses(self):
+        # type: () -> list
+        """Numbers of the slack buses, one per island."""
+        return self._numbers[self._slack_rows].tolist()
+
+    def solve(self, injections=None):
+        # type: (Optional[np.ndarray]) -> np.ndarray
+        """Bus voltage angles (radians) for injections (MW).
+
+        injections has one value per bus, in the order of bus_index, or one
+        column of them per case; the angles have the same shape. Without
+        injections, those of the file are used: the generation of the
+        generators with units on minus the demands.
+        """
+        if injections is None:
+            injections = self.injections
+        injections = np.asarray(injections, dtype=np.float64)
+        if injections.ndim not in (1, 2) or \
+                injections.shape[0] != len(self.bus_index):
+            raise NpfException("Expected {} injections per case, got shape "
+                               "{}".format(len(self.bus_index),
+                                           injections.shape))
+        shift_injections = self._shift_injections
+        if injections.ndim == 2:
+            shift_injections = shift_injections[:, np.newaxis]
+        right = self._gather.dot(injections) / self.base_mva - \
+            shift_injections
+        angles = np.zeros(right.shape)
+        if self._factor is not None:
+            angles[self._free] = self._factor.solve(
+                np.asfortranarray(right[self._free]))
+        return angles[self._nodes]
+
+    def flows(self, angles):
+        # type: (np.ndarray) -> np.ndarray
+        """Active power flows (MW) of the branches, from their from bus, in
+        the order of branches, for the angles of solve."""
+        angles = np.asarray(angles, dtype=np.float64)
+        susceptances = self._susceptances
+        shifts = self._shifts
+        if angles.ndim == 2:
+            susceptances = susceptances[:, np.newaxis]
+            shifts = shifts[:, np.newaxis]
+        return susceptances * self.base_mva * (
+            angles[self._from_rows] - angles[self._to_rows] - shifts)
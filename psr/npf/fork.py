@@ -0,0 +1,381 @@
+"""Copy-on-write forks of NpFile objects (see NpFile.fork).
+
+The sections of a fork are _ForkedList objects over the collections of its
+parent, handing out _ForkedRecord views of the parent elements. Elements
+are copied into the fork the first time they are written to.
+"""
+import copy
+from typing import Optional
+
+from .rev1 import (NpFile, Ownership, RecordType, _CLASS_COLLECTIONS,
+                   _COLLECTION_TYPES, _path_getter)
+
+
+def fork(data):
+    # type: (NpFile) -> NpFile
+    """A fork of an NpFile, see NpFile.fork."""
+    forked = NpFile()
+    forked.revision = data.revision
+    forked.description = data.description
+    forked.tag = data.tag
+    for collection in NpFile.COLLECTIONS:
+        setattr(forked, collection, _ForkedList(forked, data, collection))
+    return forked
+
+
+def _element_class(element):
+    # type: (object) -> type
+    """Record class of a record, columnar row or fork view."""
+    table = getattr(element, "_table", None)
+    return element.__class__ if table is None else table.record_class
+
+
+class _ForkedList(object):
+    """Collection of an NpFile fork, sharing the elements of its parent.
+
+    Elements are handed out as _ForkedRecord views, one per position of the
+    shared collection, created on first access. The first write to a view
+    copies its element, and the copy overrides the shared element in this
+    fork only, as do elements assigned to a position. Any other change
+    (appending, removing, sorting...) first copies the list itself, as a
+    list of views.
+    """
+    # Tells fork sections from other collections, see NpFile._is_fork.
+    forked = True
+
+    def __init__(self, fork, parent, collection):
+        # type: (NpFile, NpFile, str) -> None
+        self._fork = fork
+        self._parent = parent
+        self._collection = collection
+        # ownerships is the only collection that is not a file section.
+        self.element_class = _COLLECTION_TYPES.get(collection, Ownership)
+        self._shared = None
+        # Copies of the elements written to, by position in the shared
+        # collection.
+        self._overrides = {}
+        # Elements of the fork once the list itself was modified.
+        self._elements = None
+        # View of each position of the shared collection handed out.
+        self._views = {}
+        self._version = 0
+
+    def shared(self):
+        # type: () -> list
+        """The parent collection."""
+        if self._shared is None:
+            self._shared = getattr(self._parent, self._collection)
+        return self._shared
+
+    def unchanged(self):
+        # type: () -> bool
+        return self._elements is None and len(self._overrides) == 0
+
+    def _element(self, index):
+        # type: (int) -> _ForkedRecord
+        # Also for elements with an override, whose references still are
+        # to elements of the parent.
+        view = self._views.get(index)
+        if view is None:
+            view = _ForkedRecord(self, index)
+            self._views[index] = view
+        return view
+
+    def _materialize(self):
+        # type: () -> list
+        if self._elements is None:
+            self._elements = [self._element(index)
+                              for index in range(len(self.shared()))]
+        return self._elements
+
+    def _position(self, element):
+        # type: (object) -> Optional[int]
+        """Position of an element in the shared collection."""
+        shared = self.shared()
+        if type(element) is _ForkedRecord:
+            return element._index if element._list is shared else None
+        if getattr(element, "_table", None) is shared:
+            return element._index
+        # Cached in the shared list, for every fork of the parent.
+        version = getattr(shared, "_version", 0)
+        cached = getattr(shared, "_fork_positions", None)
+        if cached is None or cached[0] != version or \
+                cached[1] != len(shared):
+            positions = {id(shared_element): position
+                         for position, shared_element in enumerate(shared)
+                         if type(shared_element) is not _ForkedRecord}
+            cached = (version, len(shared), positions)
+            shared._fork_positions = cached
+        return cached[2].get(id(element))
+
+    def view(self, element):
+        # type: (object) -> object
+        """The view of this fork of an element of the parent collection,
+        or the element itself if it is not one."""
+        shared = self.shared()
+        if element is None:
+            return None
+        if type(shared) is _ForkedList:
+            element = shared.view(element)
+        position = self._position(element)
+        return element if position is None else self._element(position)
+
+    def format_rows(self, start, stop):
+        # type: (int, int) -> list
+        """Lines of elements start to stop in an NPF file."""
+        if self.unchanged() and not _has_overrides(self._fork):
+            shared = self.shared()
+            format_rows = getattr(shared, "format_rows", None)
+            if format_rows is not None:
+                return format_rows(start, stop)
+            return NpFile._format_rows(shared[start:stop])
+        shared = self.shared()
+        changed = _overridden_elements(self._fork)
+        if self._elements is not None or changed is None or \
+                not isinstance(shared, list):
+            # Through the views, so that references to elements written to
+            # in this fork show their copies.
+            return [self._format(element) for element in self[start:stop]]
+        # The shared elements are formatted in bulk, then the rows of the
+        # elements written to, or referring to them, through the views.
+        elements = shared[start:stop]
+        rows = NpFile._format_rows(elements)
+        stale = set(index - start for index in self._overrides
+                    if start <= index < stop)
+        for path in self._reference_paths():
+            get = _path_getter(path, None)
+            for index, element in enumerate(map(get, elements)):
+                if id(element) in changed:
+                    stale.add(index)
+        for index in stale:
+            rows[index] = self._format(self._element(start + index))
+        return rows
+
+    def _format(self, element):
+        # type: (object) -> str
+        formatter = self.element_class.row_formatter()
+        if formatter is not None and \
+                self.element_class.__str__ is RecordType.__str__:
+            return formatter.format_record(element)
+        return str(element)
+
+    def _reference_paths(self):
+        # type: () -> set
+        """Paths to the referenced elements that appear in the rows."""
+        paths = set()
+        for field in self.element_class.row_fields:
+            if callable(field):
+                continue
+            names = tuple(field.split("."))
+            for length in range(1, len(names)):
+                paths.add(names[:length])
+        return paths
+
+    def __len__(self):
+        if self._elements is not None:
+            return len(self._elements)
+        return len(self.shared())
+
+    def __iter__(self):
+        if self._elements is not None:
+            return iter(self._elements)
+        return (self._element(index) for index in range(len(self)))
+
+    def __getitem__(self, index):
+        if self._elements is not None:
+            return self._elements[index]
+        if isinstance(index, slice):
+            return [self._element(position)
+                    for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("list index out of range")
+        return self._element(index)
+
+    def __setitem__(self, index, value):
+        # Views of this list are kept in the list itself: as an override,
+        # the view of a position would be its own target after a swap.
+        if self._elements is None and not isinstance(index, slice) and \
+                not (type(value) is _ForkedRecord and value._list is self):
+            if index < 0:
+                index += len(self)
+            if index < 0 or index >= len(self):
+                raise IndexError("list assignment index out of range")
+            self._overrides[index] = value
+        else:
+            self._materialize()[index] = value
+        self._version += 1
+
+    def __delitem__(self, index):
+        del self._materialize()[index]
+        self._version += 1
+
+    def append(self, value):
+        self._materialize().append(value)
+
+    def extend(self, values):
+        self._materialize().extend(values)
+
+    def insert(self, index, value):
+        self._materialize().insert(index, value)
+        self._version += 1
+
+    def remove(self, value):
+        self._materialize().remove(value)
+        self._version += 1
+
+    def pop(self, *args):
+        value = self._materialize().pop(*args)
+        self._version += 1
+        return value
+
+    def clear(self):
+        self._elements = []
+        self._version += 1
+
+    def sort(self, *args, **kwargs):
+        self._materialize().sort(*args, **kwargs)
+        self._version += 1
+
+    def reverse(self):
+        self._materialize().reverse()
+        self._version += 1
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class _ForkedRecord(object):
+    """View of an element shared by an NpFile fork and its parent.
+
+    Reads return the fields of the shared element, or of the fork copy once
+    written to, with references mapped to the views of the fork. The first
+    write copies the element.
+    """
+    __slots__ = ("_list", "_index")
+
+    def __init__(self, forked_list, index):
+        # type: (_ForkedList, int) -> None
+        object.__setattr__(self, "_list", forked_list)
+        object.__setattr__(self, "_index", index)
+
+    def _target(self):
+        # type: () -> object
+        forked_list = self._list
+        target = forked_list._overrides.get(self._index)
+        if target is None:
+            return forked_list.shared()[self._index]
+        return target
+
+    @property
+    def __class__(self):
+        return self._list.element_class
+
+    def __getattr__(self, name):
+        value = getattr(self._target(), name)
+        forked_list = self._list
+        if value is not None and \
+                name in forked_list.element_class.reference_fields:
+            return view(forked_list._fork, value)
+        return value
+
+    def __setattr__(self, name, value):
+        forked_list = self._list
+        target = forked_list._overrides.get(self._index)
+        if target is None:
+            target = copy.copy(forked_list.shared()[self._index])
+            forked_list._overrides[self._index] = target
+        setattr(target, name, value)
+
+    def __eq__(self, other):
+        return type(other) is _ForkedRecord and \
+            other._list is self._list and other._index == self._index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self._list), self._index))
+
+    def __str__(self):
+        return self._list.element_class.__str__(self)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __copy__(self):
+        return copy.copy(self._target())
+
+    def __reduce__(self):
+        return _ForkedRecord, (self._list, self._index)
+
+
+def _has_overrides(fork):
+    # type: (NpFile) -> bool
+    """Whether elements of the sections of a fork were written to."""
+    return any(type(elements) is _ForkedList and
+               len(elements._overrides) > 0
+               for elements in vars(fork).values())
+
+
+def _overridden_elements(fork):
+    # type: (NpFile) -> Optional[set]
+    """Identities of the parent elements written to in a fork, None if
+    some are not stored in lists (e.g. columnar tables)."""
+    changed = set()
+    for elements in vars(fork).values():
+        if type(elements) is not _ForkedList or \
+                len(elements._overrides) == 0:
+            continue
+        shared = elements.shared()
+        if not isinstance(shared, list):
+            return None
+        changed.update(id(shared[index]) for index in elements._overrides
+                       if index < len(shared))
+    return changed
+
+
+def view(fork, element):
+    # type: (NpFile, object) -> object
+    """The view in a fork of an element of its parent."""
+    elements = vars(fork).get(
+        _CLASS_COLLECTIONS.get(_element_class(element)))
+    if type(elements) is not _ForkedList:
+        return element
+    return elements.view(element)
+
+
+def detached_sections(fork):
+    # type: (NpFile) -> dict
+    """Copies of the elements of a fork, by collection name, referring
+    to each other as the views of the fork do."""
+    def identity(element):
+        if type(element) is _ForkedRecord:
+            return id(element._list), element._index
+        return id(element)
+
+    sections = {}
+    copies = {}
+    elements = []
+    for collection in NpFile.COLLECTIONS:
+        records = []
+        for element in getattr(fork, collection):
+            record = copy.copy(element)
+            copies[identity(element)] = record
+            elements.append((element, record))
+            records.append(record)
+        sections[collection] = records
+    for element, record in elements:
+        for name in record.reference_fields:
+            value = getattr(element, name)
+            if value is None:
+                continue
+            if type(value) is not _ForkedRecord:
+                value = view(fork, value)
+            reference = copies.get(identity(value))
+            if reference is None:
+                reference = value._target() \
+                    if type(value) is _ForkedRecord else value
+            setattr(record, name, reference)
+    return sections
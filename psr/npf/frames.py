@@ -0,0 +1,454 @@
+"""Conversion of NpFile sections to and from pandas DataFrames and Arrow
+tables.
+
+Requires NumPy, plus pandas or PyArrow for their respective functions. Each
+section becomes a table with one column per record field, except tag.
+References to other elements are replaced by the key columns of their
+lookup, named after the field and the key attribute, e.g. "bus_number" for
+Demand.bus or "circuit_from_bus_number" for LineShunt.circuit. Missing
+references are exported as 0, or "" for name keys, and those values are
+imported as missing references. The file revision and description are
+stored in the attrs of every DataFrame and the schema metadata of every
+Arrow table.
+"""
+from typing import Optional
+
+import numpy as np
+
+from .rev1 import (DcLine, NpFile, NpfException, _COLLECTION_TYPES,
+                   _DeferredReferences, _intern_fields, _path_getter,
+                   _printf_layout, _resolve_references)
+
+
+# Lookup method and key attribute paths of the elements each reference
+# field refers to.
+_REFERENCE_KEYS = {
+    "system": ("find_system", ("number",)),
+    "region": ("find_region", ("number",)),
+    "area": ("find_area", ("number",)),
+    "dclink": ("find_dclink", ("number",)),
+    "bus": ("find_bus", ("number",)),
+    "ctr_bus": ("find_bus", ("number",)),
+    "ac_bus": ("find_bus", ("number",)),
+    "middlepoint_bus": ("find_bus", ("number",)),
+    "from_bus": ("find_bus", ("number",)),
+    "to_bus": ("find_bus", ("number",)),
+    "dc_bus": ("find_dcbus", ("number",)),
+    "neutral_bus": ("find_dcbus", ("number",)),
+    "circuit": ("find_line", ("from_bus.number", "to_bus.number",
+                              "parallel_circuit_number")),
+    "primary_transformer": ("find_transformer_by_name", ("name",)),
+    "secondary_transformer": ("find_transformer_by_name", ("name",)),
+    "tertiary_transformer": ("find_transformer_by_name", ("name",)),
+}
+
+# Reference fields whose lookup depends on the record class.
+_CLASS_REFERENCE_KEYS = {
+    DcLine: {
+        "from_bus": ("find_dcbus", ("number",)),
+        "to_bus": ("find_dcbus", ("number",)),
+    },
+}
+
+
+# Metadata keys of the file header.
+_REVISION_KEY = "npf_revision"
+_DESCRIPTION_KEY = "npf_description"
+
+
+def _header_metadata(data):
+    # type: (NpFile) -> dict
+    return {_REVISION_KEY: str(data.revision),
+            _DESCRIPTION_KEY: data.description}
+
+
+def _read_header(metadata):
+    # type: (Optional[dict]) -> tuple
+    """Revision and description in DataFrame attrs or Arrow schema metadata
+    (with bytes keys and values), None where missing."""
+    values = []
+    for key in (_REVISION_KEY, _DESCRIPTION_KEY):
+        value = None
+        if metadata is not None:
+            value = metadata.get(key, metadata.get(key.encode("utf-8")))
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        values.append(value)
+    revision, description = values
+    return None if revision is None else int(revision), description
+
+
+def _reference_keys(element_class, field):
+    # type: (type, str) -> tuple
+    keys = _CLASS_REFERENCE_KEYS.get(element_class, {}).get(field)
+    return _REFERENCE_KEYS[field] if keys is None else keys
+
+
+def _key_column(field, path):
+    # type: (str, str) -> str
+    return "{}_{}".format(field, path.replace(".", "_"))
+
+
+# Array types of the conversion types of row layouts.
+_LAYOUT_DTYPES = {"d": np.int64, "f": np.float64, "s": object}
+
+
+def _field_dtypes(element_class):
+    # type: (type) -> dict
+    """Array types of the fields that are not references.
+
+    Fields written by the row layout of the class take the type of their
+    conversion there; defaults such as the 0 of Bus.cost do not tell
+    integers from reals. Other fields take the type of their default
+    value.
+    """
+    dtypes = element_class.__dict__.get("_field_dtypes")
+    if dtypes is None:
+        layout = {}
+        if len(element_class.row_format) > 0:
+            _, kinds = _printf_layout(element_class.row_format)
+            for field, kind in zip(element_class.row_fields, kinds):
+                if not callable(field) and "." not in field:
+                    layout[field] = _LAYOUT_DTYPES[kind]
+        record = element_class()
+        dtypes = {}
+        for name in element_class.field_names():
+            if name == "tag" or name in element_class.reference_fields:
+                continue
+            if name in layout:
+                dtypes[name] = layout[name]
+                continue
+            value = getattr(record, name)
+            if isinstance(value, bool) or not isinstance(value,
+                                                         (int, float)):
+                dtypes[name] = object
+            else:
+                dtypes[name] = np.int64 if isinstance(value, int) \
+                    else np.float64
+        element_class._field_dtypes = dtypes
+    return dtypes
+
+
+def _key_dtype(path):
+    # type: (str) -> type
+    return object if path == "name" else np.int64
+
+
+def column_names(element_class):
+    # type: (type) -> list
+    """Names of the columns of a section table, in order."""
+    names = []
+    for name in element_class.field_names():
+        if name == "tag":
+            continue
+        if name in element_class.reference_fields:
+            names.extend(_key_column(name, path)
+                         for path in _reference_keys(element_class, name)[1])
+        else:
+            names.append(name)
+    return names
+
+
+def _table_columns(table):
+    # type: ("RecordTable") -> dict
+    """Columns of a columnar table, as array views where possible."""
+    element_class = table.record_class
+    dtypes = _field_dtypes(element_class)
+    columns = {}
+    for name in element_class.field_names():
+        if name == "tag":
+            continue
+        if name not in element_class.reference_fields:
+            columns[name] = np.asarray(getattr(table, name),
+                                       dtype=dtypes[name])
+            continue
+        positions = getattr(table, name)
+        for path in _reference_keys(element_class, name)[1]:
+            default = "" if path == "name" else 0
+            if "." in path:
+                values = [_path_getter((name,) + tuple(path.split(".")),
+                                       default)(row) for row in table]
+            else:
+                values = table._gather(name, path, positions, default)
+            columns[_key_column(name, path)] = np.asarray(
+                values, dtype=_key_dtype(path))
+    return columns
+
+
+def _record_columns(element_class, records):
+    # type: (type, list) -> dict
+    """Columns of a list of records, gathered one field at a time."""
+    dtypes = _field_dtypes(element_class)
+    columns = {}
+    for name in element_class.field_names():
+        if name == "tag":
+            continue
+        if name not in element_class.reference_fields:
+            values = list(map(_path_getter((name,), None), records))
+            columns[name] = np.array(values, dtype=dtypes[name])
+            continue
+        for path in _reference_keys(element_class, name)[1]:
+            default = "" if path == "name" else 0
+            get = _path_getter((name,) + tuple(path.split(".")), default)
+            columns[_key_column(name, path)] = np.array(
+                list(map(get, records)), dtype=_key_dtype(path))
+    return columns
+
+
+def to_columns(data, collections=None):
+    # type: (NpFile, Optional[Iterable[str]]) -> dict
+    """Map of collection name to the map of column name to array of each
+    section of an NpFile."""
+    from .columnar import RecordTable
+    if collections is None:
+        collections = [collection for collection in NpFile.COLLECTIONS
+                       if collection in _COLLECTION_TYPES]
+    result = {}
+    for collection in collections:
+        element_class = _COLLECTION_TYPES.get(collection)
+        if element_class is None:
+            raise NpfException("Unknown section collection {}"
+                               .format(collection))
+        elements = getattr(data, collection)
+        if isinstance(elements, RecordTable):
+            result[collection] = _table_columns(elements)
+        else:
+            result[collection] = _record_columns(element_class,
+                                                 list(elements))
+    return result
+
+
+def _check_columns(element_class, collection, columns):
+    # type: (type, str, dict) -> int
+    """Number of rows of the columns of a section."""
+    known = set(column_names(element_class))
+    unknown = [name for name in columns if name not in known]
+    if len(unknown) > 0:
+        raise NpfException("Unknown columns of {}: {}".format(
+            collection, ", ".join(str(name) for name in unknown)))
+    sizes = set(len(values) for values in columns.values())
+    if len(sizes) > 1:
+        raise NpfException("Columns of {} differ in length"
+                           .format(collection))
+    return sizes.pop() if len(sizes) > 0 else 0
+
+
+def _key_values(element_class, field, columns, size):
+    # type: (type, str, dict, int) -> tuple
+    """Lookup method and key tuples of a reference field."""
+    finder, paths = _reference_keys(element_class, field)
+    key_columns = []
+    for path in paths:
+        values = columns.get(_key_column(field, path))
+        if values is None:
+            values = ["" if path == "name" else 0] * size
+        elif path == "name":
+            # Names are looked up without padding, as when parsing.
+            values = [value.strip() for value in np.asarray(values).tolist()]
+        else:
+            values = np.asarray(values).tolist()
+        key_columns.append(values)
+    return finder, list(zip(*key_columns))
+
+
+def _is_missing(key):
+    # type: (tuple) -> bool
+    return key[0] == 0 or key[0] == "" or key[0] is None
+
+
+def _field_values(element_class, name, columns, size, default):
+    # type: (type, str, dict, int, object) -> list
+    values = columns.get(name)
+    if values is None:
+        return [default] * size
+    dtype = _field_dtypes(element_class)[name]
+    if dtype is object:
+        return np.asarray(values, dtype=object).tolist()
+    return np.asarray(values).astype(dtype, copy=False).tolist()
+
+
+def _build_records(element_class, collection, columns, references,
+                   strings=None):
+    # type: (type, str, dict, object, Optional[dict]) -> list
+    """Records of a section, with references looked up in references: an
+    NpFile, or _DeferredReferences to leave them pending. Interned fields
+    are shared through the strings table, if given."""
+    size = _check_columns(element_class, collection, columns)
+    defaults = element_class()
+    records = [element_class.__new__(element_class) for _ in range(size)]
+    for name in element_class.field_names():
+        if name == "tag":
+            values = [None] * size
+        elif name in element_class.reference_fields:
+            finder, keys = _key_values(element_class, name, columns, size)
+            find = getattr(references, finder)
+            values = [None if _is_missing(key) else find(*key)
+                      for key in keys]
+        else:
+            values = _field_values(element_class, name, columns, size,
+                                   getattr(defaults, name))
+        for record, value in zip(records, values):
+            setattr(record, name, value)
+    if strings is not None:
+        _intern_fields(records, element_class, strings)
+    return records
+
+
+def _positions(data, collections, keys, finder):
+    # type: (NpFile, tuple, np.ndarray, str) -> np.ndarray
+    """Positions in collections (see RecordTable.reference_fields) of the
+    elements of the given numbers, -1 for 0."""
+    from .columnar import RecordTable
+    keys = np.asarray(keys, dtype=np.int64)
+    positions = np.full(len(keys), -1, dtype=np.intp)
+    missing = keys != 0
+    for which, collection in enumerate(collections):
+        targets = getattr(data, collection)
+        if isinstance(targets, RecordTable):
+            numbers = targets.number
+        else:
+            numbers = np.array([target.number for target in targets],
+                               dtype=np.int64)
+        if len(numbers) == 0 or not missing.any():
+            continue
+        wanted = np.flatnonzero(missing)
+        order = np.argsort(numbers, kind="stable")
+        found = order[np.minimum(np.searchsorted(numbers[order],
+                                                 keys[wanted]),
+                                 len(numbers) - 1)]
+        hit = numbers[found] == keys[wanted]
+        positions[wanted[hit]] = found[hit] if which == 0 \
+            else -2 - found[hit]
+        missing[wanted[hit]] = False
+    if missing.any():
+        raise NpfException("Could not find {} #{}".format(
+            finder[len("find_"):], keys[np.flatnonzero(missing)[0]]))
+    return positions
+
+
+def _build_table(data, table_class, collection, columns):
+    # type: (NpFile, type, str, dict) -> "RecordTable"
+    """Columnar table of a section, using the given arrays without copying
+    them where their types match."""
+    element_class = table_class.record_class
+    size = _check_columns(element_class, collection, columns)
+    defaults = element_class()
+    arrays = {"tag": np.full(size, None, dtype=object)}
+    for name in element_class.field_names():
+        if name == "tag":
+            continue
+        if name in table_class.reference_fields:
+            finder, paths = _reference_keys(element_class, name)
+            keys = columns.get(_key_column(name, paths[0]))
+            if keys is None:
+                keys = np.zeros(size, dtype=np.int64)
+            arrays[name] = _positions(
+                data, table_class.reference_fields[name], keys, finder)
+        elif name in columns:
+            arrays[name] = np.asarray(columns[name],
+                                      dtype=table_class._dtype(name))
+        else:
+            arrays[name] = np.full(size, getattr(defaults, name),
+                                   dtype=table_class._dtype(name))
+    return table_class.from_columns(data, arrays)
+
+
+def from_columns(sections,  # type: dict
+                 columnar=False,  # type: bool
+                 revision=None,  # type: Optional[int]
+                 description=None,  # type: Optional[str]
+                 ):
+    # type: (...) -> NpFile
+    """Build an NpFile from the column maps of its sections (see
+    to_columns), with the given revision and description, or the NpFile
+    defaults.
+
+    References are resolved once every section is built, so that sections
+    may refer to each other in any order. With columnar=True, buses, lines
+    and transformers are stored as columnar tables built on the given
+    arrays.
+    """
+    from .columnar import COLUMNAR_SECTIONS
+    for collection in sections:
+        if collection not in _COLLECTION_TYPES:
+            raise NpfException("Unknown section collection {}"
+                               .format(collection))
+    tables = dict(COLUMNAR_SECTIONS) if columnar else {}
+    data = NpFile()
+    strings = {}  # type: dict
+    if revision is not None:
+        data.revision = revision
+    if description is not None:
+        data.description = description
+    pending = _DeferredReferences()
+    for collection in NpFile.COLLECTIONS:
+        columns = sections.get(collection)
+        if columns is None or collection in tables:
+            continue
+        setattr(data, collection,
+                _build_records(_COLLECTION_TYPES[collection], collection,
+                               columns, pending, strings))
+    # Tables only need the numbers of the elements they refer to, which
+    # are known before linking.
+    for collection, table_class in COLUMNAR_SECTIONS:
+        if collection in tables:
+            setattr(data, collection,
+                    _build_table(data, table_class, collection,
+                                 sections.get(collection, {})))
+    resolved = {}
+    for collection in NpFile.COLLECTIONS:
+        if collection in sections and collection not in tables:
+            _resolve_references(data, getattr(data, collection), resolved)
+    return data
+
+
+def to_frames(data, collections=None):
+    # type: (NpFile, Optional[Iterable[str]]) -> dict
+    """Map of collection name to pandas DataFrame of each section."""
+    import pandas as pd
+    frames = {}
+    for collection, columns in to_columns(data, collections).items():
+        frame = pd.DataFrame(columns, copy=False)
+        frame.attrs.update(_header_metadata(data))
+        frames[collection] = frame
+    return frames
+
+
+def from_frames(frames, columnar=False):
+    # type: (dict, bool) -> NpFile
+    """Build an NpFile from DataFrames of its sections (see to_frames)."""
+    revision, description = _read_header(
+        next((frame.attrs for frame in frames.values()), None))
+    return from_columns(
+        {collection: {name: frame[name].to_numpy() for name in frame.columns}
+         for collection, frame in frames.items()}, columnar, revision,
+        description)
+
+
+def to_arrow(data, collections=None):
+    # type: (NpFile, Optional[Iterable[str]]) -> dict
+    """Map of collection name to pyarrow.Table of each section."""
+    import pyarrow as pa
+    tables = {}
+    for collection, columns in to_columns(data, collections).items():
+        arrays = {}
+        for name, values in columns.items():
+            if values.dtype == object:
+                arrays[name] = pa.array(values, type=pa.string())
+            else:
+                arrays[name] = pa.array(values)
+        tables[collection] = pa.table(arrays,
+                                      metadata=_header_metadata(data))
+    return tables
+
+
+def from_arrow(tables, columnar=False):
+    # type: (dict, bool) -> NpFile
+    """Build an NpFile from Arrow tables of its sections (see to_arrow)."""
+    revision, description = _read_header(
+        next((table.schema.metadata for table in tables.values()), None))
+    return from_columns(
+        {collection: {name: table.column(name).to_numpy()
+                      for name in table.column_names}
+         for collection, table in tables.items()}, columnar, revision,
+        description)
@@ -0,0 +1,282 @@
+"""Network matrices of NpFile data.
+
+Requires NumPy and SciPy. Matrices are indexed by the buses of the file, in
+the order of buses and then middlepoint_buses (see bus_index), and are
+assembled from arrays of the fields of whole sections, so that columnar
+tables are read without going through their rows.
+
+Impedances are taken in percent and shunts in MVAr at 1 pu voltage, both on
+the system base (MVABASE by default). Shunt MVAr are signed, positive for
+capacitors and negative for reactors, as in the file; the type of bus
+shunts is not read. Elements out of service (stt) are left out.
+
+islands() labels the connected components of the same buses, joined
+through the DC network as well.
+"""
+from typing import Optional
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+
+from .columnar import RecordTable
+from .rev1 import (MVABASE, NpfException, STATUS_OFF, Line, LineShunt,
+                   _path_getter)
+
+
+def _column(elements, path, dtype=None):
+    # type: (object, str, Optional[type]) -> np.ndarray
+    """Values of a dotted attribute path for every element of a section, 0
+    for missing references."""
+    names = path.split(".")
+    if isinstance(elements, RecordTable) and len(names) <= 2:
+        values = getattr(elements, names[0])
+        if len(names) == 2:
+            values = elements._gather(names[0], names[1], values, 0)
+        return np.asarray(values, dtype=dtype)
+    return np.array(list(map(_path_getter(tuple(names), 0), elements)),
+                    dtype=dtype)
+
+
+def bus_numbers(data):
+    # type: ("NpFile") -> np.ndarray
+    """Numbers of the buses of the matrix rows, in order."""
+    numbers = [bus.number for bus in data.buses]
+    numbers.extend(bus.number for bus in data.middlepoint_buses)
+    return np.array(numbers, dtype=np.int64)
+
+
+def bus_index(data):
+    # type: ("NpFile") -> dict
+    """Matrix row of each bus, by bus number."""
+    return {number: row
+            for row, number in enumerate(bus_numbers(data).tolist())}
+
+
+class _BusRows(object):
+    """Vectorized lookup of the matrix rows of bus numbers."""
+    def __init__(self, numbers):
+        # type: (np.ndarray) -> None
+        self.numbers = numbers
+        self._order = np.argsort(numbers, kind="stable")
+        self._sorted = numbers[self._order]
+
+    def __call__(self, keys, collection):
+        # type: (np.ndarray, str) -> np.ndarray
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(keys) == 0:
+            return np.zeros(0, dtype=np.intp)
+        if len(self.numbers) == 0:
+            raise NpfException("Could not find bus #{} of {}"
+                               .format(keys[0], collection))
+        found = np.minimum(np.searchsorted(self._sorted, keys),
+                           len(self.numbers) - 1)
+        missing = self._sorted[found] != keys
+        if missing.any():
+            raise NpfException("Could not find bus #{} of {}"
+                               .format(keys[missing][0], collection))
+        return self._order[found]
+
+
+def _in_service(elements):
+    # type: (object) -> np.ndarray
+    return _column(elements, "stt", np.int64) != STATUS_OFF
+
+
+def _series_admittances(elements, collection, on):
+    # type: (object, str, np.ndarray) -> np.ndarray
+    """Series admittances (pu) of the branches in service, from their
+    impedances (%)."""
+    impedances = (_column(elements, "r_pct", np.float64) +
+                  1j * _column(elements, "x_pct", np.float64))[on] / 100.0
+    zero = impedances == 0
+    if zero.any():
+        position = int(np.flatnonzero(on)[np.flatnonzero(zero)[0]])
+        raise NpfException(
+            "Branch from bus #{} to bus #{} #{} of {} has no impedance"
+            .format(_column(elements, "from_bus.number")[position],
+                    _column(elements, "to_bus.number")[position],
+                    _column(elements, "parallel_circuit_number")[position],
+                    collection))
+    return 1.0 / impedances
+
+
+def _branches(data, rows, base_mva):
+    # type: ("NpFile", _BusRows, float) -> list
+    """(from rows, to rows, yff, yft, ytf, ytt) of the lines and
+    transformers in service."""
+    branches = []
+    lines = data.lines
+    on = _in_service(lines)
+    if on.any():
+        series = _series_admittances(lines, "lines", on)
+        charging = 0.5j * _column(lines, "mvar", np.float64)[on] / base_mva
+        branches.append((
+            rows(_column(lines, "from_bus.number")[on], "lines"),
+            rows(_column(lines, "to_bus.number")[on], "lines"),
+            series + charging, -series, -series, series + charging))
+    # Taps and phase shifts are at the from bus, as in the file.
+    for collection in ("transformers", "equivalent_transformers"):
+        transformers = getattr(data, collection)
+        on = _in_service(transformers)
+        if not on.any():
+            continue
+        series = _series_admittances(transformers, collection, on)
+        tap = _column(transformers, "tap", np.float64)[on]
+        tap = np.where(tap == 0, 1.0, tap) * np.exp(1j * np.deg2rad(
+            _column(transformers, "phase", np.float64)[on]))
+        branches.append((
+            rows(_column(transformers, "from_bus.number")[on], collection),
+            rows(_column(transformers, "to_bus.number")[on], collection),
+            series / (tap * np.conj(tap)), -series / np.conj(tap),
+            -series / tap, series))
+    return branches
+
+
+def _shunts(data, rows, base_mva):
+    # type: ("NpFile", _BusRows, float) -> list
+    """(rows, admittances) of the bus shunts and the line shunts in
+    service."""
+    shunts = []
+    bus_shunts = data.bus_shunts
+    if len(bus_shunts) > 0:
+        susceptances = _column(bus_shunts, "mvar", np.float64) * \
+            _column(bus_shunts, "units_on", np.float64) / base_mva
+        shunts.append((rows(_column(bus_shunts, "bus.number"), "bus_shunts"),
+                       1j * susceptances))
+    line_shunts = data.line_shunts
+    if len(line_shunts) > 0:
+        # Switched with their line.
+        on = _in_service(line_shunts) & (
+            _column(line_shunts, "circuit.stt", np.int64) != STATUS_OFF)
+        at_to = _column(line_shunts, "terminal", object) == \
+            LineShunt.TERMINAL_TO
+        numbers = np.where(at_to,
+                           _column(line_shunts, "circuit.to_bus.number"),
+                           _column(line_shunts, "circuit.from_bus.number"))
+        shunts.append((rows(numbers[on], "line_shunts"),
+                       1j * _column(line_shunts, "mvar",
+                                    np.float64)[on] / base_mva))
+    return shunts
+
+
+def ybus(data, base_mva=MVABASE):
+    # type: ("NpFile", float) -> tuple
+    """Bus admittance matrix (pu) as a SciPy CSR matrix, and the matrix row
+    of each bus, by bus number.
+
+    Lines are pi models with their charging split between both ends.
+    Transformers have their tap and phase shift (degrees) at the from bus;
+    a zero tap is taken as 1. Parallel circuits add up. CSCs are not
+    included, since their reactance depends on their control.
+    """
+    numbers = bus_numbers(data)
+    rows = _BusRows(numbers)
+    size = len(numbers)
+    first = []
+    second = []
+    values = []
+    for from_rows, to_rows, yff, yft, ytf, ytt in _branches(data, rows,
+                                                             base_mva):
+        first.extend((from_rows, from_rows, to_rows, to_rows))
+        second.extend((from_rows, to_rows, from_rows, to_rows))
+        values.extend((yff, yft, ytf, ytt))
+    for shunt_rows, admittances in _shunts(data, rows, base_mva):
+        first.append(shunt_rows)
+        second.append(shunt_rows)
+        values.append(admittances)
+    if len(values) == 0:
+        matrix = scipy.sparse.csr_matrix((size, size), dtype=np.complex128)
+    else:
+        # Duplicate entries, e.g. of parallel circuits, are summed.
+        matrix = scipy.sparse.coo_matrix(
+            (np.concatenate(values),
+             (np.concatenate(first), np.concatenate(second))),
+            shape=(size, size)).tocsr()
+    return matrix, {number: row
+                    for row, number in enumerate(numbers.tolist())}
+
+
+def _ends(elements, first_path, second_path, on):
+    # type: (object, str, str, np.ndarray) -> tuple
+    """Bus numbers at the ends of the elements in service (on) that have
+    both references set."""
+    first = _column(elements, first_path, np.int64)
+    second = _column(elements, second_path, np.int64)
+    on = on & (first != 0) & (second != 0)
+    return first[on], second[on]
+
+
+def islands(data, open_breakers=False, open_switches=False):
+    # type: ("NpFile", bool, bool) -> dict
+    """Island label of each AC bus, by bus number. See NpFile.islands."""
+    open_types = []
+    if open_breakers:
+        open_types.append(Line.LTYPE_BREAKER)
+    if open_switches:
+        open_types.append(Line.LTYPE_SWITCH)
+
+    # Bus numbers at the ends of the connections between AC buses, between
+    # DC buses and from AC to DC buses.
+    ac_ends = []
+    dc_ends = []
+    converter_ends = []
+    for collection in ("lines", "transformers", "equivalent_transformers",
+                       "cscs"):
+        branches = getattr(data, collection)
+        on = _in_service(branches)
+        if collection == "lines" and open_types:
+            on &= ~np.isin(_column(branches, "type", np.int64), open_types)
+        ac_ends.append(_ends(branches, "from_bus.number", "to_bus.number",
+                             on))
+    dclines = data.dclines
+    dc_ends.append(_ends(dclines, "from_bus.number", "to_bus.number",
+                         _in_service(dclines)))
+    for converters in (data.lcc_converters, data.vsc_converters):
+        on = _in_service(converters)
+        converter_ends.append(_ends(converters, "ac_bus.number",
+                                    "dc_bus.number", on))
+        dc_ends.append(_ends(converters, "dc_bus.number",
+                             "neutral_bus.number", on))
+
+    # Nodes of the AC buses, then of the DC buses, numbered in order of
+    # bus number. Buses missing from the collections get nodes as well.
+    ac_numbers, ac_first = np.unique(np.concatenate(
+        [bus_numbers(data)] + [first for first, _ in ac_ends] +
+        [second for _, second in ac_ends] +
+        [ac for ac, _ in converter_ends]), return_index=True)
+    dc_numbers = np.unique(np.concatenate(
+        [_column(data.dcbuses, "number", np.int64)] +
+        [first for first, _ in dc_ends] + [second for _, second in dc_ends] +
+        [dc for _, dc in converter_ends]))
+
+    def ac_nodes(numbers):
+        return np.searchsorted(ac_numbers, numbers)
+
+    def dc_nodes(numbers):
+        return len(ac_numbers) + np.searchsorted(dc_numbers, numbers)
+
+    first = np.concatenate(
+        [ac_nodes(ends) for ends, _ in ac_ends] +
+        [dc_nodes(ends) for ends, _ in dc_ends] +
+        [ac_nodes(ac) for ac, _ in converter_ends])
+    second = np.concatenate(
+        [ac_nodes(ends) for _, ends in ac_ends] +
+        [dc_nodes(ends) for _, ends in dc_ends] +
+        [dc_nodes(dc) for _, dc in converter_ends])
+    size = len(ac_numbers) + len(dc_numbers)
+    graph = scipy.sparse.coo_matrix(
+        (np.ones(len(first), dtype=np.int8), (first, second)),
+        shape=(size, size))
+    count, components = scipy.sparse.csgraph.connected_components(
+        graph, directed=False)
+
+    # Labels from 0 in the order of the first bus of each island, the AC
+    # buses being taken in the order they were first seen above.
+    order = np.argsort(ac_first, kind="stable")
+    components = components[order]
+    seen = np.unique(components, return_index=True)[1]
+    labels = np.empty(count, dtype=np.int64)
+    labels[components[np.sort(seen)]] = np.arange(len(seen))
+    return dict(zip(ac_numbers[order].tolist(),
+                    labels[components].tolist()))
@@ -1,8 +1,26 @@
+import array
+import concurrent.futures
+import contextlib
 import csv
 import datetime
+import importlib
 import io
+import itertools
+import locale
+import operator
+import os
+import re
+import string
 import sys
-from typing import Optional
+import time
+import warnings
+from concurrent.futures import Executor
+from typing import (Awaitable, Callable, Iterable, Iterator, Optional,
+                    TextIO, Union)
+
+from .cache import SnapshotCache
+from .stats import (READ, WRITE, NpfStats, _CountingReader, _CountingWriter,
+                    _TimedLookups)
 
 
 _IS_PY2 = sys.version_info[0] == 2
@@ -56,6 +74,20 @@ STATUS_OFF = 0
 # Absolute maximum value of circuit flow.
 FLOW_MAX = 9999.0
 
+# Number of records formatted at once when writing a section.
+_WRITE_CHUNK_SIZE = 1024
+# Buffer size (bytes) of files being saved.
+_WRITE_BUFFER_SIZE = 1024 * 1024
+# Maximum number of records of a section parsed by each worker process.
+_PARALLEL_CHUNK_ROWS = 20000
+
+# Compression modules of compressed files, by magic number and extension.
+_COMPRESSIONS = (
+    (b"\x1f\x8b", ".gz", "gzip"),
+    (b"BZh", ".bz2", "bz2"),
+    (b"\xfd7zXZ\x00", ".xz", "lzma"),
+)
+
 # Transformer control type
 XFMR_FIXED_TAP_ANGLE = 1
 XFMR_FIXED_TAP_VAR_ANGLE = 2
@@ -78,9 +110,328 @@ def _empty(str_value):
     return len(str_value.strip()) == 0
 
 
+def _compression(file_path, mode):
+    # type: (str, str) -> Optional[str]
+    """Name of the compression module of a file, None if uncompressed.
+
+    Files being read are detected by their contents and files being
+    written by their extension.
+    """
+    if "r" in mode:
+        with open(file_path, "rb") as data_file:
+            start = data_file.read(6)
+        for magic, _, module in _COMPRESSIONS:
+            if start.startswith(magic):
+                return module
+    else:
+        for _, extension, module in _COMPRESSIONS:
+            if file_path.lower().endswith(extension):
+                return module
+    return None
+
+
+def _open(file_path, mode="r", buffering=-1):
+    # type: (str, str, int) -> io.IOBase
+    """Open a file, decompressing or compressing it on the fly if it is a
+    gzip, bzip2 or xz file."""
+    module = _compression(file_path, mode)
+    if module is None:
+        return open(file_path, mode, buffering=buffering)
+    if "b" not in mode:
+        mode += "t"
+    return importlib.import_module(module).open(file_path, mode)
+
+
+def _number_key(element):
+    # type: ("RecordType") -> int
+    return element.number
+
+
+def _circuit_key(element):
+    # type: ("SeriesType") -> tuple
+    return (element.from_bus_number(), element.to_bus_number(),
+            element.parallel_circuit_number)
+
+
+def _name_key(element):
+    # type: ("RecordType") -> str
+    return element.name.strip()
+
+
+class _RecordList(list):
+    """List of elements that counts structural modifications.
+
+    Appending does not change the version, since indexes can catch up with
+    new elements incrementally. Any other modification invalidates them.
+    """
+    def __init__(self, *args):
+        super(_RecordList, self).__init__(*args)
+        self._version = 0
+
+    def _modified(self):
+        self._version += 1
+
+    def __setitem__(self, index, value):
+        super(_RecordList, self).__setitem__(index, value)
+        self._modified()
+
+    def __delitem__(self, index):
+        super(_RecordList, self).__delitem__(index)
+        self._modified()
+
+    def __imul__(self, value):
+        result = super(_RecordList, self).__imul__(value)
+        self._modified()
+        return result
+
+    def insert(self, index, value):
+        super(_RecordList, self).insert(index, value)
+        self._modified()
+
+    def remove(self, value):
+        super(_RecordList, self).remove(value)
+        self._modified()
+
+    def pop(self, *args):
+        value = super(_RecordList, self).pop(*args)
+        self._modified()
+        return value
+
+    def clear(self):
+        super(_RecordList, self).clear()
+        self._modified()
+
+    def sort(self, *args, **kwargs):
+        super(_RecordList, self).sort(*args, **kwargs)
+        self._modified()
+
+    def reverse(self):
+        super(_RecordList, self).reverse()
+        self._modified()
+
+
+# Number of assignments to the key fields of records (see _KEY_FIELDS),
+# which may leave the lookup indexes stale.
+_key_edits = 0
+
+
+def _key_edited():
+    # type: () -> None
+    global _key_edits
+    _key_edits += 1
+
+
+class _Index(object):
+    """Hash index over a list of elements.
+
+    The index follows appends to the list incrementally and is rebuilt after
+    any other modification of the list. Keys are computed from the elements
+    themselves, so a hit is checked against its current key and a stale hit
+    (e.g. a renumbered bus) triggers a rebuild as well. A miss triggers a
+    rebuild if key fields were assigned since the last one, unless refresh
+    is False.
+    """
+    def __init__(self, key_function):
+        # type: (Callable) -> None
+        self._key_function = key_function
+        self._elements = None
+        self._version = -1
+        self._edits = -1
+        self._size = 0
+        self._map = {}
+
+    def _rebuild(self, elements):
+        # type: (_RecordList) -> None
+        self._elements = elements
+        self._version = elements._version
+        self._edits = _key_edits
+        self._size = 0
+        self._map = {}
+        self._add(elements)
+
+    def _add(self, elements):
+        # type: (_RecordList) -> None
+        key_function = self._key_function
+        setdefault = self._map.setdefault
+        for element in elements[self._size:]:
+            setdefault(key_function(element), element)
+        self._size = len(elements)
+
+    def find(self, elements, key, refresh=True):
+        # type: (_RecordList, object, bool) -> Optional["RecordType"]
+        """Element with a key, None if there is none.
+
+        With refresh=False a miss does not trigger a rebuild.
+        """
+        rebuilt = False
+        if elements is not self._elements or \
+                elements._version != self._version or \
+                len(elements) < self._size:
+            self._rebuild(elements)
+            rebuilt = True
+        elif len(elements) > self._size:
+            self._add(elements)
+        element = self._map.get(key)
+        if element is not None and self._key_function(element) == key:
+            return element
+        if rebuilt or not refresh or self._edits == _key_edits:
+            return None
+        self._rebuild(elements)
+        element = self._map.get(key)
+        if element is not None and self._key_function(element) == key:
+            return element
+        return None
+
+
+def _branch_ends(element):
+    # type: ("SeriesType") -> tuple
+    from_bus = element.from_bus
+    to_bus = element.to_bus
+    if from_bus is None or to_bus is None or \
+            from_bus.number != to_bus.number:
+        return (from_bus, to_bus), (to_bus, from_bus)
+    return ((from_bus, to_bus),)
+
+
+def _bus_end(element):
+    # type: ("RecordType") -> tuple
+    return ((element.bus, None),)
+
+
+def _line_shunt_end(element):
+    # type: ("LineShunt") -> tuple
+    circuit = element.circuit
+    if circuit is None:
+        return ()
+    if element.terminal == LineShunt.TERMINAL_TO:
+        return ((circuit.to_bus, None),)
+    return ((circuit.from_bus, None),)
+
+
+def _ac_bus_end(element):
+    # type: ("AcDcConverter") -> tuple
+    return ((element.ac_bus, None),)
+
+
+# Collections of the elements connected to AC buses, and the function
+# yielding the (bus, bus at the other end or None) pairs of an element.
+# Three-winding transformers are connected through their legs, which are
+# equivalent transformers to their middle point bus.
+_ADJACENCY_COLLECTIONS = (
+    ("lines", _branch_ends),
+    ("transformers", _branch_ends),
+    ("equivalent_transformers", _branch_ends),
+    ("cscs", _branch_ends),
+    ("demands", _bus_end),
+    ("generators", _bus_end),
+    ("bus_shunts", _bus_end),
+    ("line_shunts", _line_shunt_end),
+    ("svcs", _bus_end),
+    ("lcc_converters", _ac_bus_end),
+    ("vsc_converters", _ac_bus_end),
+)
+
+
+class _Adjacency(object):
+    """Elements connected to each AC bus, in compressed sparse row form.
+
+    The (element, other end) pairs of every element are stored in
+    collection order in elements and ends, the other end being the bus at
+    the other end of a branch or None. Row r of the bus numbered n (rows
+    maps n to r) holds the positions indices[offsets[r]:offsets[r + 1]] of
+    its pairs. The adjacency is rebuilt when a collection was modified
+    (see _RecordList) or key fields of the records were assigned, e.g. the
+    buses of a branch or the number of a bus (see _key_edits).
+    """
+    def __init__(self, ends_functions):
+        # type: (tuple) -> None
+        # Function yielding the (bus, other end) pairs of the elements of
+        # each collection.
+        self._ends_functions = ends_functions
+        # Identities, versions and sizes of the collections, and key edits,
+        # at the last rebuild.
+        self._state = None  # type: Optional[tuple]
+        self._collections = []  # type: list
+        self.rows = {}  # type: dict
+        self.offsets = array.array("q", [0])
+        self.indices = array.array("q")
+        self.elements = []  # type: list
+        self.ends = []  # type: list
+
+    def _rebuild(self, collections):
+        # type: (list) -> None
+        rows = {}  # type: dict
+        row_of = array.array("q")
+        elements = []
+        ends = []
+        for collection, ends_function in zip(collections,
+                                             self._ends_functions):
+            for element in collection:
+                for bus, other in ends_function(element):
+                    if bus is not None:
+                        row_of.append(rows.setdefault(bus.number, len(rows)))
+                        elements.append(element)
+                        ends.append(other)
+        counts = [0] * len(rows)
+        for row in row_of:
+            counts[row] += 1
+        offsets = array.array("q", [0])
+        offsets.extend(itertools.accumulate(counts))
+        # Counting sort of the pairs by row, which keeps the collection
+        # order within each row.
+        free = offsets[:-1]
+        indices = array.array("q", bytes(offsets.itemsize * len(row_of)))
+        for position, row in enumerate(row_of):
+            indices[free[row]] = position
+            free[row] += 1
+        self.rows = rows
+        self.offsets = offsets
+        self.indices = indices
+        self.elements = elements
+        self.ends = ends
+
+    def refresh(self, collections):
+        # type: (list) -> None
+        """Bring the adjacency up to date with the collections, in the
+        order of the ends functions."""
+        state = (tuple(map(id, collections)),
+                 tuple(getattr(collection, "_version", 0)
+                       for collection in collections),
+                 tuple(map(len, collections)), _key_edits)
+        if state != self._state:
+            self._rebuild(collections)
+            self._state = state
+            # Kept so that the identities in the state are not reused.
+            self._collections = collections
+
+    def pairs(self, number):
+        # type: (int) -> list
+        """(element, other end) pairs of the bus numbered number."""
+        row = self.rows.get(number)
+        if row is None:
+            return []
+        elements = self.elements
+        ends = self.ends
+        return [(elements[position], ends[position]) for position in
+                self.indices[self.offsets[row]:self.offsets[row + 1]]]
+
+
 class NpFile:
     """Represents a study stage/block data."""
+    # Names of the attributes holding element collections.
+    COLLECTIONS = (
+        "buses", "middlepoint_buses", "areas", "regions", "systems", "owners",
+        "ownerships", "demands", "generators", "bus_shunts", "lines",
+        "line_shunts", "transformers", "equivalent_transformers",
+        "three_winding_transformers", "cscs", "svcs", "dclinks", "dcbuses",
+        "dclines", "lcc_converters", "vsc_converters",
+    )
+
     def __init__(self):
+        # Lookup indexes used by the find_* methods, by index name.
+        self._indexes = {}
+        # Sections of a lazily loaded file that were not parsed yet.
+        self._lazy = None
         # Custom data associated with the file.
         self.tag = None
         # File format revision number.
@@ -115,100 +466,237 @@ class NpFile:
         self.lcc_converters = []
         self.vsc_converters = []
 
+    def __setattr__(self, name, value):
+        # Element lists are kept as _RecordList so that the lookup indexes
+        # can tell when they were modified.
+        if type(value) is list:
+            value = _RecordList(value)
+        object.__setattr__(self, name, value)
+
+    def _lookup(self, collection, index_name, key_function, key,
+                refresh=True):
+        # type: (str, str, Callable, object, bool) -> Optional["RecordType"]
+        elements = getattr(self, collection)
+        if type(elements) is not _RecordList and \
+                getattr(elements, "forked", False) and elements.unchanged():
+            # Unchanged sections of forks use the indexes of their parent.
+            return elements.view(elements._parent._lookup(
+                collection, index_name, key_function, key, refresh))
+        index = self._indexes.get(index_name)
+        if index is None:
+            index = _Index(key_function)
+            self._indexes[index_name] = index
+        return index.find(elements, key, refresh)
+
+    def _lookup_first(self, lookups, key):
+        # type: (tuple, object) -> Optional["RecordType"]
+        """Look a key up in several collections, in order.
+
+        lookups holds (collection, index name, key function) tuples. The
+        indexes are only refreshed after a miss in every collection, so
+        that finding an element of a later collection does not rebuild the
+        indexes of the earlier ones.
+        """
+        for refresh in (False, True):
+            for collection, index_name, key_function in lookups:
+                element = self._lookup(collection, index_name, key_function,
+                                       key, refresh)
+                if element is not None:
+                    return element
+        return None
+
     def find_system(self, system_number):
         # type: (int) -> "System"
-        for system in self.systems:
-            if system.number == system_number:
-                return system
+        system = self._lookup("systems", "systems", _number_key,
+                              system_number)
+        if system is not None:
+            return system
         raise NpfException("Could not find system #{}".format(system_number))
 
     def find_region(self, region_number):
         # type: (int) -> "Region"
-        for region in self.regions:
-            if region.number == region_number:
-                return region
+        region = self._lookup("regions", "regions", _number_key,
+                              region_number)
+        if region is not None:
+            return region
         raise NpfException("Could not find region #{}".format(region_number))
 
     def find_area(self, area_number):
         # type: (int) -> "Area"
-        for area in self.areas:
-            if area.number == area_number:
-                return area
+        area = self._lookup("areas", "areas", _number_key, area_number)
+        if area is not None:
+            return area
         raise NpfException("Could not find area #{}".format(area_number))
 
     def find_dclink(self, link_number):
         # type: (int) -> "DcLink"
-        for dclink in self.dclinks:
-            if dclink.number == link_number:
-                return dclink
+        dclink = self._lookup("dclinks", "dclinks", _number_key, link_number)
+        if dclink is not None:
+            return dclink
         raise NpfException("Could not find DC link #{}".format(link_number))
 
     def find_dcbus(self, bus_number):
         # type: (int) -> "DcBus"
-        for bus in self.dcbuses:
-            if bus.number == bus_number:
-                return bus
+        bus = self._lookup("dcbuses", "dcbuses", _number_key, bus_number)
+        if bus is not None:
+            return bus
         raise NpfException("Could not find DC bus #{}".format(bus_number))
 
     def find_bus(self, bus_number):
         # type: (int) -> Union["Bus", "MiddlePointBus"]
-        for bus in self.buses:
-            if bus.number == bus_number:
-                return bus
-        for bus in self.middlepoint_buses:
-            if bus.number == bus_number:
-                return bus
+        bus = self._lookup_first(
+            (("buses", "buses", _number_key),
+             ("middlepoint_buses", "middlepoint_buses", _number_key)),
+            bus_number)
+        if bus is not None:
+            return bus
         raise NpfException("Could not find bus #{}".format(bus_number))
 
     def find_line(self, from_bus, to_bus, ncir):
         # type: (int, int, int) -> "Line"
-        for line in self.lines:
-            if line.from_bus.number == from_bus and \
-                    line.to_bus.number == to_bus and \
-                    line.parallel_circuit_number == ncir:
-                return line
+        return self._lookup("lines", "lines", _circuit_key,
+                            (from_bus, to_bus, ncir))
 
     def find_transformer(self, from_bus, to_bus, ncir):
         # type: (int, int, int) -> Union["Transformer","EquivalentTransformer"]
-        for transformer in self.transformer:
-            if transformer.from_bus.number == from_bus and \
-                    transformer.to_bus.number == to_bus and \
-                    transformer.parallel_circuit_number == ncir:
-                return transformer
-        for transformer in self.equivalent_transformers:
-            if transformer.from_bus.number == from_bus and \
-                    transformer.to_bus.number == to_bus and \
-                    transformer.parallel_circuit_number == ncir:
-                return transformer
+        transformer = self._lookup_first(
+            (("transformers", "transformers", _circuit_key),
+             ("equivalent_transformers", "equivalent_transformers",
+              _circuit_key)),
+            (from_bus, to_bus, ncir))
+        if transformer is not None:
+            return transformer
         raise NpfException("Could not find transformer from bus #{} "
                            "to bus #{} #{}"
                            .format(from_bus, to_bus, ncir))
 
     def find_transformer_by_name(self, name):
         # type: (str) -> Union["Transformer","EquivalentTransformer"]
-        for transformer in self.transformers:
-            if transformer.name.strip() == name:
-                return transformer
-        for transformer in self.equivalent_transformers:
-            if transformer.name.strip() == name:
-                return transformer
+        transformer = self._lookup_first(
+            (("transformers", "transformers_by_name", _name_key),
+             ("equivalent_transformers", "equivalent_transformers_by_name",
+              _name_key)),
+            name)
+        if transformer is not None:
+            return transformer
         raise NpfException("Could not find transformer with name \"{}\""
                            .format(name))
 
-    @staticmethod
-    def _append_elements(contents, header, comment, elements):
-        # type: (list, str, str, list) -> None
-        contents.append(header)
-        contents.append(comment)
-        for element in elements:
-            contents.append(str(element))
-        contents.append("END\n")
+    def _adjacency(self):
+        # type: () -> _Adjacency
+        adjacency = self._indexes.get("adjacency")
+        if adjacency is None:
+            adjacency = _Adjacency(tuple(
+                ends for _, ends in _ADJACENCY_COLLECTIONS))
+            self._indexes["adjacency"] = adjacency
+        adjacency.refresh([getattr(self, collection)
+                           for collection, _ in _ADJACENCY_COLLECTIONS])
+        return adjacency
+
+    def incident(self, bus):
+        # type: (Union["Bus", int]) -> list
+        """Elements connected to a bus, given as a bus or its number.
+
+        These are the lines, transformers (including the legs of
+        three-winding transformers), CSCs, demands, generators, bus and
+        line shunts, SVCs and AC/DC converters at the bus, whatever their
+        status.
+        """
+        number = bus if isinstance(bus, int) else bus.number
+        return [element for element, _ in self._adjacency().pairs(number)]
+
+    def neighbors(self, bus):
+        # type: (Union["Bus", int]) -> list
+        """Buses at the other end of the branches connected to a bus, given
+        as a bus or its number, without repetitions."""
+        number = bus if isinstance(bus, int) else bus.number
+        buses = []
+        seen = set()
+        for _, other in self._adjacency().pairs(number):
+            if other is not None and other.number not in seen:
+                seen.add(other.number)
+                buses.append(other)
+        return buses
+
+    def islands(self, open_breakers=False, open_switches=False):
+        # type: (bool, bool) -> dict
+        """Island label of each AC bus, by bus number.
+
+        Buses are connected by the lines, transformers (including the legs
+        of three-winding transformers) and CSCs in service (stt), and
+        through DC buses by the DC lines and AC/DC converters in service,
+        so that buses joined only by a DC link share an island. Breaker and
+        switch lines are taken as open with open_breakers and
+        open_switches. Islands are labeled from 0, in the order of their
+        first bus in buses and middlepoint_buses.
+
+        See psr.npf.network. Requires NumPy and SciPy.
+        """
+        from .network import islands
+        return islands(self, open_breakers, open_switches)
+
+    def ybus(self, base_mva=MVABASE):
+        # type: (float) -> tuple
+        """Return the bus admittance matrix as a SciPy CSR matrix, and the
+        matrix row of each bus, by bus number.
+
+        See psr.npf.network. Requires NumPy and SciPy.
+        """
+        from .network import ybus
+        return ybus(self, base_mva)
+
+    def dc_power_flow(self, slack=None, base_mva=MVABASE):
+        # type: (Optional[Union[int, Iterable[int]]], float) -> object
+        """Return a psr.npf.dcflow.DcPowerFlow of the network, which keeps
+        the factorization of its susceptance matrix for any number of
+        solves. Requires NumPy and SciPy."""
+        from .dcflow import DcPowerFlow
+        return DcPowerFlow(self, slack, base_mva)
 
-    def __str__(self):
-        contents = ["NPF_REVISION", str(self.revision),
-                    "DESCRIPTION", self.description, ]
+    @staticmethod
+    def _write_elements(stream, header, comment, elements):
+        # type: (io.TextIOBase, str, str, list) -> None
+        stream.write("\n")
+        stream.write(header)
+        stream.write("\n")
+        stream.write(comment)
+        format_rows = getattr(elements, "format_rows", None)
+        if format_rows is not None:
+            # Columnar tables render their rows from the arrays.
+            for start in range(0, len(elements), _WRITE_CHUNK_SIZE):
+                stream.write("\n")
+                stream.write("\n".join(
+                    format_rows(start, start + _WRITE_CHUNK_SIZE)))
+            stream.write("\nEND\n")
+            return
+        elements = iter(elements)
+        while True:
+            chunk = list(itertools.islice(elements, _WRITE_CHUNK_SIZE))
+            if len(chunk) == 0:
+                break
+            stream.write("\n")
+            stream.write("\n".join(NpFile._format_rows(chunk)))
+        stream.write("\nEND\n")
 
-        header_elements_pairs = (
+    @staticmethod
+    def _format_rows(elements):
+        # type: (list) -> list
+        """Rows of a list of elements, formatted in bulk when they all are
+        of the same class and use its row layout."""
+        if len(elements) == 0:
+            return []
+        element_class = type(elements[0])
+        if element_class.__str__ is RecordType.__str__ and \
+                all([type(element) is element_class
+                     for element in elements]):
+            formatter = element_class.row_formatter()
+            if formatter is not None:
+                return formatter.format_records(elements)
+        return [str(element) for element in elements]
+
+    def _header_elements_pairs(self):
+        # type: () -> tuple
+        return (
             (System.header, System.comment, self.systems),
             (Region.header, Region.comment, self.regions),
             (Area.header, Area.comment, self.areas),
@@ -238,124 +726,673 @@ class NpFile:
              self.vsc_converters),
         )
 
-        for header, comment, elements in header_elements_pairs:
-            NpFile._append_elements(contents, header, comment, elements)
+    def write_to(self, stream, stats=None):
+        # type: (io.TextIOBase, Optional[NpfStats]) -> None
+        """Write the file contents to a text stream, section by section.
+
+        The time, records and size of each section are added to stats, if
+        given.
+        """
+        stream.write("NPF_REVISION\n")
+        stream.write(str(self.revision))
+        stream.write("\nDESCRIPTION\n")
+        stream.write(self.description)
+        if stats is None:
+            for header, comment, elements in self._header_elements_pairs():
+                NpFile._write_elements(stream, header, comment, elements)
+            return
+        stream = _CountingWriter(stream)
+        for header, comment, elements in self._header_elements_pairs():
+            start = time.perf_counter()
+            start_size = stream.size
+            NpFile._write_elements(stream, header, comment, elements)
+            stats.add_section(WRITE, header, time.perf_counter() - start,
+                              len(elements), stream.size - start_size)
+
+    def _record_count(self):
+        # type: () -> int
+        """Number of records of the collections loaded."""
+        count = 0
+        for collection in NpFile.COLLECTIONS:
+            elements = vars(self).get(collection)
+            if elements is not None:
+                count += len(elements)
+        return count
+
+    def fork(self):
+        # type: () -> "NpFile"
+        """Return a copy of the file that shares its elements.
+
+        Elements of the fork are views of the elements of this file, which
+        copy an element the first time it is written to; sections are
+        copied when they are changed otherwise (e.g. appended to). Forking
+        takes constant time and the fork only grows with its changes.
+        Each element of the fork is a single view, so elements of the fork
+        are not identical to those of this file. This file should not be
+        modified while its forks are in use, since they would see the
+        changes of the elements they did not copy. Copies and pickles of a
+        fork hold elements of their own. See psr.npf.fork.
+        """
+        from .fork import fork
+        return fork(self)
+
+    def _is_fork(self):
+        # type: () -> bool
+        return any(getattr(elements, "forked", False)
+                   for elements in vars(self).values())
 
-        return "\n".join(contents)
+    def __str__(self):
+        contents = io.StringIO()
+        self.write_to(contents)
+        return contents.getvalue()
 
     @staticmethod
     def _is_comment(line):
         # type: (str) -> bool
         return len(line) == 0 or (len(line) > 0 and line[0] == "#")
 
+    def to_columnar(self):
+        # type: () -> None
+        """Store buses, lines and transformers as NumPy columnar tables.
+
+        See psr.npf.columnar. Requires NumPy. A fork stops sharing its
+        elements with its parent.
+        """
+        from .columnar import to_columnar
+        if self._is_fork():
+            from .fork import detached_sections
+            for collection, records in detached_sections(self).items():
+                setattr(self, collection, records)
+        to_columnar(self)
+
+    def to_frames(self, collections=None):
+        # type: (Optional[Iterable[str]]) -> dict
+        """Return a pandas DataFrame of each section, by collection name.
+
+        References are exported as the key columns of the elements they
+        refer to, e.g. bus_number. Numeric columns of columnar tables are
+        not copied. The revision and description are kept in the attrs of
+        every frame. See psr.npf.frames. Requires pandas.
+        """
+        from .frames import to_frames
+        return to_frames(self, collections)
+
+    @staticmethod
+    def from_frames(frames, columnar=False):
+        # type: (dict, bool) -> "NpFile"
+        """Build an NpFile from DataFrames of its sections, by collection
+        name, as returned by to_frames.
+
+        Missing columns take the default values of the records. With
+        columnar=True, buses, lines and transformers are stored as
+        columnar tables on the frame arrays. Requires pandas.
+        """
+        from .frames import from_frames
+        return from_frames(frames, columnar)
+
+    def to_arrow(self, collections=None):
+        # type: (Optional[Iterable[str]]) -> dict
+        """Return a pyarrow.Table of each section, by collection name, with
+        the columns of to_frames. Requires PyArrow."""
+        from .frames import to_arrow
+        return to_arrow(self, collections)
+
+    @staticmethod
+    def from_arrow(tables, columnar=False):
+        # type: (dict, bool) -> "NpFile"
+        """Build an NpFile from Arrow tables of its sections, as returned
+        by to_arrow. Requires PyArrow."""
+        from .frames import from_arrow
+        return from_arrow(tables, columnar)
+
+    def save_arrow(self, directory, file_format="ipc", compression=None):
+        # type: (str, str, Optional[str]) -> None
+        """Write each section to an Arrow IPC ("ipc") or Parquet
+        ("parquet") file of a directory. See psr.npf.arrowio. Requires
+        PyArrow."""
+        from .arrowio import save
+        save(self, directory, file_format, compression)
+
     @staticmethod
-    def from_file(file_path):
-        # type: (str) -> "NpFile"
+    def load_arrow(directory, columnar=False, lazy=True, file_format=None):
+        # type: (str, bool, bool, Optional[str]) -> "NpFile"
+        """Read a directory written by save_arrow.
+
+        IPC files are memory-mapped, and with lazy=True each section is
+        only read the first time its collection is accessed. With
+        columnar=True buses, lines and transformers are stored as columnar
+        tables whose numeric columns are views of the mapped files.
+        Requires PyArrow.
+        """
+        from .arrowio import load
+        return load(directory, columnar, lazy, file_format)
+
+    @staticmethod
+    def from_file(file_path,  # type: str
+                  columnar=False,  # type: bool
+                  lazy=False,  # type: bool
+                  deferred=False,  # type: bool
+                  workers=None,  # type: Union[None, int, Executor]
+                  cache=False,  # type: Union[bool, SnapshotCache]
+                  stats=None,  # type: Optional[NpfStats]
+                  ):
+        # type: (...) -> "NpFile"
+        """Read an NPF file.
+
+        With lazy=True the file is only scanned for the position of its
+        sections, and each section is parsed the first time its collection
+        is accessed. Sections it refers to (e.g. SYSTEM, AREA and REGION
+        for BUS) are loaded on demand by the lookups of the parser.
+
+        With deferred=True all sections are parsed first, keeping the
+        numbers and names of referenced elements, and the references are
+        resolved afterwards in a single linking pass. Sections may then
+        appear in any order in the file.
+
+        With workers > 1 sections, and chunks of large sections, are parsed
+        in deferred mode by a pool of that many processes. The references
+        are linked in this process once all chunks are parsed. workers may
+        also be a concurrent.futures.ProcessPoolExecutor, which is used
+        instead of a new pool.
+
+        Files compressed with gzip, bzip2 or xz are decompressed on the fly.
+        They are parsed in this process even if workers > 1, and lazy loads
+        decompress them from the start to reach each section.
+
+        With cache=True, or a SnapshotCache, the parsed file is stored as a
+        binary snapshot (in a size-bounded user cache directory by
+        default) and later loads use the snapshot while the file is
+        unchanged. Cached loads are never lazy.
+
+        With an NpfStats as stats, the time, records and size of the whole
+        file and of each section, and the calls and time of the lookups,
+        are added to it.
+        """
+        if stats is None:
+            return NpFile._read_file(file_path, columnar, lazy, deferred,
+                                     workers, cache, None)
+        start = time.perf_counter()
+        data = NpFile._read_file(file_path, columnar, lazy, deferred,
+                                 workers, cache, stats)
+        stats.add_operation(READ, time.perf_counter() - start,
+                            data._record_count(), os.path.getsize(file_path))
+        return data
+
+    @staticmethod
+    def _read_file(file_path,  # type: str
+                   columnar,  # type: bool
+                   lazy,  # type: bool
+                   deferred,  # type: bool
+                   workers,  # type: Union[None, int, Executor]
+                   cache,  # type: Union[bool, SnapshotCache]
+                   stats,  # type: Optional[NpfStats]
+                   ):
+        # type: (...) -> "NpFile"
+        if cache:
+            snapshots = cache if isinstance(cache, SnapshotCache) \
+                else SnapshotCache()
+            # Taken before parsing, so that a file that changes meanwhile
+            # is not cached under the key of its new contents.
+            key = snapshots.source_key(file_path)
+            data = snapshots.load(file_path, key)
+            if not isinstance(data, NpFile):
+                data = NpFile._read_file(file_path, False, False, deferred,
+                                         workers, False, stats)
+                snapshots.store(file_path, data, key)
+            if columnar:
+                data.to_columnar()
+            return data
+
         data = NpFile()
-        with open(file_path, "r") as data_file:
-            while True:
-                original_line = data_file.readline()
-                line = original_line.strip()
-                if len(original_line) == 0:
-                    break
-                elif NpFile._is_comment(line):
-                    continue
-                elif line == "NPF_REVISION":
-                    rev_str = data_file.readline().strip()
-                    data.revision = int(rev_str)
-                elif line == "DESCRIPTION":
-                    data.description = data_file.readline().strip()
-                elif line == "BUS":
-                    buses = data._parse_until_end(Bus, data_file)
-                    data.buses.extend(buses)
-                elif line == "MIDDLEPOINT_BUS":
-                    buses = data._parse_until_end(MiddlePointBus, data_file)
-                    data.middlepoint_buses.extend(buses)
-                elif line == "AREA":
-                    areas = data._parse_until_end(Area, data_file)
-                    data.areas.extend(areas)
-                elif line == "REGION":
-                    regions = data._parse_until_end(Region, data_file)
-                    data.regions.extend(regions)
-                elif line == "OWNER":
-                    owners = data._parse_until_end(Owner, data_file)
-                    data.owners.extend(owners)
-                elif line == "SYSTEM":
-                    systems = data._parse_until_end(System, data_file)
-                    data.systems.extend(systems)
-                elif line == "DEMAND":
-                    demands = data._parse_until_end(Demand, data_file)
-                    data.demands.extend(demands)
-                elif line == "GENERATOR":
-                    generators = data._parse_until_end(Generator, data_file)
-                    data.generators.extend(generators)
-                elif line == "BUS_SHUNT":
-                    bus_shunts = data._parse_until_end(BusShunt, data_file)
-                    data.bus_shunts.extend(bus_shunts)
-                elif line == "LINE":
-                    lines = data._parse_until_end(Line, data_file)
-                    data.lines.extend(lines)
-                elif line == "LINE_SHUNT":
-                    shunts = data._parse_until_end(LineShunt, data_file)
-                    data.line_shunts.extend(shunts)
-                elif line == "TRANSFORMER":
-                    transformers = data._parse_until_end(Transformer,
-                                                         data_file)
-                    data.transformers.extend(transformers)
-                elif line == "EQUIVALENT_TRANSFORMER":
-                    transformers = data._parse_until_end(
-                        EquivalentTransformer, data_file)
-                    data.equivalent_transformers.extend(transformers)
-                elif line == "THREE_WINDING_TRANSFORMER":
-                    transformers = data._parse_until_end(
-                        ThreeWindingTransformer, data_file)
-                    data.three_winding_transformers.extend(transformers)
-                elif line == "CSC":
-                    capacitors = data._parse_until_end(
-                        ControlledSeriesCapacitor, data_file)
-                    data.cscs.extend(capacitors)
-                elif line == "SVC":
-                    svcs = data._parse_until_end(
-                        StaticVarCompensator, data_file)
-                    data.svcs.extend(svcs)
-                elif line == "DC_LINK":
-                    links = data._parse_until_end(DcLink, data_file)
-                    data.dclinks.extend(links)
-                elif line == "DC_BUS":
-                    buses = data._parse_until_end(DcBus, data_file)
-                    data.dcbuses.extend(buses)
-                elif line == "DC_LINE":
-                    lines = data._parse_until_end(DcLine, data_file)
-                    data.dclines.extend(lines)
-                elif line == "ACDC_CONVERTER_LCC":
-                    converters = data._parse_until_end(AcDcConverterLcc,
-                                                       data_file)
-                    data.lcc_converters.extend(converters)
-                elif line == "ACDC_CONVERTER_VSC":
-                    converters = data._parse_until_end(AcDcConverterVsc,
-                                                       data_file)
-                    data.vsc_converters.extend(converters)
+        if lazy:
+            data._lazy = _SectionOffsets(file_path, stats)
+            data._lazy.scan(data)
+            for collection in data._lazy.collections():
+                delattr(data, collection)
+        elif _is_parallel(workers) and _compression(file_path, "r") is None:
+            data._read_parallel(file_path, workers, stats)
+        else:
+            # The string table of the interned fields lives as long as the
+            # parse, see RecordType.interned_fields.
+            strings = {}  # type: dict
+            with _open(file_path, "r") as data_file:
+                if stats is not None:
+                    data_file = _CountingReader(data_file)
+                if deferred or _is_parallel(workers):
+                    data._read_sections(data_file, _DeferredReferences(),
+                                        stats, strings)
+                    data._link_references(stats)
                 else:
-                    raise NpfException("Could not parse line:\n{}".format(line))
+                    references = data if stats is None \
+                        else _TimedLookups(data, stats)
+                    data._read_sections(data_file, references, stats,
+                                        strings)
+        if columnar:
+            data.to_columnar()
         return data
 
-    def _parse_until_end(self, element_class, data_file):
-        elements = []
+    def _read_sections(self,
+                       data_file,  # type: io.TextIOBase
+                       references,  # type: object
+                       stats=None,  # type: Optional[NpfStats]
+                       strings=None,  # type: Optional[dict]
+                       ):
+        # type: (...) -> None
+        """Parse the sections of a file, interning strings through the
+        strings table, if given."""
         while True:
             original_line = data_file.readline()
             line = original_line.strip()
-            if line == "END" or len(original_line) == 0:
+            if len(original_line) == 0:
                 break
             elif NpFile._is_comment(line):
                 continue
+            elif line == "NPF_REVISION":
+                rev_str = data_file.readline().strip()
+                self.revision = int(rev_str)
+            elif line == "DESCRIPTION":
+                self.description = data_file.readline().strip()
+            elif line in _SECTION_TYPES:
+                element_class, collection = _SECTION_TYPES[line]
+                if stats is not None:
+                    start = time.perf_counter()
+                    start_size = data_file.size
+                elements = NpFile._parse_rows(references, element_class,
+                                              data_file, strings=strings)
+                getattr(self, collection).extend(elements)
+                if stats is not None:
+                    stats.add_section(READ, line, time.perf_counter() - start,
+                                      len(elements),
+                                      data_file.size - start_size)
             else:
-                elements.append(element_class.read_from_str(self, line))
+                raise NpfException("Could not parse line:\n{}".format(line))
+
+    def _read_parallel(self, file_path, workers, stats=None):
+        # type: (str, Union[int, Executor], Optional[NpfStats]) -> None
+        offsets = _SectionOffsets(file_path)
+        offsets.scan(self, _PARALLEL_CHUNK_ROWS)
+        parse_times = {}
+        strings = {}  # type: dict
+        if isinstance(workers, concurrent.futures.Executor):
+            pool = contextlib.nullcontext(workers)
+        else:
+            pool = concurrent.futures.ProcessPoolExecutor(workers)
+        with pool as executor:
+            futures = [(collection,
+                        executor.submit(_parse_chunk, file_path, collection,
+                                        offset, rows))
+                       for collection, offset, rows in offsets.chunks()]
+            for collection, future in futures:
+                elements, seconds = future.result()
+                # Chunks are interned by the workers, and again here to
+                # share strings between chunks.
+                _intern_fields(elements, _COLLECTION_TYPES[collection],
+                               strings)
+                getattr(self, collection).extend(elements)
+                parse_times[collection] = \
+                    parse_times.get(collection, 0.0) + seconds
+        if stats is not None:
+            for collection, seconds in parse_times.items():
+                stats.add_section(READ, _COLLECTION_TYPES[collection].header,
+                                  seconds, len(getattr(self, collection)),
+                                  offsets.section_size(collection))
+        self._link_references(stats)
+
+    def _link_references(self, stats=None):
+        # type: (Optional[NpfStats]) -> None
+        """Resolve the pending references left by a deferred parse."""
+        lookups = self if stats is None else _TimedLookups(self, stats)
+        # Collections are linked in order, lines before the line shunts
+        # that are looked up by their buses.
+        resolved = {}
+        for collection in NpFile.COLLECTIONS:
+            elements = vars(self).get(collection)
+            if elements:
+                _resolve_references(lookups, elements, resolved)
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, which are the collections of
+        # a lazily loaded file that were not accessed yet.
+        lazy = self.__dict__.get("_lazy")
+        if lazy is not None and lazy.has_section(name):
+            lazy.load(self, name)
+            return getattr(self, name)
+        raise AttributeError("'{}' object has no attribute '{}'"
+                             .format(type(self).__name__, name))
+
+    def __getstate__(self):
+        lazy = self.__dict__.get("_lazy")
+        if lazy is not None:
+            for collection in lazy.collections():
+                lazy.load(self, collection)
+        state = self.__dict__.copy()
+        if self._is_fork():
+            from .fork import detached_sections
+            # Copies of forks are files of their own.
+            state.update(detached_sections(self))
+            state["_indexes"] = {}
+        state["_lazy"] = None
+        return state
+
+    @staticmethod
+    def _section_lines(data_file, rows=None):
+        # type: (io.TextIOBase, Optional[int]) -> Iterator[str]
+        """Yield the record lines of a section up to its END line, or up to
+        a number of records."""
+        for original_line in data_file:
+            line = original_line.strip()
+            if line == "END":
+                break
+            elif not NpFile._is_comment(line):
+                yield line
+                if rows is not None:
+                    rows -= 1
+                    if rows == 0:
+                        break
+
+    @staticmethod
+    def _parse_rows(references, element_class, data_file, rows=None,
+                    strings=None):
+        # type: (object, type, TextIO, Optional[int], Optional[dict]) -> list
+        """Parse a section, resolving references through references and
+        interning strings through the strings table, if given."""
+        read_from_row = element_class.read_from_row
+        lines = NpFile._section_lines(data_file, rows)
+        elements = [read_from_row(references, row)
+                    for row in csv.reader(lines)]
+        if strings is not None:
+            _intern_fields(elements, element_class, strings)
         return elements
 
-    def save(self, file_path):
-        # type: (str) -> None
-        with open(file_path, "w") as np_file:
-            np_file.write(str(self))
+    def _parse_until_end(self, element_class, data_file):
+        return NpFile._parse_rows(self, element_class, data_file)
+
+    def save(self, file_path, stats=None):
+        # type: (str, Optional[NpfStats]) -> None
+        """Write the file, compressed if its name ends with .gz, .bz2 or
+        .xz.
+
+        The time, records and size of the file and of each section are
+        added to stats, if given.
+        """
+        start = time.perf_counter()
+        with _open(file_path, "w", _WRITE_BUFFER_SIZE) as np_file:
+            self.write_to(np_file, stats)
+        if stats is not None:
+            stats.add_operation(WRITE, time.perf_counter() - start,
+                                self._record_count(),
+                                os.path.getsize(file_path))
+
+    @staticmethod
+    def aload(file_path, pool=None, **options):
+        # type: (str, Optional["AsyncPool"], ...) -> Awaitable["NpFile"]
+        """Read an NPF file without blocking the asyncio event loop.
+
+        Returns an awaitable; options are those of from_file. The file is
+        parsed by the worker processes of pool (an AsyncPool, by default
+        a shared one of psr.npf.aio), which also limits the number of
+        concurrent loads and saves.
+        """
+        from .aio import default_pool
+        return (pool or default_pool()).load(file_path, **options)
+
+    def asave(self,
+              file_path,  # type: str
+              pool=None,  # type: Optional["AsyncPool"]
+              stats=None,  # type: Optional[NpfStats]
+              ):
+        # type: (...) -> Awaitable[None]
+        """Write the file without blocking the asyncio event loop.
+
+        Returns an awaitable. The file is formatted and written by a
+        thread of pool, see aload. Elements must not be modified until it
+        completes.
+        """
+        from .aio import default_pool
+        return (pool or default_pool()).save(self, file_path, stats)
+
+
+def iter_records(file_path, sections=None):
+    # type: (str, Optional[Iterable[str]]) -> Iterator["RecordType"]
+    """Yield the records of an NPF file one at a time, in file order.
+
+    sections restricts the records to those of the given section headers,
+    e.g. ("LINE",). Records are parsed as they are yielded and not kept.
+    Only the sections they refer to (e.g. BUS for LINE, and the SYSTEM,
+    AREA and REGION sections that buses refer to) are held in memory, as
+    lookup tables parsed the first time a record needs them. Referenced
+    records are therefore distinct from the yielded ones.
+    """
+    if sections is not None:
+        sections = set(sections)
+        for header in sections:
+            if header not in _SECTION_TYPES:
+                raise NpfException("Unknown section {}".format(header))
+    lookups = NpFile.from_file(file_path, lazy=True)
+    chunks = sorted(
+        (offset, collection)
+        for collection, offset, _ in lookups._lazy.chunks()
+        if sections is None or
+        _COLLECTION_TYPES[collection].header in sections)
+    with _open(file_path, "r") as data_file:
+        for offset, collection in chunks:
+            read_from_row = _COLLECTION_TYPES[collection].read_from_row
+            data_file.seek(offset)
+            lines = NpFile._section_lines(data_file)
+            for row in csv.reader(lines):
+                yield read_from_row(lookups, row)
+
+
+class _PendingReference(object):
+    """Reference left unresolved by a deferred parse."""
+    __slots__ = ("finder", "key")
+
+    def __init__(self, finder, key):
+        # type: (str, tuple) -> None
+        # Name of the NpFile lookup method and its arguments.
+        self.finder = finder
+        self.key = key
+
+    def __repr__(self):
+        return "<{}{}>".format(self.finder, self.key)
+
+
+class _DeferredReferences(object):
+    """Stands in for the NpFile while parsing in deferred mode.
+
+    Its lookups return pending references instead of elements, so that
+    sections can be parsed without the sections they refer to. Repeated
+    lookups return the same pending reference, which is resolved once.
+    """
+    def __init__(self):
+        self._pending = {}
+
+    def __getattr__(self, name):
+        if not name.startswith("find_"):
+            raise AttributeError(name)
+        pending = self._pending
+
+        def find(*key):
+            reference = pending.get((name, key))
+            if reference is None:
+                reference = _PendingReference(name, key)
+                pending[(name, key)] = reference
+            return reference
+        setattr(self, name, find)
+        return find
+
+
+def _resolve_references(data, elements, resolved):
+    # type: (object, list, dict) -> None
+    """Replace the pending references of elements by the elements found.
+
+    resolved maps the pending references already resolved to their
+    elements.
+    """
+    for element in elements:
+        for field in element.reference_fields:
+            value = getattr(element, field)
+            if type(value) is _PendingReference:
+                if value in resolved:
+                    target = resolved[value]
+                else:
+                    target = getattr(data, value.finder)(*value.key)
+                    resolved[value] = target
+                setattr(element, field, target)
+
+
+class _SectionOffsets(object):
+    """Positions of the sections of an NPF file that were not parsed yet.
+
+    Sections may be split in chunks of a maximum number of records, which
+    can be parsed independently.
+    """
+    def __init__(self, file_path, stats=None):
+        # type: (str, Optional[NpfStats]) -> None
+        self.file_path = file_path
+        # Receives the timings of the sections parsed by load().
+        self.stats = stats
+        # (offset, maximum number of records) of the chunks of each
+        # collection. The last chunk of a section ends at its END line.
+        self._chunks = {}
+        # Size in bytes of the sections of each collection.
+        self._sizes = {}
+        # String table of the interned fields, shared by the sections
+        # until the last one is parsed.
+        self._strings = {}
+
+    def scan(self, data, chunk_rows=None):
+        # type: (NpFile, Optional[int]) -> None
+        """Record the section positions and read the file header."""
+        encoding = locale.getpreferredencoding(False)
+        with _open(self.file_path, "rb") as data_file:
+            offset = 0
+            for original_line in data_file:
+                offset += len(original_line)
+                line = original_line.strip().decode(encoding)
+                if NpFile._is_comment(line):
+                    continue
+                elif line == "NPF_REVISION" or line == "DESCRIPTION":
+                    value_line = data_file.readline()
+                    offset += len(value_line)
+                    value = value_line.strip().decode(encoding)
+                    if line == "NPF_REVISION":
+                        data.revision = int(value)
+                    else:
+                        data.description = value
+                elif line in _SECTION_TYPES:
+                    _, collection = _SECTION_TYPES[line]
+                    chunks = self._chunks.setdefault(collection, [])
+                    section_start = start = offset
+                    rows = 0
+                    for section_line in data_file:
+                        offset += len(section_line)
+                        section_line = section_line.strip()
+                        if section_line == b"END":
+                            break
+                        elif chunk_rows is not None and \
+                                len(section_line) > 0 and \
+                                section_line[:1] != b"#":
+                            rows += 1
+                            if rows == chunk_rows:
+                                chunks.append((start, rows))
+                                start = offset
+                                rows = 0
+                    chunks.append((start, None))
+                    self._sizes[collection] = self._sizes.get(
+                        collection, 0) + offset - section_start
+                else:
+                    raise NpfException("Could not parse line:\n{}"
+                                       .format(line))
+
+    def collections(self):
+        # type: () -> list
+        """Collections whose sections were not parsed yet."""
+        return list(self._chunks.keys())
+
+    def has_section(self, collection):
+        # type: (str) -> bool
+        return collection in self._chunks
+
+    def section_size(self, collection):
+        # type: (str) -> int
+        """Size in bytes of the sections of a collection."""
+        return self._sizes.get(collection, 0)
+
+    def chunks(self):
+        # type: () -> Iterator[tuple]
+        """Yield the collection, offset and size of every chunk."""
+        for collection, chunks in self._chunks.items():
+            for offset, rows in chunks:
+                yield collection, offset, rows
+
+    def load(self, data, collection):
+        # type: (NpFile, str) -> None
+        """Parse the sections of a collection into the NpFile.
+
+        The section stays pending if parsing fails, so that it is parsed
+        again, and fails again, on the next access.
+        """
+        chunks = self._chunks.get(collection)
+        if chunks is None:
+            return
+        element_class = _COLLECTION_TYPES[collection]
+        references = data if self.stats is None \
+            else _TimedLookups(data, self.stats)
+        start = time.perf_counter()
+        elements = []
+        with _open(self.file_path, "r") as data_file:
+            for offset, rows in chunks:
+                data_file.seek(offset)
+                elements.extend(NpFile._parse_rows(references, element_class,
+                                                   data_file, rows,
+                                                   self._strings))
+        del self._chunks[collection]
+        setattr(data, collection, elements)
+        if len(self._chunks) == 0:
+            self._strings = {}
+        if self.stats is not None:
+            self.stats.add_section(READ, element_class.header,
+                                   time.perf_counter() - start,
+                                   len(elements),
+                                   self.section_size(collection))
+
+
+def _is_parallel(workers):
+    # type: (Union[None, int, Executor]) -> bool
+    """Whether the workers option of NpFile.from_file asks for a parallel
+    parse."""
+    return isinstance(workers, concurrent.futures.Executor) or \
+        (workers is not None and workers > 1)
+
+
+def _parse_chunk(file_path, collection, offset, rows):
+    # type: (str, str, int, Optional[int]) -> tuple
+    """Parse a chunk of a section leaving its references pending.
+
+    Runs in the worker processes of a parallel load. Returns the elements
+    and the time taken to parse them.
+    """
+    start = time.perf_counter()
+    element_class = _COLLECTION_TYPES[collection]
+    with _open(file_path, "r") as data_file:
+        data_file.seek(offset)
+        elements = NpFile._parse_rows(_DeferredReferences(), element_class,
+                                      data_file, rows, {})
+    return elements, time.perf_counter() - start
+
+
+def _intern_fields(elements, element_class, strings):
+    # type: (list, type, dict) -> None
+    """Replace the interned fields of elements by the equal strings of a
+    string table, adding the new ones to it."""
+    setdefault = strings.setdefault
+    for name in element_class.interned_fields:
+        values = list(map(operator.attrgetter(name), elements))
+        for element, value, interned in zip(elements, values,
+                                            map(setdefault, values, values)):
+            if interned is not value:
+                setattr(element, name, interned)
 
 
 def _to_str(value):
@@ -374,33 +1411,240 @@ else:
         return next(csv.reader(io.StringIO(line.decode("utf-8"))))
 
 
+# str.format specifications allowed in row layouts: [width][.precision]type.
+_ROW_SPEC_PATTERN = re.compile(r"^(\d*)(\.\d+)?([dfs])$")
+
+# Value types that printf-style templates format exactly as str.format
+# does, by conversion type. Other values (e.g. a float for d, or None for
+# s, which printf accepts and str.format rejects) go through str.format.
+_PRINTF_TYPES = {
+    "d": frozenset((int, bool)),
+    "f": frozenset((int, float, bool)),
+    "s": frozenset((str,)),
+}
+
+
+def _printf_layout(row_format):
+    # type: (str) -> tuple
+    """Translate a str.format row layout to a printf-style template, which
+    is faster to apply, and the conversion type of each of its fields."""
+    parts = []
+    kinds = []
+    for literal, field, spec, conversion in \
+            string.Formatter().parse(row_format):
+        parts.append(literal.replace("%", "%%"))
+        if field is None:
+            continue
+        match = _ROW_SPEC_PATTERN.match(spec) \
+            if field == "" and conversion is None else None
+        if match is None:
+            raise NpfException("Unsupported row format field {{{}:{}}}"
+                               .format(field, spec))
+        width, precision, kind = match.groups()
+        # Strings are left aligned by str.format.
+        parts.append("%" + ("-" if kind == "s" else "") + width +
+                     (precision or "") + kind)
+        kinds.append(kind)
+    return "".join(parts), tuple(kinds)
+
+
+def _path_getter(path, default):
+    # type: (tuple, object) -> Callable[[object], object]
+    """Getter of a dotted attribute path, returning default when a
+    reference along the path is None."""
+    first = operator.attrgetter(path[0])
+    if len(path) == 1:
+        return first
+    rest = _path_getter(path[1:], default)
+
+    def get(record):
+        value = first(record)
+        return default if value is None else rest(value)
+    return get
+
+
+def _row_getter(path, default):
+    # type: (tuple, object) -> Callable[[object], object]
+    """Getter of a dotted attribute path of a row field, returning default
+    when its first reference is None; references further along the path
+    must be set."""
+    first = operator.attrgetter(path[0])
+    if len(path) == 1:
+        return first
+    rest = operator.attrgetter(".".join(path[1:]))
+
+    def get(record):
+        value = first(record)
+        return default if value is None else rest(value)
+    return get
+
+
+def _stripped(name):
+    # type: (str) -> Callable[[object], str]
+    """Row field getter of a text field written without surrounding
+    blanks."""
+    get = operator.attrgetter(name)
+
+    def stripped(record):
+        return get(record).strip()
+    return stripped
+
+
+def _deprecated_alias(old_name, name):
+    # type: (str, str) -> property
+    """Property of a former field name that reads and writes its current
+    field, with a DeprecationWarning."""
+    message = "{} is deprecated, use {}".format(old_name, name)
+
+    def get(record):
+        warnings.warn(message, DeprecationWarning, stacklevel=2)
+        return getattr(record, name)
+
+    def set_(record, value):
+        warnings.warn(message, DeprecationWarning, stacklevel=2)
+        setattr(record, name, value)
+    return property(get, set_, doc=message)
+
+
+class _RowFormatter(object):
+    """Renders records as rows of the row_format layout of their class.
+
+    Fields given as dotted paths (e.g. "bus.number") default to 0, or ""
+    for text fields, when their first reference is None. Rows are
+    formatted with a printf-style template when every value has a type it
+    formats as str.format would, and with row_format otherwise, so that
+    values of the wrong type raise the errors of str.format.
+    """
+    def __init__(self, row_format, row_fields):
+        # type: (str, tuple) -> None
+        self.row_format = row_format
+        self.template, kinds = _printf_layout(row_format)
+        if len(kinds) != len(row_fields):
+            raise NpfException("Row format has {} fields, {} given"
+                               .format(len(kinds), len(row_fields)))
+        self.fields = row_fields
+        self.types = tuple(_PRINTF_TYPES[kind] for kind in kinds)
+        self.defaults = tuple("" if kind == "s" else 0 for kind in kinds)
+        self.getters = tuple(
+            field if callable(field)
+            else _row_getter(tuple(field.split(".")), default)
+            for field, default in zip(row_fields, self.defaults))
+
+    def format_record(self, record):
+        # type: (RecordType) -> str
+        values = tuple([get(record) for get in self.getters])
+        for value, types in zip(values, self.types):
+            if type(value) not in types:
+                return self.row_format.format(*values)
+        return self.template % values
+
+    def format_columns(self, columns):
+        # type: (list) -> list
+        """Rows of the values of each field, given as one list per field."""
+        for column, types in zip(columns, self.types):
+            if not types.issuperset(map(type, column)):
+                row_format = self.row_format
+                return [row_format.format(*row) for row in zip(*columns)]
+        template = self.template
+        return [template % row for row in zip(*columns)]
+
+    def format_records(self, records):
+        # type: (list) -> list
+        """Rows of a list of records, gathered one field at a time."""
+        return self.format_columns([list(map(get, records))
+                                    for get in self.getters])
+
+
 class RecordType(object):
     header = ""
     comment = ""
 
+    # Fields holding references to other elements.
+    reference_fields = ()
+    # Text fields whose values repeat across records (codes such as op or
+    # date, and names), shared through a string table while a file is
+    # parsed.
+    interned_fields = ()
+    # str.format layout of the record line in NPF files, and the fields (or
+    # dotted paths through references, or getters) that fill it. Without a
+    # layout, records are written as a plain CSV line of their fields.
+    row_format = ""
+    row_fields = ()
+    __slots__ = ("tag",)
+
     def __init__(self):
         # Custom data associated with the element.
         self.tag = None
 
+    @classmethod
+    def field_names(cls):
+        # type: () -> tuple
+        """Names of the record fields, base class fields first."""
+        names = cls.__dict__.get("_field_names")
+        if names is None:
+            names = []
+            for klass in reversed(cls.__mro__):
+                for name in klass.__dict__.get("__slots__", ()):
+                    if name not in names:
+                        names.append(name)
+            names = tuple(names)
+            cls._field_names = names
+        return names
+
+    def __getstate__(self):
+        # Pickle records as a tuple of their field values, in field_names()
+        # order, which is more compact than the default slots dictionary.
+        getter = type(self).__dict__.get("_field_getter")
+        if getter is None:
+            getter = operator.attrgetter(*self.field_names())
+            type(self)._field_getter = getter
+        values = getter(self)
+        return values if isinstance(values, tuple) else (values,)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.field_names(), state):
+            setattr(self, name, value)
+
+    @classmethod
+    def row_formatter(cls):
+        # type: () -> Optional[_RowFormatter]
+        """Formatter of the row_format layout, None without a layout."""
+        formatter = cls.__dict__.get("_row_formatter")
+        if formatter is None and len(cls.row_format) > 0:
+            formatter = _RowFormatter(cls.row_format, cls.row_fields)
+            cls._row_formatter = formatter
+        return formatter
+
     def __str__(self):
+        formatter = self.row_formatter()
+        if formatter is not None:
+            return formatter.format_record(self)
         values = []
-        for var, value in vars(self).items():
-            if var != "header" and var != "comment":
-                # TODO: values that are string already should be escaped with
-                #  quotes.
-                values.append(_to_str(value))
+        for var in self.field_names():
+            # TODO: values that are string already should be escaped with
+            #  quotes.
+            values.append(_to_str(getattr(self, var, None)))
         return ",".join(values)
 
     def __repr__(self):
         return self.__str__()
 
-    @staticmethod
-    def read_from_str(data, line):
+    @classmethod
+    def read_from_str(cls, data, line):
         # type: ("NpFile", str) -> "RecordType"
+        return cls.read_from_row(data, _to_csv_list(line))
+
+    @staticmethod
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "RecordType"
         return RecordType()
 
 
 class SeriesType(RecordType):
+    reference_fields = ("from_bus", "to_bus")
+    interned_fields = ("op", "metering_end", "date", "cnd")
+    __slots__ = ("from_bus", "to_bus", "parallel_circuit_number")
+
     def __init__(self):
         super(SeriesType, self).__init__()
         self.from_bus = None
@@ -419,6 +1663,10 @@ class System(RecordType):
     header = "SYSTEM"
     comment = "# \"ID\",\"[.......Name.......]\",System#"
 
+    row_format = "  \"{:2s}\",\"{:20s}\",{:7d}"
+    row_fields = ("id", "name", "number")
+    __slots__ = ("id", "name", "number")
+
     def __init__(self):
         super(System, self).__init__()
         # Two-characters system unique identifier.
@@ -428,15 +1676,11 @@ class System(RecordType):
         # Unique system number.
         self.number = 0
 
-    def __str__(self):
-        args = [self.id, self.name, self.number, ]
-        return "  \"{:2s}\",\"{:20s}\",{:7d}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "System"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "System"
         obj = System()
-        obj.id, obj.name, number_str = _to_csv_list(line)
+        obj.id, obj.name, number_str = row
         obj.number = int(number_str)
         return obj
 
@@ -447,6 +1691,11 @@ class Region(RecordType):
     comment = "# [ID],\"[........Name......]\",Region#,System#," \
               "\"SystemID\""
 
+    reference_fields = ("system",)
+    row_format = "  \"{:2s}\",\"{:12s}\",{:7d},{:7d},\"{:2s}\""
+    row_fields = ("id", "name", "number", "system.number", "system.id")
+    __slots__ = ("id", "name", "number", "system")
+
     def __init__(self):
         super(Region, self).__init__()
         # Two-characters unique region identifier.
@@ -458,19 +1707,12 @@ class Region(RecordType):
         # System the region is part of.
         self.system = None
 
-    def __str__(self):
-        system_number = self.system.number if self.system is not None else 0
-        system_id = self.system.id if self.system is not None else ""
-        args = [self.id, self.name, self.number, system_number,
-                system_id]
-        return "  \"{:2s}\",\"{:12s}\",{:7d},{:7d},\"{:2s}\"".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Region"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Region"
         obj = Region()
         obj.id, obj.name, number_str, system_number_str,\
-            system_id = _to_csv_list(line)
+            system_id = row
         obj.number = int(number_str)
         obj.system = data.find_system(int(system_number_str))
         return obj
@@ -483,6 +1725,12 @@ class Area(RecordType):
         "# \"[ID]\",\"[.............Area Name............]\",Area#," \
         "System#,\"SystemID\""
 
+    reference_fields = ("system",)
+    interned_fields = ("name",)
+    row_format = "  \"{:4s}\",\"{:36s}\",{:5d},{:7d},\"{:2s}\""
+    row_fields = ("id", "name", "number", "system.number", "system.id")
+    __slots__ = ("id", "name", "number", "system")
+
     def __init__(self):
         super(Area, self).__init__()
         # 4-characters unique area identifier.
@@ -494,19 +1742,12 @@ class Area(RecordType):
         # System the region is part of.
         self.system = None
 
-    def __str__(self):
-        system_number = self.system.number if self.system is not None else 0
-        system_id = self.system.id if self.system is not None else ""
-        args = [self.id, self.name, self.number, system_number,
-                system_id]
-        return "  \"{:4s}\",\"{:36s}\",{:5d},{:7d},\"{:2s}\"".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Area"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Area"
         obj = Area()
         obj.id, obj.name, number_str, system_number_str,\
-            system_id = _to_csv_list(line)
+            system_id = row
         obj.number = int(number_str)
         obj.system = data.find_system(int(system_number_str))
         return obj
@@ -517,19 +1758,20 @@ class Owner(RecordType):
     header = "OWNER"
     comment = "# Owner#,\"[...Name...]\""
 
+    row_format = "{:6d},\"{:s}\""
+    row_fields = ("number", "name")
+    __slots__ = ("number", "name")
+
     def __init__(self):
         super(Owner, self).__init__()
         self.number = 0
         self.name = ""
 
-    def __str__(self):
-        return "{:6d},\"{:s}\"".format(self.number, self.name)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Owner"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Owner"
         obj = Owner()
-        number_str, obj.name = _to_csv_list(line)
+        number_str, obj.name = row
         obj.number = int(number_str)
         return obj
 
@@ -539,6 +1781,9 @@ class Ownership(RecordType):
     header = "OWNERSHIP"
     comment = "# Owner#,ElementType#,Element#,System#,Share"
 
+    reference_fields = ("owner", "element", "system")
+    __slots__ = ("owner", "element", "system", "share")
+
     def __init__(self):
         super(Ownership, self).__init__()
         self.owner: Optional[Owner] = None
@@ -571,10 +1816,10 @@ class Ownership(RecordType):
                                                          self.share)
 
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Owner"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Owner"
         obj = Owner()
-        number_str, obj.name = _to_csv_list(line)
+        number_str, obj.name = row
         obj.number = int(number_str)
         return obj
 
@@ -585,6 +1830,19 @@ class Bus(RecordType):
               "\"[..Date..]\",\"Cnd\",Cost,Type,LoadShed,Volt,Angle,Vmax," \
               "Vmin,EVmax,EVmin,Stt"
 
+    reference_fields = ("area", "region", "system")
+    interned_fields = ("name", "op", "date", "cnd")
+    row_format = "{:6d},\"{:12s}\",\"{:1s}\",{:8.2f},{:2d},{:2d},{:2d}," \
+                 "\"{:10s}\",\"{:1s}\",{:7.2f},{:1d},{:1d},{:8.4f},{:8.4f}," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:1d}"
+    row_fields = ("number", "name", "op", "kvbase", "area.number",
+                  "region.number", "system.number", "date", "cnd", "cost",
+                  "type", "loadshed", "volt", "angle", "vmax", "vmin",
+                  "evmax", "evmin", "stt")
+    __slots__ = ("number", "name", "op", "kvbase", "area", "region", "system",
+                 "date", "cnd", "cost", "type", "loadshed", "volt", "angle",
+                 "vmax", "vmin", "evmax", "evmin", "stt")
+
     def __init__(self):
         super(Bus, self).__init__()
         self.number = 0
@@ -607,32 +1865,24 @@ class Bus(RecordType):
         self.evmin = 0.8
         self.stt = STATUS_ON
 
-    def __str__(self):
-        system_number = self.system.number if self.system is not None else 0
-        area_number = self.area.number if self.area is not None else 0
-        region_number = self.region.number if self.region is not None else 0
-        args = [self.number, self.name, self.op, self.kvbase, area_number,
-                region_number, system_number, self.date, self.cnd,
-                self.cost, self.type, self.loadshed, self.volt, self.angle,
-                self.vmax, self.vmin, self.evmax, self.evmin, self.stt]
-        return "{:6d},\"{:12s}\",\"{:1s}\",{:8.2f},{:2d},{:2d},{:2d}," \
-               "\"{:10s}\",\"{:1s}\",{:7.2f},{:1d},{:1d},{:8.4f},{:8.4f}," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:1d}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Bus"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Bus"
         obj = Bus()
-        obj.load_from(data, line)
+        obj.load_from_row(data, row)
         return obj
 
     def load_from(self, data, line):
         # type: ("NpFile", str) -> None
+        self.load_from_row(data, _to_csv_list(line))
+
+    def load_from_row(self, data, row):
+        # type: ("NpFile", list) -> None
 
         number_str, self.name, self.op, kv_str, area_str, region_str,\
             system_str, self.date, self.cnd, cost_str, type_str, lds_str,\
             volt_str, angle_str, vmax_str, vmin_str, evmax_str, evmin_str,\
-            stt_str = _to_csv_list(line)
+            stt_str = row
 
         self.number = int(number_str)
         self.system = data.find_system(int(system_str))
@@ -656,14 +1906,16 @@ class MiddlePointBus(Bus):
     header = "MIDDLEPOINT_BUS"
     comment = Bus.comment
 
+    __slots__ = ()
+
     def __init__(self):
         super(MiddlePointBus, self).__init__()
 
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "MiddlePointBus"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "MiddlePointBus"
         obj = MiddlePointBus()
-        obj.load_from(data, line)
+        obj.load_from_row(data, row)
         return obj
 
 
@@ -673,6 +1925,15 @@ class Demand(RecordType):
     comment = "# Demand#,\"[...Name...]\",\"Op\",Bus#,\"[.Bus Name.]\"," \
               "Units,\"[..Date..]\",\"Cnd\",P_MW,Q_MW"
 
+    reference_fields = ("bus",)
+    interned_fields = ("op", "date", "cnd")
+    row_format = "  {:7d},\"{:12s}\",\"{:1s}\",{:5d},\"{:12s}\",{:5d}," \
+                 "\"{:10s}\",\"{:1s}\",{:8.3f},{:8.3f}"
+    row_fields = ("number", "name", "op", "bus.number", "bus.name", "units",
+                  "date", "cnd", "p_mw", "q_mw")
+    __slots__ = ("number", "name", "op", "bus", "units", "date", "cnd", "p_mw",
+                 "q_mw")
+
     def __init__(self):
         super(Demand, self).__init__()
         self.number = 0
@@ -685,21 +1946,12 @@ class Demand(RecordType):
         self.p_mw = 0.0
         self.q_mw = 0.0
 
-    def __str__(self):
-        bus_number = self.bus.number if self.bus is not None else 0
-        bus_name = self.bus.name if self.bus is not None else ""
-        args = [self.number, self.name, self.op,
-                bus_number, bus_name, self.units, self.date,
-                self.cnd, self.p_mw, self.q_mw]
-        return "  {:7d},\"{:12s}\",\"{:1s}\",{:5d},\"{:12s}\",{:5d}," \
-               "\"{:10s}\",\"{:1s}\",{:8.3f},{:8.3f}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Demand"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Demand"
         obj = Demand()
         number_str, obj.name, obj.op, bus_number, _,\
-            units_str, obj.date, obj.cnd, p_str, q_str = _to_csv_list(line)
+            units_str, obj.date, obj.cnd, p_str, q_str = row
         obj.number = int(number_str)
         obj.bus = data.find_bus(int(bus_number))
         obj.units = int(units_str)
@@ -722,6 +1974,20 @@ class Generator(RecordType):
     TYPE_SYNC = "S"
     TYPE_STATCOM = "V"
 
+    reference_fields = ("bus", "ctr_bus")
+    interned_fields = ("op", "type", "date", "cnd")
+    row_format = "{:6d},\"{:12s}\",\"{:1s}\",{:6d},\"{:12s}\"," \
+                 "\"{:1s}\",{:3d},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
+                 "\"{:10s}\",\"{:1s}\",{:6d},\"{:12s}\",{:1d}," \
+                 "{:8.3f},{:3d},{:8.3f},{:8.3f}"
+    row_fields = ("number", "name", "op", "bus.number", "bus.name", "type",
+                  "units", "pmin", "pmax", "qmin", "qmax", "date", "cnd",
+                  "ctr_bus.number", "ctr_bus.name", "ctr_type",
+                  "power_factor", "units_on", "pgen", "qgen")
+    __slots__ = ("number", "name", "op", "bus", "type", "units", "pmin",
+                 "pmax", "qmin", "qmax", "date", "cnd", "ctr_bus", "ctr_type",
+                 "power_factor", "units_on", "pgen", "qgen")
+
     def __init__(self):
         super(Generator, self).__init__()
         self.number = 0
@@ -745,36 +2011,21 @@ class Generator(RecordType):
         self.qgen = 0.0
         self.tag = None
 
-    def __str__(self):
-        bus_number = self.bus.number if self.bus is not None else 0
-        bus_name = self.bus.name if self.bus is not None else ""
-        ctr_bus_number = self.ctr_bus.number if self.ctr_bus is not None else 0
-        ctr_bus_name = self.ctr_bus.name if self.ctr_bus is not None else ""
-        args = [self.number, self.name, self.op, bus_number, bus_name,
-                self.type, self.units, self.pmin, self.pmax,
-                self.qmin, self.qmax, self.date, self.cnd,
-                ctr_bus_number, ctr_bus_name, self.ctr_type,
-                self.power_factor, self.units_on, self.pgen, self.qgen]
-        return "{:6d},\"{:12s}\",\"{:1s}\",{:6d},\"{:12s}\"," \
-               "\"{:1s}\",{:3d},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
-               "\"{:10s}\",\"{:1s}\",{:6d},\"{:12s}\",{:1d}," \
-               "{:8.3f},{:3d},{:8.3f},{:8.3f}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Generator"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Generator"
         obj = Generator()
         number_str, obj.name, obj.op, bus_number, _,\
             obj.type, units_str, pmin_str, pmax_str,\
             qmin_str, qmax_str, obj.date, obj.cnd,\
             ctr_bus_number, _, ctr_type_str, factor_str,\
-            units_on_str, pgen_str, qgen_str = _to_csv_list(line)
+            units_on_str, pgen_str, qgen_str = row
         obj.number = int(number_str)
         obj.bus = data.find_bus(int(bus_number))
         obj.ctr_bus = data.find_bus(int(ctr_bus_number))
         obj.units = int(units_str)
         obj.units_on = int(units_on_str)
-        obj.ctr_type = int(units_str)
+        obj.ctr_type = int(ctr_type_str)
         obj.power_factor = float(factor_str)
         obj.pmax = float(pmax_str)
         obj.pmin = float(pmin_str)
@@ -799,8 +2050,25 @@ class Line(SeriesType):
     LTYPE_BREAKER = -2
     LTYPE_SWITCH = -3
 
+    row_format = "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\"," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
+                 "{:8.3f},{:8.3f},\"{:10s}\",\"{:1s}\",{:6d}," \
+                 "{:1d},\"{:12s}\",{:1d},{:8.3f},{:1d}"
+    row_fields = ("from_bus.number", "to_bus.number",
+                  "parallel_circuit_number", "op", "metering_end", "r_pct",
+                  "x_pct", "mvar", "normal_rating", "emergency_rating",
+                  "power_factor", "cost", "date", "cnd", "series_number",
+                  "type", "name", "env_factor", "length_km", "stt")
+    __slots__ = ("number", "op", "metering_end", "r_pct", "x_pct", "mvar",
+                 "normal_rating", "emergency_rating", "power_factor", "cost",
+                 "date", "cnd", "series_number", "type", "name", "env_factor",
+                 "length_km", "stt")
+    # Former names of fields.
+    mvar_pct = _deprecated_alias("mvar_pct", "mvar")
+
     def __init__(self):
         super(Line, self).__init__()
+        self.number = 0
         self.op = OP_ADD
         # Metering end: (F)rom or (T)o bus.
         self.metering_end = METERING_END_FROM
@@ -821,29 +2089,14 @@ class Line(SeriesType):
         self.length_km = 0
         self.stt = STATUS_ON
 
-    def __str__(self):
-        from_bus_number = self.from_bus.number \
-            if self.from_bus is not None else 0
-        to_bus_number = self.to_bus.number if self.to_bus is not None else 0
-        args = [from_bus_number, to_bus_number,
-                self.parallel_circuit_number, self.op, self.metering_end,
-                self.r_pct, self.x_pct, self.mvar, self.normal_rating,
-                self.emergency_rating, self.power_factor, self.cost,
-                self.date, self.cnd, self.series_number, self.type, self.name,
-                self.env_factor, self.length_km, self.stt]
-        return "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\"," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
-               "{:8.3f},{:8.3f},\"{:10s}\",\"{:1s}\",{:6d}," \
-               "{:1d},\"{:12s}\",{:1d},{:8.3f},{:1d}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Line"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Line"
         obj = Line()
         from_number, to_number, ncir, obj.op, obj.metering_end,\
             r_str, x_str, mvar_str, rat_str, emg_str, pf_str, \
             cost_str, obj.date, obj.cnd, series_str, type_str, \
-            obj.name, env_str, len_str, stt_str = _to_csv_list(line)
+            obj.name, env_str, len_str, stt_str = row
         obj.series_number = int(series_str)
         obj.from_bus = data.find_bus(int(from_number))
         obj.to_bus = data.find_bus(int(to_number))
@@ -851,7 +2104,7 @@ class Line(SeriesType):
         obj.type = int(type_str)
         obj.r_pct = float(r_str)
         obj.x_pct = float(x_str)
-        obj.mvar_pct = float(mvar_str)
+        obj.mvar = float(mvar_str)
         obj.normal_rating = float(rat_str)
         obj.emergency_rating = float(emg_str)
         obj.power_factor = float(pf_str)
@@ -873,6 +2126,17 @@ class BusShunt(RecordType):
     REACTOR = "R"
     CAPACITOR = "C"
 
+    reference_fields = ("bus", "ctr_bus")
+    interned_fields = ("op", "type", "date", "cnd")
+    row_format = "{:6d},\"{:12s}\",\"{:1s}\",{:6d},\"{:12s}\"," \
+                 "{:6d},\"{:12s}\",\"{:1s}\",{:1d},{:3d},{:8.3f}," \
+                 "{:8.3f},\"{:10s}\",\"{:1s}\",{:1d}"
+    row_fields = ("number", "name", "op", "bus.number", "bus.name",
+                  "ctr_bus.number", "ctr_bus.name", "type", "ctr_type",
+                  "units", "mvar", "cost", "date", "cnd", "units_on")
+    __slots__ = ("number", "name", "op", "bus", "ctr_bus", "type", "ctr_type",
+                 "units", "mvar", "cost", "date", "cnd", "units_on")
+
     def __init__(self):
         super(BusShunt, self).__init__()
         self.number = 0
@@ -884,6 +2148,8 @@ class BusShunt(RecordType):
         # TODO: create enumeration for control types.
         self.ctr_type = 0
         self.units = 1
+        # MVAr of each unit at 1 pu voltage, positive for capacitors and
+        # negative for reactors whatever the type.
         self.mvar = 0.0
         self.cost = 0.0
         self.date = DEFAULT_DATE
@@ -891,28 +2157,13 @@ class BusShunt(RecordType):
         self.units_on = 1
         self.tag = self.number
 
-    def __str__(self):
-        bus_number = self.bus.number if self.bus is not None else 0
-        bus_name = self.bus.name if self.bus is not None else ""
-        ctr_bus_number = self.ctr_bus.number if self.ctr_bus is not None else 0
-        ctr_bus_name = self.ctr_bus.name if self.ctr_bus is not None else ""
-        args = [self.number, self.name, self.op,
-                bus_number, bus_name,
-                ctr_bus_number, ctr_bus_name,
-                self.type, self.ctr_type, self.units, self.mvar, self.cost,
-                self.date, self.cnd, self.units_on,
-                ]
-        return "{:6d},\"{:12s}\",\"{:1s}\",{:6d},\"{:12s}\"," \
-               "{:6d},\"{:12s}\",\"{:1s}\",{:1d},{:3d},{:8.3f}," \
-               "{:8.3f},\"{:10s}\",\"{:1s}\",{:1d}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "BusShunt"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "BusShunt"
         obj = BusShunt()
         number_str, obj.name, obj.op, bus_str, _, ctr_str, _,\
             obj.type, ctr_type_str, units_str, mvar_str, cost_str, obj.date, \
-            obj.cnd, units_on_str = _to_csv_list(line)
+            obj.cnd, units_on_str = row
         obj.number = int(number_str)
         obj.bus = data.find_bus(int(bus_str))
         obj.ctr_bus = data.find_bus(int(ctr_str))
@@ -934,12 +2185,24 @@ class LineShunt(RecordType):
     TERMINAL_FROM = "F"
     TERMINAL_TO = "T"
 
+    reference_fields = ("circuit",)
+    interned_fields = ("op", "terminal", "date", "cnd")
+    row_format = "{:6d},\"{:12s}\",\"{:1s}\",{:6d},{:6d},{:2d},{:8.3f}," \
+                 "\"{:1s}\",{:8.3f},\"{:10s}\",\"{:1s}\",{:1d},\"{:12s}\""
+    row_fields = ("number", "name", "op", "circuit.from_bus.number",
+                  "circuit.to_bus.number", "circuit.parallel_circuit_number",
+                  "mvar", "terminal", "cost", "date", "cnd", "stt",
+                  "circuit.name")
+    __slots__ = ("number", "name", "op", "circuit", "mvar", "terminal", "cost",
+                 "date", "cnd", "stt")
+
     def __init__(self):
         super(LineShunt, self).__init__()
         self.number = 0
         self.name = ""
         self.op = OP_ADD
         self.circuit = None
+        # MVAr at 1 pu voltage, positive for capacitors.
         self.mvar = 0.0
         # Connection terminal: (F)rom bus or (T)o bus.
         self.terminal = LineShunt.TERMINAL_FROM
@@ -949,29 +2212,13 @@ class LineShunt(RecordType):
         self.cnd = CND_REGISTRY
         self.stt = STATUS_ON
 
-    def __str__(self):
-        circ_from_number = self.circuit.from_bus.number \
-            if self.circuit is not None else 0
-        circ_to_number = self.circuit.to_bus.number \
-            if self.circuit is not None else 0
-        circ_name = self.circuit.name if self.circuit is not None else ""
-        circ_parallel = self.circuit.parallel_circuit_number\
-            if self.circuit is not None else 0
-        args = [self.number, self.name, self.op,
-                circ_from_number, circ_to_number,
-                circ_parallel, self.mvar, self.terminal, self.cost,
-                self.date, self.cnd, self.stt, circ_name]
-        return "{:6d},\"{:12s}\",\"{:1s}\",{:6d},{:6d},{:2d},{:8.3f}," \
-               "\"{:1s}\",{:8.3f},\"{:10s}\",\"{:1s}\"," \
-               "{:1d},\"{:12s}\"".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "LineShunt"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "LineShunt"
         obj = LineShunt()
         number_str, obj.name, obj.op, from_str, to_str, ncir,\
             mvar_str, obj.terminal, cost_str, obj.date, \
-            obj.cnd, stt_str, _ = _to_csv_list(line)
+            obj.cnd, stt_str, _ = row
         obj.number = int(number_str)
         obj.circuit = data.find_line(int(from_str), int(to_str), int(ncir))
         obj.mvar = float(mvar_str)
@@ -988,6 +2235,27 @@ class Transformer(SeriesType):
               "\"[...Name...]\",Env,Stt,Tap,Phase," \
               "MinFlow,MaxFlow,EmgMinFlow,EmgMaxFlow"
 
+    reference_fields = ("from_bus", "to_bus", "ctr_bus")
+    row_format = "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\",{:8.3f},{:8.3f}," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:1d},{:6d},{:3d}," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},\"{:10s}\",\"{:1s}\"," \
+                 "{:6d},\"{:12s}\",{:1d},{:1d}," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}"
+    row_fields = ("from_bus.number", "to_bus.number",
+                  "parallel_circuit_number", "op", "metering_end", "r_pct",
+                  "x_pct", "tap_min", "tap_max", "phase_min", "phase_max",
+                  "control_type", "ctr_bus.number", "tap_steps",
+                  "normal_rating", "emergency_rating", "power_factor",
+                  "cost", "date", "cnd", "series_number", "name", "env",
+                  "stt", "tap", "phase", "minflow", "maxflow",
+                  "emergency_minflow", "emergency_maxflow")
+    __slots__ = ("op", "metering_end", "r_pct", "x_pct", "tap_min", "tap_max",
+                 "phase_min", "phase_max", "control_type", "ctr_bus",
+                 "tap_steps", "normal_rating", "emergency_rating",
+                 "power_factor", "cost", "date", "cnd", "series_number",
+                 "name", "env", "stt", "tap", "phase", "minflow", "maxflow",
+                 "emergency_minflow", "emergency_maxflow")
+
     def __init__(self):
         super(Transformer, self).__init__()
         self.op = OP_ADD
@@ -1018,45 +2286,26 @@ class Transformer(SeriesType):
         self.emergency_minflow = -FLOW_MAX
         self.emergency_maxflow = +FLOW_MAX
 
-    def __str__(self):
-        from_bus_number = self.from_bus.number \
-            if self.from_bus is not None else 0
-        to_bus_number = self.to_bus.number \
-            if self.to_bus is not None else 0
-        ctr_bus_number = self.ctr_bus.number \
-            if self.ctr_bus is not None else 0
-        args = [from_bus_number, to_bus_number,
-                self.parallel_circuit_number, self.op, self.metering_end,
-                self.r_pct, self.x_pct, self.tap_min, self.tap_max,
-                self.phase_min, self.phase_max, self.control_type,
-                ctr_bus_number, self.tap_steps, self.normal_rating,
-                self.emergency_rating, self.power_factor, self.cost,
-                self.date, self.cnd, self.series_number, self.name, self.env,
-                self.stt, self.tap, self.phase,
-                self.minflow, self.maxflow, self.emergency_minflow,
-                self.emergency_maxflow, ]
-        return "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\",{:8.3f},{:8.3f}," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:1d},{:6d},{:3d}," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},\"{:10s}\",\"{:1s}\"," \
-               "{:6d},\"{:12s}\",{:1d},{:1d}," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "Transformer"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "Transformer"
         obj = Transformer()
-        obj.load_from(data, line)
+        obj.load_from_row(data, row)
         return obj
 
     def load_from(self, data, line):
         # type: ("NpFile", str) -> None
+        self.load_from_row(data, _to_csv_list(line))
+
+    def load_from_row(self, data, row):
+        # type: ("NpFile", list) -> None
 
         from_str, to_str, ncir, self.op, self.metering_end, \
             r_str, x_str, tmin_str, tmax_str, pmin_str, pmax_str, \
             ctr_type, ctr_bus, steps_str, rat_str, emg_str, \
             pf_str, cost_str, self.date, self.cnd, series_str,\
             self.name, env_str, stt_str, tap_str, phs_str, minflow, maxflow,\
-            eminflow, emaxflow = _to_csv_list(line)
+            eminflow, emaxflow = row
 
         self.from_bus = data.find_bus(int(from_str))
         self.to_bus = data.find_bus(int(to_str))
@@ -1088,14 +2337,16 @@ class EquivalentTransformer(Transformer):
     header = "EQUIVALENT_TRANSFORMER"
     comment = Transformer.comment
 
+    __slots__ = ()
+
     def __init__(self):
         super(EquivalentTransformer, self).__init__()
 
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "EquivalentTransformer"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "EquivalentTransformer"
         obj = EquivalentTransformer()
-        obj.load_from(data, line)
+        obj.load_from_row(data, row)
         return obj
 
 
@@ -1108,6 +2359,33 @@ class ThreeWindingTransformer(RecordType):
               "Series#,\"PriEqvTrfName\",\"SecEqvTrfName\"," \
               "\"TerEqvTrfname\",\"[...Name...]\""
 
+    reference_fields = ("primary_transformer", "secondary_transformer",
+                        "tertiary_transformer", "middlepoint_bus")
+    interned_fields = ("op", "metering_end", "date", "cnd")
+    row_format = "{:6d},{:6d},{:6d},{:6d},{:2d},\"{:1s}\",\"{:1s}\"," \
+                 "{:8.3f},{:8.3f},{:8.3f}," \
+                 "{:8.3f},{:8.3f},{:8.3f}," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
+                 "\"{:10s}\",\"{:1s}\",{:6d}," \
+                 "\"{:12s}\",\"{:12s}\",\"{:12s}\"," \
+                 "\"{:12s}\""
+    row_fields = ("primary_transformer.from_bus.number",
+                  "secondary_transformer.from_bus.number",
+                  "tertiary_transformer.from_bus.number",
+                  "middlepoint_bus.number", "parallel_circuit_number", "op",
+                  "metering_end", "rps_pct", "xps_pct", "sbaseps_mva",
+                  "rst_pct", "xst_pct", "sbasest_mva", "rpt_pct", "xpt_pct",
+                  "sbasept_mva", "power_factor", "cost", "date", "cnd",
+                  "series_number", "primary_transformer.name",
+                  "secondary_transformer.name", "tertiary_transformer.name",
+                  "name")
+    __slots__ = ("primary_transformer", "secondary_transformer",
+                 "tertiary_transformer", "middlepoint_bus",
+                 "parallel_circuit_number", "op", "metering_end", "rps_pct",
+                 "xps_pct", "sbaseps_mva", "rst_pct", "xst_pct", "sbasest_mva",
+                 "rpt_pct", "xpt_pct", "sbasept_mva", "power_factor", "cost",
+                 "date", "cnd", "series_number", "name")
+
     def __init__(self):
         super(ThreeWindingTransformer, self).__init__()
         self.primary_transformer = None
@@ -1150,48 +2428,16 @@ class ThreeWindingTransformer(RecordType):
         return self.tertiary_transformer.from_bus.number \
             if self.tertiary_transformer is not None else 0
 
-    def __str__(self):
-        primary_bus_number = self.primary_transformer.from_bus.number \
-            if self.primary_transformer is not None else 0
-        primary_name = self.primary_transformer.name \
-            if self.primary_transformer is not None else ""
-        secondary_bus_number = self.secondary_transformer.from_bus.number \
-            if self.secondary_transformer is not None else 0
-        secondary_name = self.secondary_transformer.name \
-            if self.secondary_transformer is not None else ""
-        tertiary_bus_number = self.tertiary_transformer.from_bus.number \
-            if self.tertiary_transformer is not None else 0
-        tertiary_name = self.tertiary_transformer.name \
-            if self.tertiary_transformer is not None else ""
-        middlepoint_bus_number = self.middlepoint_bus.number \
-            if self.middlepoint_bus is not None else 0
-        args = [primary_bus_number, secondary_bus_number,
-                tertiary_bus_number, middlepoint_bus_number,
-                self.parallel_circuit_number, self.op, self.metering_end,
-                self.rps_pct, self.xps_pct, self.sbaseps_mva,
-                self.rst_pct, self.xst_pct, self.sbasest_mva,
-                self.rpt_pct, self.xpt_pct, self.sbasept_mva,
-                self.power_factor, self.cost, self.date, self.cnd,
-                self.series_number, primary_name, secondary_name,
-                tertiary_name, self.name]
-        return "{:6d},{:6d},{:6d},{:6d},{:2d},\"{:1s}\",\"{:1s}\"," \
-               "{:8.3f},{:8.3f},{:8.3f}," \
-               "{:8.3f},{:8.3f},{:8.3f}," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
-               "\"{:10s}\",\"{:1s}\",{:6d}," \
-               "\"{:12s}\",\"{:12s}\",\"{:12s}\"," \
-               "\"{:12s}\"".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "ThreeWindingTransformer"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "ThreeWindingTransformer"
         obj = ThreeWindingTransformer()
         _, _, _, mid_str, ncir, obj.op,\
             obj.metering_end, rps_pct, xps_pct, sbaseps_mva,\
             rst_pct, xst_pct, sbasest_mva, \
             rpt_pct, xpt_pct, sbasept_mva, \
             power_factor, cost_str, obj.date, obj.cnd,\
-            series_str, pri_name, sec_name, ter_name, obj.name = _to_csv_list(line)
+            series_str, pri_name, sec_name, ter_name, obj.name = row
 
         obj.primary_transformer = data.find_transformer_by_name(
             pri_name.strip())
@@ -1227,8 +2473,26 @@ class ControlledSeriesCapacitor(SeriesType):
     CONTROL_MODE_FIXED_X = 0
     CONTROL_MODE_POWER = 1
 
+    row_format = "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\"," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
+                 "\"{:10s}\",\"{:1s}\",{:6d},\"{:12s}\",{:1d},{:1d}," \
+                 "{:1d},{:8.3f}"
+    row_fields = ("from_bus.number", "to_bus.number",
+                  "parallel_circuit_number", "op", "metering_end",
+                  "xmin_pct", "xmax_pct", "normal_rating",
+                  "emergency_rating", "power_factor", "cost", "date", "cnd",
+                  "series_number", "name", "control_mode", "stt", "bypass",
+                  "setpoint")
+    __slots__ = ("number", "op", "metering_end", "xmin_pct", "xmax_pct",
+                 "normal_rating", "emergency_rating", "power_factor", "cost",
+                 "date", "cnd", "series_number", "name", "control_mode", "stt",
+                 "bypass", "setpoint")
+    # Former names of fields.
+    cost_str = _deprecated_alias("cost_str", "cost")
+
     def __init__(self):
         super(ControlledSeriesCapacitor, self).__init__()
+        self.number = 0
         self.from_bus = None
         self.to_bus = None
         self.parallel_circuit_number = 1
@@ -1249,43 +2513,25 @@ class ControlledSeriesCapacitor(SeriesType):
         self.bypass = STATUS_OFF
         self.setpoint = 0.0
 
-    def __str__(self):
-        from_bus_number = self.from_bus.number \
-            if self.from_bus is not None else 0
-        to_bus_number = self.to_bus.number if self.to_bus is not None else 0
-
-        args = [
-            from_bus_number, to_bus_number,
-            self.parallel_circuit_number, self.op, self.metering_end,
-            self.xmin_pct, self.xmax_pct,
-            self.normal_rating, self.emergency_rating,
-            self.power_factor, self.cost, self.date, self.cnd,
-            self.series_number, self.name, self.control_mode, self.stt,
-            self.bypass, self.setpoint
-        ]
-        return "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\"," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
-               "\"{:10s}\",\"{:1s}\",{:6d},\"{:12s}\",{:1d},{:1d}," \
-               "{:1d},{:8.3f}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "ControlledSeriesCapacitor"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "ControlledSeriesCapacitor"
         obj = ControlledSeriesCapacitor()
         from_bus, to_bus, ncir, obj.op, obj.metering_end,\
             xmin, xmax, rat_str, emg_str, pf_str, cost_str, \
             obj.date, obj.cnd, series_str, obj.name, \
-            obj.control_mode, stt_str, byp_str, set_str = _to_csv_list(line)
+            mode_str, stt_str, byp_str, set_str = row
 
         obj.from_bus = data.find_bus(int(from_bus))
         obj.to_bus = data.find_bus(int(to_bus))
         obj.parallel_circuit_number = int(ncir)
+        obj.control_mode = int(mode_str)
         obj.xmax_pct = float(xmax)
         obj.xmin_pct = float(xmin)
         obj.normal_rating = float(rat_str)
         obj.emergency_rating = float(emg_str)
         obj.power_factor = float(pf_str)
-        obj.cost_str = float(cost_str) if not _empty(cost_str) else 0.0
+        obj.cost = float(cost_str) if not _empty(cost_str) else 0.0
         obj.series_number = int(series_str)
         obj.stt = int(stt_str)
         obj.bypass = int(byp_str)
@@ -1301,6 +2547,19 @@ class StaticVarCompensator(RecordType):
               "\"[..Date..]\",\"Cnd\",Stt,SetMVAR"
     MODE_POWER = 1
 
+    reference_fields = ("bus", "ctr_bus")
+    interned_fields = ("op", "date", "cnd")
+    row_format = "{:6d},\"{:12s}\",\"{:1s}\",{:6d},\"{:12s}\"," \
+                 "{:6d},\"{:12s}\",{:8.3f},{:3d},{:3d},{:8.3f},{:8.3f}," \
+                 "{:8.2f},\"{:10s}\",\"{:1s}\",{:1d},{:8.3f}"
+    row_fields = ("number", "name", "op", "bus.number", "bus.name",
+                  "ctr_bus.number", "ctr_bus.name", "droop", "ctr_mode",
+                  "units", "qmin", "qmax", "cost", "date", "cnd", "stt",
+                  "mvar_setpoint")
+    __slots__ = ("number", "name", "op", "bus", "ctr_bus", "droop", "ctr_mode",
+                 "units", "qmin", "qmax", "cost", "date", "cnd", "stt",
+                 "mvar_setpoint")
+
     def __init__(self):
         super(StaticVarCompensator, self).__init__()
         self.number = 0
@@ -1319,27 +2578,14 @@ class StaticVarCompensator(RecordType):
         self.stt = STATUS_ON
         self.mvar_setpoint = 0
 
-    def __str__(self):
-        bus_number = self.bus.number if self.bus is not None else 0
-        bus_name = self.bus.name if self.bus is not None else ""
-        ctr_bus_number = self.ctr_bus.number if self.ctr_bus is not None else 0
-        ctr_bus_name = self.ctr_bus.name if self.ctr_bus is not None else ""
-        args = [self.number, self.name, self.op, bus_number,
-                bus_name, ctr_bus_number, ctr_bus_name,
-                self.droop, self.ctr_mode, self.units, self.qmin, self.qmax,
-                self.cost, self.date, self.cnd, self.stt, self.mvar_setpoint]
-        return "{:6d},\"{:12s}\",\"{:1s}\",{:6d},\"{:12s}\"," \
-               "{:6d},\"{:12s}\",{:8.3f},{:3d},{:3d},{:8.3f},{:8.3f}," \
-               "{:8.2f},\"{:10s}\",\"{:1s}\",{:1d},{:8.3f}".format(*args)
-
 
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "StaticVarCompensator"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "StaticVarCompensator"
         obj = StaticVarCompensator()
         number_str, obj.name, obj.op, bus_str, _, ctr_str, _,\
             droop_str, mode_str, units_str, qmin_str, qmax_str,\
-            cost_str, obj.date, obj.cnd, stt_str, set_str = _to_csv_list(line)
+            cost_str, obj.date, obj.cnd, stt_str, set_str = row
 
         obj.number = int(number_str)
         obj.bus = data.find_bus(int(bus_str))
@@ -1362,6 +2608,11 @@ class DcLink(RecordType):
     TYPE_LCC = "LCC"
     TYPE_VSC = "VSC"
 
+    interned_fields = ("type",)
+    row_format = "{:4d},\"{:12s}\",{:8.3f},{:8.3f},\"{:3s}\""
+    row_fields = ("number", "name", "kvbase", "mwbase", "type")
+    __slots__ = ("number", "name", "kvbase", "mwbase", "type")
+
     def __init__(self):
         super(DcLink, self).__init__()
         self.number = 0
@@ -1370,16 +2621,11 @@ class DcLink(RecordType):
         self.mwbase = MVABASE
         self.type = DcLink.TYPE_LCC
 
-    def __str__(self):
-        args = [self.number, self.name,
-                self.kvbase, self.mwbase, self.type]
-        return "{:4d},\"{:12s}\",{:8.3f},{:8.3f},\"{:3s}\"".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "DcLink"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "DcLink"
         obj = DcLink()
-        number_str, obj.name, kv_str, mw_str, obj.type = _to_csv_list(line)
+        number_str, obj.name, kv_str, mw_str, obj.type = row
         obj.number = int(number_str)
         obj.kvbase = float(kv_str)
         obj.mwbase = float(mw_str)
@@ -1396,6 +2642,17 @@ class DcBus(RecordType):
     POLARITY_NEGATIVE = "-"
     POLARITY_NEUTRAL = "0"
 
+    reference_fields = ("area", "region", "system", "dclink")
+    interned_fields = ("op", "polarity", "date", "cnd")
+    row_format = "{:6d},\"{:12s}\",\"{:1s}\",{:1d},\"{:1s}\"," \
+                 "{:8.3f},{:4d},{:4d},{:4d},{:4d},\"{:10s}\"," \
+                 "\"{:1s}\",{:8.3f},{:8.3f}"
+    row_fields = ("number", "name", "op", "type", "polarity", "groundr",
+                  "area.number", "region.number", "system.number",
+                  "dclink.number", "date", "cnd", "cost", "volt")
+    __slots__ = ("number", "name", "op", "type", "polarity", "groundr", "area",
+                 "region", "system", "dclink", "date", "cnd", "cost", "volt")
+
     def __init__(self):
         super(DcBus, self).__init__()
         self.number = 0
@@ -1413,26 +2670,13 @@ class DcBus(RecordType):
         self.cost = 0.0
         self.volt = 1.0
 
-    def __str__(self):
-        area_number = self.area.number if self.area is not None else 0
-        region_number = self.region.number if self.region is not None else 0
-        system_number = self.system.number if self.system is not None else 0
-        dclink_number = self.dclink.number if self.dclink is not None else 0
-        args = [self.number, self.name, self.op,
-                self.type, self.polarity, self.groundr,
-                area_number, region_number, system_number,
-                dclink_number, self.date, self.cnd, self.cost, self.volt]
-        return "{:6d},\"{:12s}\",\"{:1s}\",{:1d},\"{:1s}\"," \
-               "{:8.3f},{:4d},{:4d},{:4d},{:4d},\"{:10s}\"," \
-               "\"{:1s}\",{:8.3f},{:8.3f}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "DcBus"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "DcBus"
         obj = DcBus()
         number_str, obj.name, obj.op, type_str, obj.polarity,\
             groundr, area_str, region_str, system_str, dclink_str, \
-            obj.date, obj.cnd, cost_str, volt_str = _to_csv_list(line)
+            obj.date, obj.cnd, cost_str, volt_str = row
         obj.number = int(number_str)
         obj.type = int(type_str) if not _empty(type_str) else 0
         obj.groundr = float(groundr) if not _empty(groundr) else 0.0
@@ -1451,6 +2695,16 @@ class DcLine(SeriesType):
               "R_Ohm,L_Ohm,NominalRating,Cost,\"[..Date..]\",Cnd,Series#," \
               "\"[.........Name.........]\",Stt"
 
+    row_format = "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\"," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},\"{:10s}\"," \
+                 "\"{:1s}\",{:6d},\"{:24s}\",{:1d}"
+    row_fields = ("from_bus.number", "to_bus.number",
+                  "parallel_circuit_number", "op", "metering_end", "r_ohm",
+                  "l_ohm", "normal_rating", "cost", "date", "cnd",
+                  "series_number", "name", "stt")
+    __slots__ = ("op", "metering_end", "r_ohm", "l_ohm", "normal_rating",
+                 "cost", "date", "cnd", "series_number", "name", "stt")
+
     def __init__(self):
         super(DcLine, self).__init__()
         self.op = OP_ADD
@@ -1465,26 +2719,13 @@ class DcLine(SeriesType):
         self.name = ""
         self.stt = STATUS_ON
 
-    def __str__(self):
-        from_bus_number = self.from_bus.number \
-            if self.from_bus is not None else 0
-        to_bus_number = self.to_bus.number if self.to_bus is not None else 0
-        args = [from_bus_number, to_bus_number,
-                self.parallel_circuit_number, self.op, self.metering_end,
-                self.r_ohm, self.l_ohm, self.normal_rating, self.cost,
-                self.date, self.cnd, self.series_number, self.name, self.stt]
-        return "{:6d},{:6d},{:3d},\"{:1s}\",\"{:1s}\"," \
-               "{:8.3f},{:8.3f},{:8.3f},{:8.3f},\"{:10s}\"," \
-               "\"{:1s}\",{:6d},\"{:24s}\",{:1d}".format(*args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "DcLine"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "DcLine"
         obj = DcLine()
-        fodasse = _to_csv_list(line)
         from_str, to_str, ncir, obj.op, obj.metering_end,\
             r_str, l_str, rat_str, cost_str, obj.date,\
-            obj.cnd, series_str, obj.name, stt_str = fodasse
+            obj.cnd, series_str, obj.name, stt_str = row
         obj.from_bus = data.find_dcbus(int(from_str))
         obj.to_bus = data.find_dcbus(int(to_str))
         obj.parallel_circuit_number = int(ncir)
@@ -1498,6 +2739,10 @@ class DcLine(SeriesType):
 
 
 class AcDcConverter(RecordType):
+    reference_fields = ("ac_bus", "dc_bus", "neutral_bus")
+    interned_fields = ("op", "metering_end", "date", "cnd")
+    __slots__ = ("ac_bus", "dc_bus", "neutral_bus")
+
     def __init__(self):
         super(AcDcConverter, self).__init__()
         self.ac_bus = None
@@ -1526,6 +2771,33 @@ class AcDcConverterLcc(AcDcConverter):
     TYPE_INVERTER = "I"
     TYPE_BIDIRECTIONAL = "B"
 
+    interned_fields = ("op", "metering_end", "type", "control_mode",
+                       "date", "cnd")
+    row_format = "{:6d},\"{:1s}\",\"{:1s}\",{:6d},{:6d},{:6d},\"{:1s}\"," \
+                 "{:8.3f},{:2d},{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
+                 "{:3d},\"{:1s}\",{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f},\"{:10s}\"," \
+                 "\"{:1s}\",\"{:12s}\",{:3d},{:1d},{:8.4f},{:8.3f}"
+    row_fields = ("number", "op", "metering_end", "ac_bus.number",
+                  "dc_bus.number", "neutral_bus.number",
+                  _stripped("type"), "nominal_current", "bridges", "xc",
+                  "vfs", "nominal_power", "tap_min", "tap_max", "tap_steps",
+                  _stripped("control_mode"), "flow_ac_dc", "flow_dc_ac",
+                  "rectifier_firing_angle_set", "rectifier_firing_angle_min",
+                  "rectifier_firing_angle_max", "inverter_firing_angle_set",
+                  "inverter_firing_angle_min", "inverter_firing_angle_max",
+                  "ccc_capacitance", "cost", _stripped("date"),
+                  _stripped("cnd"), "name", "hzbase", "stt", "tap",
+                  "setpoint")
+    __slots__ = ("number", "op", "metering_end", "type", "nominal_current",
+                 "bridges", "xc", "vfs", "nominal_power", "tap_min", "tap_max",
+                 "tap_steps", "control_mode", "flow_ac_dc", "flow_dc_ac",
+                 "rectifier_firing_angle_set", "rectifier_firing_angle_min",
+                 "rectifier_firing_angle_max", "inverter_firing_angle_set",
+                 "inverter_firing_angle_min", "inverter_firing_angle_max",
+                 "ccc_capacitance", "cost", "date", "cnd", "name", "hzbase",
+                 "stt", "tap", "setpoint")
+
     def __init__(self):
         super(AcDcConverterLcc, self).__init__()
         self.number = 0
@@ -1560,67 +2832,16 @@ class AcDcConverterLcc(AcDcConverter):
         self.tap = 1.0
         self.setpoint = 0.0
 
-    def __str__(self):
-        ac_bus_number = self.ac_bus.number if self.ac_bus is not None else 0
-        dc_bus_number = self.dc_bus.number if self.dc_bus is not None else 0
-        neutral_bus_number = self.neutral_bus.number \
-            if self.neutral_bus is not None else 0
-        args = {"num": self.number,
-                "op": self.op,
-                "met": self.metering_end,
-                "acb": ac_bus_number,
-                "dcb": dc_bus_number,
-                "dcbn": neutral_bus_number,
-                "type": self.type.strip(),
-                "inom": self.nominal_current,
-                "br": self.bridges,
-                "xc": self.xc,
-                "vfs": self.vfs,
-                "snom": self.nominal_power,
-                "tmin": self.tap_min,
-                "tmax": self.tap_max,
-                "tstp": self.tap_steps,
-                "ctr": self.control_mode.strip(),
-                "facdc": self.flow_ac_dc,
-                "fdcac": self.flow_dc_ac,
-                "rfirset": self.rectifier_firing_angle_set,
-                "rfirmin": self.rectifier_firing_angle_min,
-                "rfirmax": self.rectifier_firing_angle_max,
-                "ifirset": self.inverter_firing_angle_set,
-                "ifirmin": self.inverter_firing_angle_min,
-                "ifirmax": self.inverter_firing_angle_max,
-                "cccc": self.ccc_capacitance,
-                "cost": self.cost,
-                "date": self.date.strip(),
-                "cnd": self.cnd.strip(),
-                "name": self.name,
-                "hz": self.hzbase,
-                "stt": self.stt,
-                "tap": self.tap,
-                "set": self.setpoint, }
-        return "{num:6d},\"{op:1s}\",\"{met:1s}\"," \
-               "{acb:6d},{dcb:6d},{dcbn:6d}," \
-               "\"{type:1s}\",{inom:8.3f}," \
-               "{br:2d},{xc:8.3f},{vfs:8.3f}," \
-               "{snom:8.3f},{tmin:8.3f},{tmax:8.3f}," \
-               "{tstp:3d},\"{ctr:1s}\"," \
-               "{facdc:8.3f},{fdcac:8.3f}," \
-               "{rfirset:8.3f},{rfirmin:8.3f},{rfirmax:8.3f}," \
-               "{ifirset:8.3f},{ifirmin:8.3f},{ifirmax:8.3f}," \
-               "{cccc:8.3f},{cost:8.3f}," \
-               "\"{date:10s}\",\"{cnd:1s}\",\"{name:12s}\"," \
-               "{hz:3d},{stt:1d},{tap:8.4f},{set:8.3f}".format(**args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "AcDcConverterLcc"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "AcDcConverterLcc"
         obj = AcDcConverterLcc()
         number_str, obj.op, obj.metering_end, ac_bus, dc_bus, neutral_bus,\
             obj.type, inom, bridges, xc, vfs, snom, tmin, tmax,\
             steps, obj.control_mode, flowacdc, flowdcac, \
             rfirang, rfirmin, rfirmax, ifirang, ifirmin, ifirmax, cccc, \
             cost, obj.date, obj.cnd, obj.name, \
-            hz, stt, tap, setpoint = _to_csv_list(line)
+            hz, stt, tap, setpoint = row
         obj.number = int(number_str)
         obj.ac_bus = data.find_bus(int(ac_bus))
         obj.dc_bus = data.find_dcbus(int(dc_bus))
@@ -1664,6 +2885,29 @@ class AcDcConverterVsc(AcDcConverter):
               "FlowDcAc,Imax,Pwf,Qmin,Qmax,CtrBus#,\"[.Ctr Name.]\"," \
               "Rmpct,Cost,\"[..Date..]\",\"Cnd\",\"[...Name...]\",Stt,Setpoint"
 
+    reference_fields = ("ac_bus", "dc_bus", "neutral_bus", "ctr_bus")
+    interned_fields = ("op", "metering_end", "converter_ctr_mode",
+                       "voltage_ctr_mode", "date", "cnd")
+    row_format = "{:6d},\"{:1s}\",\"{:1s}\",{:6d},{:6d},{:6d}," \
+                 "\"{:1s}\",\"{:1s}\",{:8.3f},{:8.3f},{:8.3f},{:8.3f}," \
+                 "{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:8.3f},{:6d}," \
+                 "\"{:12s}\",{:8.3f},{:8.3f},\"{:10s}\",\"{:1s}\"," \
+                 "\"{:12s}\",{:1d},{:8.3f}"
+    row_fields = ("number", "op", "metering_end", "ac_bus.number",
+                  "dc_bus.number", "neutral_bus.number",
+                  "converter_ctr_mode", "voltage_ctr_mode", "aloss", "bloss",
+                  "minloss", "flow_ac_dc", "flow_dc_ac", "max_current",
+                  "power_factor", "qmin", "qmax", "ctr_bus.number",
+                  "ctr_bus.name", "rmpct", "cost", "date", "cnd", "name",
+                  "stt", "setpoint")
+    __slots__ = ("number", "op", "metering_end", "converter_ctr_mode",
+                 "voltage_ctr_mode", "aloss", "bloss", "minloss", "flow_ac_dc",
+                 "flow_dc_ac", "max_current", "power_factor", "qmin", "qmax",
+                 "ctr_bus", "rmpct", "cost", "date", "cnd", "name", "stt",
+                 "setpoint")
+    # Former names of fields.
+    pwf = _deprecated_alias("pwf", "power_factor")
+
     def __init__(self):
         super(AcDcConverterVsc, self).__init__()
         self.number = 0
@@ -1689,53 +2933,15 @@ class AcDcConverterVsc(AcDcConverter):
         self.stt = STATUS_ON
         self.setpoint = 0.0
 
-    def __str__(self):
-        ac_bus_number = self.ac_bus.number if self.ac_bus is not None else 0
-        dc_bus_number = self.dc_bus.number if self.dc_bus is not None else 0
-        neutral_bus_number = self.neutral_bus.number \
-            if self.neutral_bus is not None else 0
-        ctr_bus_number = self.ctr_bus.number if self.ctr_bus is not None else 0
-        ctr_bus_name = self.ctr_bus.name if self.ctr_bus is not None else ""
-        args = {"number": self.number,
-                "op": self.op,
-                "met": self.metering_end,
-                "acb": ac_bus_number,
-                "dcb": dc_bus_number,
-                "dcbn": neutral_bus_number,
-                "cctr": self.converter_ctr_mode, "vctr": self.voltage_ctr_mode,
-                "alo": self.aloss, "blo": self.bloss, "mlo": self.minloss,
-                "facdc": self.flow_ac_dc, "fdcac": self.flow_dc_ac,
-                "imax": self.max_current,
-                "pf": self.power_factor,
-                "qmin": self.qmin, "qmax": self.qmax,
-                "ctrb": ctr_bus_number,
-                "ctrbnam": ctr_bus_name,
-                "rmpct": self.rmpct,
-                "cost": self.cost,
-                "date": self.date,
-                "cnd": self.cnd,
-                "name": self.name,
-                "stt": self.stt,
-                "set": self.setpoint}
-        return "{number:6d},\"{op:1s}\",\"{met:1s}\"," \
-               "{acb:6d},{dcb:6d},{dcbn:6d}," \
-               "\"{cctr:1s}\",\"{vctr:1s}\"," \
-               "{alo:8.3f},{blo:8.3f},{mlo:8.3f}," \
-               "{facdc:8.3f},{fdcac:8.3f},{imax:8.3f}," \
-               "{pf:8.3f},{qmin:8.3f},{qmax:8.3f}," \
-               "{ctrb:6d},\"{ctrbnam:12s}\",{rmpct:8.3f},{cost:8.3f}," \
-               "\"{date:10s}\",\"{cnd:1s}\",\"{name:12s}\"," \
-               "{stt:1d},{set:8.3f}".format(**args)
-
     @staticmethod
-    def read_from_str(data, line):
-        # type: ("NpFile", str) -> "AcDcConverterVsc"
+    def read_from_row(data, row):
+        # type: ("NpFile", list) -> "AcDcConverterVsc"
         obj = AcDcConverterVsc()
         number_str, obj.op, obj.metering_end, ac_bus, dc_bus, neutral_bus,\
             obj.converter_ctr_mode, obj.voltage_ctr_mode, \
             aloss, bloss, minloss, flowacdc, flowdcac, imax, pwf, qmin, qmax,\
             ctr_bus, _, rmpct, cost, obj.date, obj.cnd, \
-            obj.name, stt, setpoint = _to_csv_list(line)
+            obj.name, stt, setpoint = row
         obj.number = int(number_str)
         obj.ac_bus = data.find_bus(int(ac_bus))
         obj.dc_bus = data.find_dcbus(int(dc_bus))
@@ -1745,7 +2951,7 @@ class AcDcConverterVsc(AcDcConverter):
         obj.aloss = float(aloss)
         obj.bloss = float(bloss)
         obj.minloss = float(minloss)
-        obj.pwf = float(pwf)
+        obj.power_factor = float(pwf)
         obj.qmin = float(qmin)
         obj.qmax = float(qmax)
         obj.rmpct = float(rmpct)
@@ -1755,3 +2961,79 @@ class AcDcConverterVsc(AcDcConverter):
         obj.stt = int(stt)
         obj.setpoint = float(setpoint)
         return obj
+
+
+# Record type and NpFile collection of each section, by section header.
+_SECTION_TYPES = {
+    Bus.header: (Bus, "buses"),
+    MiddlePointBus.header: (MiddlePointBus, "middlepoint_buses"),
+    Area.header: (Area, "areas"),
+    Region.header: (Region, "regions"),
+    Owner.header: (Owner, "owners"),
+    System.header: (System, "systems"),
+    Demand.header: (Demand, "demands"),
+    Generator.header: (Generator, "generators"),
+    BusShunt.header: (BusShunt, "bus_shunts"),
+    Line.header: (Line, "lines"),
+    LineShunt.header: (LineShunt, "line_shunts"),
+    Transformer.header: (Transformer, "transformers"),
+    EquivalentTransformer.header: (EquivalentTransformer,
+                                   "equivalent_transformers"),
+    ThreeWindingTransformer.header: (ThreeWindingTransformer,
+                                     "three_winding_transformers"),
+    ControlledSeriesCapacitor.header: (ControlledSeriesCapacitor, "cscs"),
+    StaticVarCompensator.header: (StaticVarCompensator, "svcs"),
+    DcLink.header: (DcLink, "dclinks"),
+    DcBus.header: (DcBus, "dcbuses"),
+    DcLine.header: (DcLine, "dclines"),
+    AcDcConverterLcc.header: (AcDcConverterLcc, "lcc_converters"),
+    AcDcConverterVsc.header: (AcDcConverterVsc, "vsc_converters"),
+}
+
+# Record type of each NpFile collection that can be read from a file.
+_COLLECTION_TYPES = {collection: element_class
+                     for element_class, collection in _SECTION_TYPES.values()}
+
+_CLASS_COLLECTIONS = {element_class: collection
+                      for collection, element_class in
+                      _COLLECTION_TYPES.items()}
+_CLASS_COLLECTIONS[Ownership] = "ownerships"
+
+
+def _track_key_edits(klass, names):
+    # type: (type, tuple) -> None
+    """Count the assignments to fields of a record class, see _key_edits."""
+    for name in names:
+        field = klass.__dict__[name]
+
+        def set_field(record, value, set_=field.__set__):
+            global _key_edits
+            _key_edits += 1
+            set_(record, value)
+        setattr(klass, name, property(field.__get__, set_field))
+
+
+# Fields the lookup indexes are keyed on, by the record class declaring
+# them.
+_KEY_FIELDS = (
+    (System, ("number",)),
+    (Region, ("number",)),
+    (Area, ("number",)),
+    (Bus, ("number",)),
+    (SeriesType, ("from_bus", "to_bus", "parallel_circuit_number")),
+    (Transformer, ("name",)),
+    (DcLink, ("number",)),
+    (DcBus, ("number",)),
+    # Fields the bus adjacency (see _ADJACENCY_COLLECTIONS) is built on.
+    (Demand, ("bus",)),
+    (Generator, ("bus",)),
+    (BusShunt, ("bus",)),
+    (StaticVarCompensator, ("bus",)),
+    (LineShunt, ("circuit", "terminal")),
+    (AcDcConverter, ("ac_bus",)),
+)
+for _klass, _names in _KEY_FIELDS:
+    _track_key_edits(_klass, _names)
+del _klass, _names
+_KEY_FIELD_NAMES = frozenset(name for _, names in _KEY_FIELDS
+                             for name in names)
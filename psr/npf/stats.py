@@ -0,0 +1,205 @@
+"""Instrumentation of NPF file reads and writes."""
+import time
+from typing import Optional
+
+
+# Operation names.
+READ = "read"
+WRITE = "write"
+
+
+class NpfStats(object):
+    """Accumulates timings of NpFile.from_file and NpFile.save.
+
+    Pass an instance as the stats argument of those methods. It records,
+    for each operation ("read" or "write"), the number of files, wall time,
+    records and bytes; the same per section, by section header; and the
+    number of calls and cumulative time of each find_* lookup made while
+    reading. Values add up over every file read or written with the same
+    instance.
+
+    Section sizes are the encoded bytes of the uncompressed text. Section
+    times of parallel loads are the parse times of their chunks in the
+    workers, and those of lazy loads are recorded when the sections are
+    parsed.
+
+    Lookups made by the caller on the NpFile itself are not timed; make
+    them through timed(data) to record them as well.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # type: () -> None
+        # Totals by operation.
+        self.operations = {}
+        # Totals by (operation, section header).
+        self.sections = {}
+        # [calls, seconds] by lookup method name.
+        self.lookups = {}
+
+    @staticmethod
+    def _add(totals, key, seconds, records, size, count=0):
+        # type: (dict, object, float, int, int, int) -> None
+        entry = totals.get(key)
+        if entry is None:
+            entry = {"count": 0, "seconds": 0.0, "records": 0, "bytes": 0}
+            totals[key] = entry
+        entry["count"] += count
+        entry["seconds"] += seconds
+        entry["records"] += records
+        entry["bytes"] += size
+
+    def add_operation(self, operation, seconds, records, size):
+        # type: (str, float, int, int) -> None
+        """Record a whole file read or written."""
+        self._add(self.operations, operation, seconds, records, size, 1)
+
+    def add_section(self, operation, section, seconds, records, size):
+        # type: (str, str, float, int, int) -> None
+        """Record a section read or written."""
+        self._add(self.sections, (operation, section), seconds, records,
+                  size)
+
+    def lookup_counter(self, name):
+        # type: (str) -> list
+        """The [calls, seconds] counter of a lookup method."""
+        counter = self.lookups.get(name)
+        if counter is None:
+            counter = [0, 0.0]
+            self.lookups[name] = counter
+        return counter
+
+    def timed(self, data):
+        # type: ("NpFile") -> object
+        """Proxy of an NpFile whose find_* lookups are timed in these
+        stats. Other attributes are those of the NpFile."""
+        return _TimedLookups(data, self)
+
+    def as_dict(self):
+        # type: () -> dict
+        """The recorded values as nested dictionaries."""
+        sections = {}
+        for (operation, section), entry in self.sections.items():
+            values = dict(entry)
+            del values["count"]
+            sections.setdefault(operation, {})[section] = values
+        return {
+            "operations": {operation: dict(entry)
+                           for operation, entry in self.operations.items()},
+            "sections": sections,
+            "lookups": {name: {"calls": calls, "seconds": seconds}
+                        for name, (calls, seconds) in self.lookups.items()},
+        }
+
+    def to_prometheus(self, prefix="npf"):
+        # type: (str) -> str
+        """The recorded values in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append("# HELP {}_{} {}".format(prefix, name, help_text))
+            lines.append("# TYPE {}_{} counter".format(prefix, name))
+            for labels, value in samples:
+                label_text = ",".join("{}=\"{}\"".format(key, label)
+                                      for key, label in labels)
+                lines.append("{}_{}{{{}}} {}".format(prefix, name,
+                                                     label_text, value))
+
+        operations = sorted(self.operations.items())
+        metric("file_count_total", "Files read or written.",
+               [((("operation", operation),), entry["count"])
+                for operation, entry in operations])
+        for field, unit, help_text in (
+                ("seconds", "seconds", "Time spent reading or writing "
+                                       "files."),
+                ("records", "records", "Records read or written."),
+                ("bytes", "bytes", "Bytes read or written.")):
+            metric("file_{}_total".format(unit), help_text,
+                   [((("operation", operation),), entry[field])
+                    for operation, entry in operations])
+        sections = sorted(self.sections.items())
+        for field, unit, help_text in (
+                ("seconds", "seconds", "Time spent on each section."),
+                ("records", "records", "Records of each section."),
+                ("bytes", "bytes", "Bytes of each section.")):
+            metric("section_{}_total".format(unit), help_text,
+                   [((("operation", operation), ("section", section)),
+                     entry[field])
+                    for (operation, section), entry in sections])
+        lookups = sorted(self.lookups.items())
+        metric("lookup_calls_total", "Calls of each find_* lookup.",
+               [((("lookup", name),), calls) for name, (calls, _) in lookups])
+        metric("lookup_seconds_total", "Time spent in each find_* lookup.",
+               [((("lookup", name),), seconds)
+                for name, (_, seconds) in lookups])
+        return "\n".join(lines) + "\n"
+
+
+class _TimedLookups(object):
+    """Stands in for the NpFile while parsing, timing its lookups."""
+    def __init__(self, references, stats):
+        # type: (object, NpfStats) -> None
+        self._references = references
+        self._stats = stats
+
+    def __getattr__(self, name):
+        find = getattr(self._references, name)
+        if not name.startswith("find_"):
+            return find
+        counter = self._stats.lookup_counter(name)
+        clock = time.perf_counter
+
+        def timed_find(*key):
+            start = clock()
+            try:
+                return find(*key)
+            finally:
+                counter[0] += 1
+                counter[1] += clock() - start
+        setattr(self, name, timed_find)
+        return timed_find
+
+
+def _encoding(stream):
+    # type: (object) -> str
+    """Encoding of a text stream, UTF-8 for in-memory streams."""
+    return getattr(stream, "encoding", None) or "utf-8"
+
+
+class _CountingReader(object):
+    """Text file wrapper counting the bytes read, in the encoding of the
+    file."""
+    def __init__(self, stream):
+        self._stream = stream
+        self._encoding = _encoding(stream)
+        self.size = 0
+
+    def readline(self):
+        # type: () -> str
+        line = self._stream.readline()
+        self.size += len(line.encode(self._encoding, "replace"))
+        return line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # type: () -> str
+        line = next(self._stream)
+        self.size += len(line.encode(self._encoding, "replace"))
+        return line
+
+
+class _CountingWriter(object):
+    """Text stream wrapper counting the bytes written, in the encoding of
+    the stream."""
+    def __init__(self, stream):
+        self._stream = stream
+        self._encoding = _encoding(stream)
+        self.size = 0
+
+    def write(self, text):
+        # type: (str) -> Optional[int]
+        self.size += len(text.encode(self._encoding, "replace"))
+        return self._stream.write(text)
@@ -0,0 +1,549 @@
+"""Reproducible synthetic networks, e.g. for scaling tests and benchmarks.
+
+generate_case(seed, buses) builds an NpFile with a realistic mix of
+elements: buses of several voltage levels grouped in areas, AC lines
+within each voltage level, transformers between levels, three-winding
+transformers, and LCC and VSC DC links with their DC buses, DC lines and
+converters. The same arguments always build the same case.
+
+Requires NumPy, which draws the topology and parameters of the case.
+"""
+import gc
+from typing import Optional
+
+import numpy
+
+from .rev1 import (AcDcConverterLcc, AcDcConverterVsc, Area, Bus, DcBus,
+                   DcLine, DcLink, Demand, EquivalentTransformer, Generator,
+                   Line, MiddlePointBus, NpFile, NpfException, Region,
+                   System, ThreeWindingTransformer, Transformer)
+
+
+# Voltage levels (kV), their share of the buses, line rating (MW) and
+# maximum line length (km).
+_LEVELS = (
+    (500.0, 0.05, 2000.0, 400.0),
+    (230.0, 0.20, 500.0, 150.0),
+    (138.0, 0.30, 200.0, 80.0),
+    (69.0, 0.45, 80.0, 40.0),
+)
+
+# Series reactance (ohm/km) and shunt susceptance (S/km) of AC lines.
+_X_OHM_KM = 0.4
+_B_S_KM = 2.8e-6
+
+# Base voltage, share of the buses, line rating, maximum line length,
+# reactance (% on 100 MVA) per km and charging (Mvar) per km, indexed by
+# voltage level (highest first).
+_KVBASES, _SHARES, _RATINGS, _MAX_LENGTHS = \
+    (numpy.array(column) for column in zip(*_LEVELS))
+_X_PCT_KM = _X_OHM_KM * 1e4 / _KVBASES ** 2
+_MVAR_KM = _B_S_KM * _KVBASES ** 2
+
+# Characters of the two-character area and region identifiers.
+_ID_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Generator types and their share of the generators.
+_GENERATOR_TYPES = (Generator.TYPE_THERMAL, Generator.TYPE_HYDRO,
+                    Generator.TYPE_RENEWABLE)
+_GENERATOR_WEIGHTS = (0.5, 0.3, 0.2)
+
+
+def _identifier(number):
+    # type: (int) -> str
+    base = len(_ID_CHARS)
+    return _ID_CHARS[(number // base) % base] + _ID_CHARS[number % base]
+
+
+def _circuit_numbers(from_index, to_index, bus_count):
+    # type: (numpy.ndarray, numpy.ndarray, int) -> numpy.ndarray
+    """Number the circuits between each (from, to) pair of buses 1, 2, ...
+    in order of appearance."""
+    keys = from_index * bus_count + to_index
+    order = numpy.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    firsts = numpy.flatnonzero(numpy.diff(sorted_keys, prepend=-1))
+    run_starts = numpy.repeat(firsts,
+                              numpy.diff(numpy.append(firsts, len(keys))))
+    numbers = numpy.empty(len(keys), numpy.int64)
+    numbers[order] = numpy.arange(len(keys)) - run_starts + 1
+    return numbers
+
+
+class _CaseBuilder(object):
+    """Adds the elements of a synthetic case to an NpFile.
+
+    Topology and parameters are drawn as NumPy arrays of bus indexes and
+    values; the records are then created in a single pass per collection.
+    """
+    def __init__(self, seed):
+        # type: (int) -> None
+        self.random = numpy.random.default_rng(seed)
+        self.data = NpFile()
+        # Last series number used by lines, transformers and DC lines.
+        self.series_count = 0
+        # Voltage level of each bus. Buses are sorted by area and level,
+        # so that those of an area and level form a contiguous group.
+        self.bus_levels = numpy.zeros(0, numpy.int64)
+        # First bus and number of buses of each group.
+        self.group_starts = numpy.zeros(0, numpy.int64)
+        self.group_sizes = numpy.zeros(0, numpy.int64)
+        # Top level group of each area.
+        self.area_tops = numpy.zeros(0, numpy.int64)
+
+    def _next_series(self):
+        # type: () -> int
+        self.series_count += 1
+        return self.series_count
+
+    def _pick(self, groups):
+        # type: (numpy.ndarray) -> numpy.ndarray
+        """Index of a random bus of each group."""
+        return self.group_starts[groups] + \
+            self.random.integers(0, self.group_sizes[groups])
+
+    def add_areas(self, area_count, region_count):
+        # type: (int, int) -> None
+        system = System()
+        system.number = 1
+        system.id = "sy"
+        system.name = "System"
+        self.data.systems = [system]
+        regions = []
+        for number in range(1, region_count + 1):
+            region = Region()
+            region.number = number
+            region.id = _identifier(number)
+            region.name = "Region {}".format(number)
+            region.system = system
+            regions.append(region)
+        areas = []
+        for number in range(1, area_count + 1):
+            area = Area()
+            area.number = number
+            area.id = _identifier(number)
+            area.name = "Area {}".format(number)
+            area.system = system
+            areas.append(area)
+        self.data.regions = regions
+        self.data.areas = areas
+
+    def add_buses(self, bus_count):
+        # type: (int) -> None
+        """Create the AC buses, split in contiguous blocks per area."""
+        data = self.data
+        system = data.systems[0]
+        areas = data.areas
+        regions = data.regions
+        area_starts = numpy.arange(len(areas)) * bus_count // len(areas)
+        bus_areas = numpy.searchsorted(area_starts, numpy.arange(bus_count),
+                                       "right") - 1
+        levels = self.random.choice(len(_LEVELS), bus_count, p=_SHARES)
+        levels = levels[numpy.lexsort((levels, bus_areas))]
+        self.bus_levels = levels
+        groups = bus_areas * len(_LEVELS) + levels
+        self.group_starts = numpy.flatnonzero(
+            numpy.diff(groups, prepend=-1))
+        self.group_sizes = numpy.diff(
+            numpy.append(self.group_starts, bus_count))
+        self.area_tops = numpy.flatnonzero(
+            numpy.diff(bus_areas[self.group_starts], prepend=-1))
+
+        area_regions = [regions[index * len(regions) // len(areas)]
+                        for index in range(len(areas))]
+        buses = []
+        for number, kvbase, area_index in zip(
+                range(1, bus_count + 1), _KVBASES[levels].tolist(),
+                bus_areas.tolist()):
+            bus = Bus()
+            bus.number = number
+            bus.name = "B{}".format(number)
+            bus.kvbase = kvbase
+            bus.area = areas[area_index]
+            bus.region = area_regions[area_index]
+            bus.system = system
+            buses.append(bus)
+        data.buses = buses
+
+    def add_branches(self, line_count, transformer_count):
+        # type: (int, int) -> None
+        """Connect the buses with a random spanning tree, then add lines
+        and transformers until the requested counts are reached."""
+        rand = self.random.random
+        integers = self.random.integers
+        starts = self.group_starts
+        sizes = self.group_sizes
+        tops = self.area_tops
+        bus_count = len(self.bus_levels)
+        bus_groups = numpy.repeat(numpy.arange(len(starts)), sizes)
+        positions = numpy.arange(bus_count) - starts[bus_groups]
+
+        # Every bus but the first of its group hangs from a nearby earlier
+        # one, which keeps the network sparse and meshed locally.
+        inner = numpy.flatnonzero(positions > 0)
+        back = (10 * rand(len(inner)) ** 2).astype(numpy.int64)
+        line_from = [starts[bus_groups[inner]] +
+                     numpy.maximum(0, positions[inner] - 1 - back)]
+        line_to = [inner]
+        # The first bus of the top level of an area hangs from the top
+        # level of the previous area by a tie line, and that of the other
+        # levels from the level above by a transformer.
+        line_from.append(self._pick(tops[:-1]))
+        line_to.append(starts[tops[1:]])
+        lower = numpy.setdiff1d(numpy.arange(len(starts)), tops)
+        transformer_from = [self._pick(lower - 1)]
+        transformer_to = [starts[lower]]
+
+        extra = line_count - len(inner) - len(tops) + 1
+        meshed = numpy.flatnonzero(sizes > 1)
+        if extra > 0 and len(meshed) > 0:
+            groups = meshed[integers(0, len(meshed), extra)]
+            positions = integers(1, sizes[groups])
+            back = (20 * rand(extra) ** 2).astype(numpy.int64)
+            line_from.append(starts[groups] +
+                             numpy.maximum(0, positions - 1 - back))
+            line_to.append(starts[groups] + positions)
+        extra = transformer_count - len(lower)
+        if extra > 0 and len(lower) > 0:
+            groups = lower[integers(0, len(lower), extra)]
+            transformer_from.append(self._pick(groups - 1))
+            transformer_to.append(self._pick(groups))
+
+        line_from = numpy.concatenate(line_from)
+        line_to = numpy.concatenate(line_to)
+        transformer_from = numpy.concatenate(transformer_from)
+        transformer_to = numpy.concatenate(transformer_to)
+        circuits = _circuit_numbers(
+            numpy.concatenate((line_from, transformer_from)),
+            numpy.concatenate((line_to, transformer_to)), bus_count)
+        self._add_lines(line_from, line_to, circuits[:len(line_from)])
+        self._add_transformers(transformer_from, transformer_to,
+                               circuits[len(line_from):])
+
+    def _add_lines(self, from_index, to_index, circuits):
+        # type: (numpy.ndarray, numpy.ndarray, numpy.ndarray) -> None
+        """Add a line between each pair of buses."""
+        rand = self.random.random
+        count = len(from_index)
+        levels = self.bus_levels[from_index]
+        lengths = _MAX_LENGTHS[levels] * (0.05 + 0.95 * rand(count))
+        x_pcts = _X_PCT_KM[levels] * lengths
+        r_pcts = x_pcts * (0.05 + 0.1 * rand(count))
+        mvars = _MVAR_KM[levels] * lengths
+        ratings = _RATINGS[levels]
+
+        buses = self.data.buses
+        lines = []
+        first = self.series_count + 1
+        for number, series_number, from_bus, to_bus, circuit, length, \
+                x_pct, r_pct, mvar, rating in zip(
+                    range(1, count + 1), range(first, first + count),
+                    from_index.tolist(), to_index.tolist(),
+                    circuits.tolist(), lengths.tolist(), x_pcts.tolist(),
+                    r_pcts.tolist(), mvars.tolist(), ratings.tolist()):
+            line = Line()
+            line.from_bus = buses[from_bus]
+            line.to_bus = buses[to_bus]
+            line.parallel_circuit_number = circuit
+            line.series_number = series_number
+            line.number = number
+            line.name = "L" + str(number)
+            line.x_pct = x_pct
+            line.r_pct = r_pct
+            line.mvar = mvar
+            line.normal_rating = rating
+            line.emergency_rating = 1.2 * rating
+            line.length_km = length
+            lines.append(line)
+        self.series_count += count
+        self.data.lines = lines
+
+    def _transformer_reactances(self, levels):
+        # type: (numpy.ndarray) -> tuple
+        """Rating and reactance (% on 100 MVA) of transformers rated after
+        buses of some voltage levels."""
+        ratings = _RATINGS[levels]
+        # 5% to 15% on the transformer base, converted to 100 MVA.
+        x_pcts = (5.0 + 10.0 * self.random.random(len(levels))) * \
+            100.0 / ratings
+        return ratings, x_pcts
+
+    def _add_transformers(self, high_index, low_index, circuits):
+        # type: (numpy.ndarray, numpy.ndarray, numpy.ndarray) -> None
+        """Add a transformer between each (higher, lower voltage) pair of
+        buses."""
+        count = len(high_index)
+        ratings, x_pcts = \
+            self._transformer_reactances(self.bus_levels[low_index])
+        buses = self.data.buses
+        transformers = []
+        first = self.series_count + 1
+        for number, series_number, high_bus, low_bus, circuit, rating, \
+                x_pct in zip(range(1, count + 1), range(first, first + count),
+                             high_index.tolist(), low_index.tolist(),
+                             circuits.tolist(), ratings.tolist(),
+                             x_pcts.tolist()):
+            transformer = Transformer()
+            transformer.from_bus = buses[high_bus]
+            transformer.to_bus = buses[low_bus]
+            transformer.parallel_circuit_number = circuit
+            transformer.series_number = series_number
+            transformer.name = "T" + str(number)
+            transformer.x_pct = x_pct
+            transformer.r_pct = x_pct / 40.0
+            transformer.normal_rating = rating
+            transformer.emergency_rating = 1.2 * rating
+            transformers.append(transformer)
+        self.series_count += count
+        self.data.transformers = transformers
+
+    def add_three_winding_transformers(self, count):
+        # type: (int) -> None
+        """Add three-winding transformers between the top three voltage
+        levels of random areas."""
+        tops = self.area_tops
+        levels_per_area = numpy.diff(numpy.append(tops,
+                                                  len(self.group_starts)))
+        eligible = tops[levels_per_area >= 3]
+        if len(eligible) == 0 or count <= 0:
+            return
+        chosen = eligible[self.random.integers(0, len(eligible), count)]
+        # Primary, secondary and tertiary bus of each transformer.
+        windings = numpy.stack([self._pick(chosen + level)
+                                for level in range(3)], axis=1)
+        ratings, x_pcts = self._transformer_reactances(
+            self.bus_levels[windings.ravel()])
+
+        data = self.data
+        buses = data.buses
+        middles = []
+        equivalents = []
+        transformers = []
+        ratings = ratings.tolist()
+        x_pcts = x_pcts.tolist()
+        for index, winding_index in enumerate(windings.tolist()):
+            winding_buses = [buses[bus] for bus in winding_index]
+            middle = MiddlePointBus()
+            middle.number = len(buses) + index + 1
+            middle.name = "M{}".format(index + 1)
+            middle.kvbase = 1.0
+            middle.area = winding_buses[0].area
+            middle.region = winding_buses[0].region
+            middle.system = winding_buses[0].system
+            middles.append(middle)
+            parts = []
+            for bus in winding_buses:
+                position = len(equivalents)
+                equivalent = EquivalentTransformer()
+                equivalent.from_bus = bus
+                equivalent.to_bus = middle
+                equivalent.parallel_circuit_number = 1
+                equivalent.series_number = self._next_series()
+                equivalent.name = "E" + str(position + 1)
+                equivalent.x_pct = x_pcts[position]
+                equivalent.r_pct = x_pcts[position] / 40.0
+                equivalent.normal_rating = ratings[position]
+                equivalent.emergency_rating = 1.2 * ratings[position]
+                equivalents.append(equivalent)
+                parts.append(equivalent)
+            primary, secondary, tertiary = parts
+            transformer = ThreeWindingTransformer()
+            transformer.primary_transformer = primary
+            transformer.secondary_transformer = secondary
+            transformer.tertiary_transformer = tertiary
+            transformer.middlepoint_bus = middle
+            transformer.xps_pct = primary.x_pct + secondary.x_pct
+            transformer.xst_pct = secondary.x_pct + tertiary.x_pct
+            transformer.xpt_pct = primary.x_pct + tertiary.x_pct
+            transformer.sbaseps_mva = transformer.sbasest_mva = \
+                transformer.sbasept_mva = 100.0
+            transformer.series_number = self._next_series()
+            transformer.name = "T3W{}".format(index + 1)
+            transformers.append(transformer)
+        data.middlepoint_buses = middles
+        data.equivalent_transformers = equivalents
+        data.three_winding_transformers = transformers
+
+    def _dcbus(self, link, ac_bus, polarity):
+        # type: (DcLink, Bus, str) -> DcBus
+        dcbus = DcBus()
+        dcbus.number = len(self.data.dcbuses) + 1
+        dcbus.name = "DCB{}".format(dcbus.number)
+        dcbus.polarity = polarity
+        if polarity == DcBus.POLARITY_NEUTRAL:
+            dcbus.volt = 0.0
+        dcbus.area = ac_bus.area
+        dcbus.region = ac_bus.region
+        dcbus.system = ac_bus.system
+        dcbus.dclink = link
+        self.data.dcbuses.append(dcbus)
+        return dcbus
+
+    def add_dclinks(self, count):
+        # type: (int) -> None
+        """Add point-to-point DC links, alternating LCC and VSC, between
+        top level buses of different areas when there are several."""
+        tops = self.area_tops
+        if len(tops) == 0 or count <= 0:
+            return
+        integers = self.random.integers
+        first = integers(0, len(tops), count)
+        second = (first + 1 + integers(0, len(tops) - 1, count)) % \
+            len(tops) if len(tops) > 1 else first
+        ac_index = numpy.stack([self._pick(tops[first]),
+                                self._pick(tops[second])], axis=1)
+        mwbases = (100 * (5 + integers(0, 26, count))).astype(float)
+        r_ohms = 5.0 + 15.0 * self.random.random(count)
+
+        data = self.data
+        buses = data.buses
+        for number, terminals, mwbase, r_ohm in zip(
+                range(1, count + 1), ac_index.tolist(), mwbases.tolist(),
+                r_ohms.tolist()):
+            ac_buses = [buses[bus] for bus in terminals]
+            link = DcLink()
+            link.number = number
+            link.name = "DCL{}".format(number)
+            link.type = DcLink.TYPE_LCC if number % 2 == 1 \
+                else DcLink.TYPE_VSC
+            link.kvbase = 500.0 if link.type == DcLink.TYPE_LCC else 320.0
+            link.mwbase = mwbase
+            data.dclinks.append(link)
+            poles = [self._dcbus(link, bus, DcBus.POLARITY_POSITIVE)
+                     for bus in ac_buses]
+            neutrals = [self._dcbus(link, bus, DcBus.POLARITY_NEUTRAL)
+                        for bus in ac_buses]
+            dcline = DcLine()
+            dcline.from_bus = poles[0]
+            dcline.to_bus = poles[1]
+            dcline.r_ohm = r_ohm
+            dcline.normal_rating = link.mwbase
+            dcline.series_number = self._next_series()
+            dcline.name = "DCLN{}".format(number)
+            data.dclines.append(dcline)
+            for terminal in range(2):
+                if link.type == DcLink.TYPE_LCC:
+                    converter = AcDcConverterLcc()
+                    converter.type = AcDcConverterLcc.TYPE_RECTIFIER \
+                        if terminal == 0 else AcDcConverterLcc.TYPE_INVERTER
+                    converter.nominal_power = link.mwbase
+                    data.lcc_converters.append(converter)
+                else:
+                    converter = AcDcConverterVsc()
+                    converter.ctr_bus = ac_buses[terminal]
+                    converter.qmin = -0.5 * link.mwbase
+                    converter.qmax = 0.5 * link.mwbase
+                    data.vsc_converters.append(converter)
+                converter.number = len(data.lcc_converters) + \
+                    len(data.vsc_converters)
+                converter.name = "CNV{}".format(converter.number)
+                converter.ac_bus = ac_buses[terminal]
+                converter.dc_bus = poles[terminal]
+                converter.neutral_bus = neutrals[terminal]
+
+    def add_injections(self, demand_count, generator_count):
+        # type: (int, int) -> None
+        """Add demands and generators at random buses, with a generation
+        dispatch that covers the total demand."""
+        data = self.data
+        buses = data.buses
+        if len(buses) == 0:
+            return
+        rand = self.random.random
+        integers = self.random.integers
+        demand_buses = integers(0, len(buses), demand_count)
+        p_mws = 5.0 + 195.0 * rand(demand_count)
+        q_mws = p_mws * (0.1 + 0.3 * rand(demand_count))
+        types = self.random.choice(len(_GENERATOR_TYPES), generator_count,
+                                   p=_GENERATOR_WEIGHTS)
+        generator_buses = integers(0, len(buses), generator_count)
+        pmaxs = 20.0 + 780.0 * rand(generator_count)
+        total_capacity = float(pmaxs.sum())
+        # Dispatch in proportion to capacity, with 2% for the losses.
+        share = min(1.0, 1.02 * float(p_mws.sum()) / total_capacity) \
+            if total_capacity > 0 else 0.0
+
+        demands = []
+        for number, bus, p_mw, q_mw in zip(
+                range(1, demand_count + 1), demand_buses.tolist(),
+                p_mws.tolist(), q_mws.tolist()):
+            demand = Demand()
+            demand.number = number
+            demand.name = "D{}".format(number)
+            demand.bus = buses[bus]
+            demand.p_mw = p_mw
+            demand.q_mw = q_mw
+            demands.append(demand)
+        data.demands = demands
+        generators = []
+        for number, generator_type, bus, pmax in zip(
+                range(1, generator_count + 1), types.tolist(),
+                generator_buses.tolist(), pmaxs.tolist()):
+            generator = Generator()
+            generator.number = number
+            generator.name = "G{}".format(number)
+            generator.type = _GENERATOR_TYPES[generator_type]
+            generator.bus = buses[bus]
+            generator.ctr_bus = generator.bus
+            generator.pmax = pmax
+            generator.qmin = -0.4 * pmax
+            generator.qmax = 0.5 * pmax
+            generator.pgen = pmax * share
+            generators.append(generator)
+        data.generators = generators
+
+
+def generate_case(seed=0,  # type: int
+                  buses=1000,  # type: int
+                  areas=None,  # type: Optional[int]
+                  regions=None,  # type: Optional[int]
+                  lines=None,  # type: Optional[int]
+                  transformers=None,  # type: Optional[int]
+                  three_winding_transformers=None,  # type: Optional[int]
+                  dclinks=None,  # type: Optional[int]
+                  demands=None,  # type: Optional[int]
+                  generators=None,  # type: Optional[int]
+                  ):
+    # type: (...) -> NpFile
+    """Build a synthetic case with a number of AC buses.
+
+    The other counts default to proportions typical of transmission
+    networks: one area per 1000 buses, one region per four areas, 1.2
+    lines and 0.15 transformers per bus, one three-winding transformer per
+    200 buses, one DC link per 5000 buses, one demand per two buses and
+    one generator per ten buses. The AC network is always connected, so
+    the counts of lines and transformers may be exceeded to connect every
+    bus.
+    """
+    if buses < 1:
+        raise NpfException("A case needs at least one bus")
+    if areas is None:
+        areas = max(1, buses // 1000)
+    areas = min(areas, buses)
+    if regions is None:
+        regions = max(1, areas // 4)
+    regions = min(regions, areas)
+    builder = _CaseBuilder(seed)
+    builder.data.description = \
+        "Synthetic case: seed {}, {} buses".format(seed, buses)
+    # Nothing built here becomes garbage; pausing the collector avoids
+    # rescanning millions of live records.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        builder.add_areas(areas, regions)
+        builder.add_buses(buses)
+        builder.add_branches(
+            int(1.2 * buses) if lines is None else lines,
+            int(0.15 * buses) if transformers is None else transformers)
+        builder.add_three_winding_transformers(
+            buses // 200 if three_winding_transformers is None
+            else three_winding_transformers)
+        builder.add_dclinks(buses // 5000 if dclinks is None else dclinks)
+        builder.add_injections(buses // 2 if demands is None else demands,
+                               max(1, buses // 10) if generators is None
+                               else generators)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return builder.data
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+import psr.npf as npf
+
+
+SAMPLE_PATH = os.path.join(os.path.dirname(__file__), "data", "sample.npf")
+
+
+@pytest.fixture
+def sample_path():
+    """Path of a small NPF file with every kind of section."""
+    return SAMPLE_PATH
+
+
+@pytest.fixture
+def sample():
+    return npf.NpFile.from_file(SAMPLE_PATH)
+
+
+@pytest.fixture
+def case():
+    """Factory of synthetic cases: case(buses, seed=1, **counts)."""
+    pytest.importorskip("numpy")
+
+    def build(buses, seed=1, **counts):
+        return npf.generate_case(seed, buses, **counts)
+    return build
+
+
+@pytest.fixture
+def fractional_case(case):
+    """Factory of synthetic cases with fractions in fields whose defaults
+    are integers, which exports must not truncate."""
+    def build(buses, seed=1):
+        data = case(buses, seed)
+        for index, bus in enumerate(data.buses):
+            bus.cost = 12.75 + index
+        for generator in data.generators:
+            generator.pmin = 10.5
+            generator.qmin = -3.25
+            generator.pmax += 0.55
+        for line in data.lines:
+            line.length_km = 33.3
+        for transformer in data.transformers:
+            transformer.power_factor = 0.95
+        return data
+    return build
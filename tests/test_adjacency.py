@@ -0,0 +1,97 @@
+import pytest
+
+import psr.npf as npf
+
+
+def _brute_force_incident(data, number):
+    elements = []
+    for collection in ("lines", "transformers", "equivalent_transformers",
+                       "cscs"):
+        for branch in getattr(data, collection):
+            if number in (branch.from_bus.number, branch.to_bus.number):
+                elements.append(branch)
+    for collection in ("demands", "generators", "bus_shunts"):
+        elements.extend(element for element in getattr(data, collection)
+                        if element.bus.number == number)
+    for shunt in data.line_shunts:
+        bus = shunt.circuit.to_bus \
+            if shunt.terminal == npf.LineShunt.TERMINAL_TO \
+            else shunt.circuit.from_bus
+        if bus.number == number:
+            elements.append(shunt)
+    elements.extend(svc for svc in data.svcs if svc.bus.number == number)
+    for collection in ("lcc_converters", "vsc_converters"):
+        elements.extend(converter
+                        for converter in getattr(data, collection)
+                        if converter.ac_bus.number == number)
+    return elements
+
+
+def _check(data):
+    for bus in list(data.buses) + list(data.middlepoint_buses):
+        assert data.incident(bus) == _brute_force_incident(data, bus.number)
+
+
+def test_incident_matches_a_scan(sample):
+    _check(sample)
+    bus = sample.lines[0].from_bus
+    neighbors = sample.neighbors(bus.number)
+    assert len(neighbors) == len(set(other.number for other in neighbors))
+    assert all(line.to_bus in neighbors for line in sample.lines
+               if line.from_bus is bus)
+
+
+def test_incident_after_topology_edits(sample):
+    data = sample
+    _check(data)
+    line = data.lines[0]
+    old_bus = line.to_bus
+    new_bus = next(bus for bus in data.buses
+                   if bus is not line.from_bus and bus is not old_bus)
+    line.to_bus = new_bus
+    assert line in data.incident(new_bus)
+    assert line not in data.incident(old_bus)
+    assert new_bus in data.neighbors(line.from_bus)
+
+    demand = data.demands[0]
+    demand.bus = new_bus
+    assert demand in data.incident(new_bus)
+    shunt = data.line_shunts[0]
+    shunt.terminal = npf.LineShunt.TERMINAL_FROM \
+        if shunt.terminal == npf.LineShunt.TERMINAL_TO \
+        else npf.LineShunt.TERMINAL_TO
+    _check(data)
+
+    number = new_bus.number
+    new_bus.number = 9000
+    assert data.incident(number) == []
+    assert line in data.incident(9000)
+    assert new_bus in data.neighbors(line.from_bus)
+    _check(data)
+
+
+def test_incident_after_collection_edits(sample):
+    data = sample
+    _check(data)
+    removed = data.lines.pop(0)
+    assert removed not in data.incident(removed.from_bus)
+    data.lines.append(removed)
+    assert removed in data.incident(removed.from_bus)
+    data.generators = []
+    _check(data)
+
+
+@pytest.mark.parametrize("storage", ["columnar", "fork"])
+def test_incident_of_columnar_and_forked_files(sample, storage):
+    if storage == "columnar":
+        pytest.importorskip("numpy")
+        data = sample
+        data.to_columnar()
+    else:
+        data = sample.fork()
+    _check(data)
+    line = data.lines[1]
+    line.to_bus = data.buses[0]
+    _check(data)
+    data.buses[0].number = 9001
+    _check(data)
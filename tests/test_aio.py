@@ -0,0 +1,51 @@
+import asyncio
+
+import psr.npf as npf
+from psr.npf import aio
+
+
+def test_load_and_save_round_trip(case, tmp_path):
+    data = case(50)
+    path = str(tmp_path / "case.npf")
+    data.save(path)
+    pool = aio.AsyncPool(workers=2, max_loads=1)
+
+    async def round_trip():
+        loaded = await pool.load(path)
+        await pool.save(loaded, str(tmp_path / "saved.npf"))
+        return loaded
+    try:
+        loaded = asyncio.run(round_trip())
+    finally:
+        pool.shutdown()
+    assert str(loaded) == str(data)
+    assert str(npf.NpFile.from_file(str(tmp_path / "saved.npf"))) == \
+        str(data)
+
+
+def test_saves_share_the_load_limit(sample, tmp_path, monkeypatch):
+    data = sample
+    running = []
+    most = []
+    save = npf.NpFile.save
+
+    def counting_save(self, *args, **kwargs):
+        running.append(None)
+        most.append(len(running))
+        try:
+            save(self, *args, **kwargs)
+        finally:
+            running.pop()
+    monkeypatch.setattr(npf.NpFile, "save", counting_save)
+    pool = aio.AsyncPool(workers=1, max_loads=2)
+
+    async def save_all():
+        await asyncio.gather(*(
+            pool.save(data, str(tmp_path / "{}.npf".format(i)))
+            for i in range(8)))
+    try:
+        asyncio.run(save_all())
+    finally:
+        pool.shutdown()
+    assert len(most) == 8
+    assert max(most) <= 2
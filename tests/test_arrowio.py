@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+import psr.npf as npf
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("file_format", ["ipc", "parquet"])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_round_trip_is_lossless(fractional_case, tmp_path, file_format,
+                                columnar):
+    data = fractional_case(2000)
+    data.description = "Caso de referência"
+    text = str(data)
+    if columnar:
+        data.to_columnar()
+    directory = str(tmp_path / "case")
+    data.save_arrow(directory, file_format)
+    for lazy in (False, True):
+        loaded = npf.NpFile.load_arrow(directory, columnar, lazy)
+        assert str(loaded) == text
+
+
+def test_save_removes_stale_sections(case, tmp_path):
+    directory = str(tmp_path / "case")
+    data = case(50)
+    data.save_arrow(directory, "ipc")
+    other = case(60, seed=2)
+    other.save_arrow(directory, "parquet")
+    assert not any(name.endswith(".arrow") for name in os.listdir(directory))
+    assert str(npf.NpFile.load_arrow(directory)) == str(other)
+
+    unrelated = os.path.join(directory, "notes.txt")
+    with open(unrelated, "w") as notes:
+        notes.write("kept")
+    data.save_arrow(directory, "parquet")
+    assert os.path.exists(unrelated)
+    assert str(npf.NpFile.load_arrow(directory)) == str(data)
@@ -0,0 +1,50 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+import benchmark  # noqa: E402
+
+
+def _results(records_per_s, seconds=1.0):
+    return {"100": {"read": {"seconds": seconds,
+                             "records_per_s": records_per_s},
+                    "records": 10}}
+
+
+def test_regressions_beyond_the_threshold():
+    baseline = _results(1000.0)
+    assert benchmark.find_regressions(_results(850.0), baseline, 0.2) == []
+    assert benchmark.find_regressions(_results(700.0), baseline, 0.2) == \
+        [("100/read/records_per_s", 1000.0, 700.0)]
+
+
+def test_fast_baselines_are_not_compared():
+    baseline = _results(1000.0, seconds=0.001)
+    assert benchmark.find_regressions(_results(1.0), baseline, 0.2) == []
+
+
+def test_baseline_saved_and_checked(tmp_path, capsys):
+    baseline = str(tmp_path / "baseline.json")
+    options = ["--sizes", "30", "--repeat", "1", "--baseline", baseline]
+    assert benchmark.main(options + ["--save-baseline"]) == 0
+    with open(baseline) as baseline_file:
+        results = json.load(baseline_file)
+    assert results["30"]["records"] > 30
+    # A baseline far faster than any machine is a regression.
+    for timing in results["30"].values():
+        if isinstance(timing, dict) and "records_per_s" in timing:
+            timing["records_per_s"] *= 1e6
+            timing["seconds"] = 1.0
+    with open(baseline, "w") as baseline_file:
+        json.dump(results, baseline_file)
+    assert benchmark.main(options) == 1
+    assert "REGRESSION 30/read/records_per_s" in capsys.readouterr().out
+
+
+def test_save_baseline_needs_a_baseline_file():
+    with pytest.raises(SystemExit):
+        benchmark.main(["--save-baseline"])
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import psr.npf as npf
+
+
+def test_file_changed_while_parsed_is_not_served(sample_path, tmp_path,
+                                                 monkeypatch):
+    path = str(tmp_path / "case.npf")
+    shutil.copyfile(sample_path, path)
+    changed = npf.NpFile.from_file(sample_path)
+    changed.description = "Changed while parsed"
+    read_sections = npf.NpFile._read_sections
+
+    def read_and_change(self, *args, **kwargs):
+        read_sections(self, *args, **kwargs)
+        changed.save(path)
+        status = os.stat(path)
+        os.utime(path, ns=(status.st_atime_ns,
+                           status.st_mtime_ns + 1000000000))
+    monkeypatch.setattr(npf.NpFile, "_read_sections", read_and_change)
+    cache = npf.SnapshotCache(str(tmp_path / "cache"))
+    assert len(npf.NpFile.from_file(path, cache=cache).buses) == 40
+    monkeypatch.undo()
+
+    assert str(npf.NpFile.from_file(path, cache=cache)) == str(changed)
+    assert str(npf.NpFile.from_file(path, cache=cache)) == str(changed)
+
+
+def test_cache_true_uses_the_bounded_default_directory(sample_path, tmp_path,
+                                                       monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "user"))
+    path = str(tmp_path / "case.npf")
+    shutil.copyfile(sample_path, path)
+    npf.NpFile.from_file(path, cache=True)
+    assert not os.path.exists(path + npf.cache.SNAPSHOT_SUFFIX)
+    cache = npf.SnapshotCache()
+    assert cache.directory == str(tmp_path / "user" / "psr-npf")
+    assert os.path.exists(cache.snapshot_path(path))
+
+
+def test_least_recently_used_snapshots_are_evicted(sample_path, tmp_path):
+    paths = [str(tmp_path / "case{}.npf".format(i)) for i in range(3)]
+    for path in paths:
+        shutil.copyfile(sample_path, path)
+    cache = npf.SnapshotCache(str(tmp_path / "cache"))
+    npf.NpFile.from_file(paths[0], cache=cache)
+    size = os.path.getsize(cache.snapshot_path(paths[0]))
+    cache.max_bytes = 2 * size
+    for index, path in enumerate(paths):
+        npf.NpFile.from_file(path, cache=cache)
+        snapshot_path = cache.snapshot_path(path)
+        status = os.stat(snapshot_path)
+        os.utime(snapshot_path, ns=(status.st_atime_ns,
+                                    status.st_mtime_ns + index * 1000000000))
+    cache.evict()
+    assert [os.path.exists(cache.snapshot_path(path))
+            for path in paths] == [False, True, True]
+
+
+def test_sidecar_snapshots_are_limited_to_max_bytes(sample_path, tmp_path):
+    path = str(tmp_path / "case.npf")
+    shutil.copyfile(sample_path, path)
+    npf.NpFile.from_file(path, cache=npf.SnapshotCache(sidecar=True,
+                                                        max_bytes=100))
+    assert os.listdir(str(tmp_path)) == ["case.npf"]
+    npf.NpFile.from_file(path, cache=npf.SnapshotCache(sidecar=True))
+    assert os.path.exists(path + npf.cache.SNAPSHOT_SUFFIX)
@@ -0,0 +1,82 @@
+import copy
+
+import pytest
+
+import psr.npf as npf
+
+pytest.importorskip("numpy")
+
+
+def _add_middlepoint_references(data):
+    middle = data.middlepoint_buses[0]
+    line = npf.Line()
+    line.from_bus = data.buses[3]
+    line.to_bus = middle
+    line.x_pct = 5.0
+    line.parallel_circuit_number = 7
+    data.lines.append(line)
+    transformer = copy.copy(data.transformers[0])
+    transformer.from_bus = middle
+    transformer.ctr_bus = middle
+    transformer.parallel_circuit_number = 9
+    data.transformers.append(transformer)
+    return data
+
+
+def test_references_to_middlepoint_buses(sample):
+    data = _add_middlepoint_references(sample)
+    text = str(data)
+    data.to_columnar()
+    assert str(data) == text
+    line = data.lines[len(data.lines) - 1]
+    assert line.to_bus is data.middlepoint_buses[0]
+    assert data.find_line(line.from_bus.number, line.to_bus.number,
+                          7) == line
+
+
+def test_from_columns_with_middlepoint_references(sample):
+    from psr.npf import frames
+    data = _add_middlepoint_references(sample)
+    columns = frames.to_columns(data)
+    expected = str(frames.from_columns(columns))
+    assert str(frames.from_columns(columns, columnar=True)) == expected
+
+
+def test_appends_keep_the_table_version(sample):
+    data = sample
+    data.to_columnar()
+    lines = data.lines
+    record = lines[0].to_record()
+    version = lines._version
+    lines.append(record)
+    assert lines._version == version
+    assert lines[len(lines) - 1].x_pct == record.x_pct
+    lines[0] = record
+    assert lines._version == version + 1
+
+
+def test_appends_and_misses_do_not_rebuild_the_index(sample, monkeypatch):
+    data = sample
+    data.to_columnar()
+    buses = []
+    for number in range(1000, 1010):
+        bus = data.buses[0].to_record()
+        bus.number = number
+        buses.append(bus)
+    with pytest.raises(npf.NpfException):
+        data.find_bus(999)
+    rebuilds = []
+    rebuild = npf.rev1._Index._rebuild
+
+    def counting_rebuild(self, elements):
+        rebuilds.append(None)
+        rebuild(self, elements)
+    monkeypatch.setattr(npf.rev1._Index, "_rebuild", counting_rebuild)
+    for bus in buses:
+        data.buses.append(bus)
+        assert data.find_bus(bus.number).number == bus.number
+        with pytest.raises(npf.NpfException):
+            data.find_bus(999)
+    assert len(rebuilds) == 0
+    data.buses[0].number = 999
+    assert data.find_bus(999) == data.buses[0]
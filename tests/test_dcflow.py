@@ -0,0 +1,108 @@
+import math
+
+import pytest
+
+import psr.npf as npf
+
+
+numpy = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+
+def _network(bus_count):
+    data = npf.NpFile()
+    for number in range(1, bus_count + 1):
+        bus = npf.Bus()
+        bus.number = number
+        data.buses.append(bus)
+    return data
+
+
+def _branch(data, kind, from_bus, to_bus, x_pct, ncir=1):
+    branch = kind()
+    branch.from_bus = data.find_bus(from_bus)
+    branch.to_bus = data.find_bus(to_bus)
+    branch.parallel_circuit_number = ncir
+    branch.x_pct = x_pct
+    getattr(data, "lines" if kind is npf.Line else "transformers") \
+        .append(branch)
+    return branch
+
+
+def _radial():
+    """1 - 2 - 3, with the second line given from bus 3 to bus 2; 80 MW
+    generated at bus 1 for 50 MW and 30 MW of demand at buses 2 and 3."""
+    data = _network(3)
+    _branch(data, npf.Line, 1, 2, 10.0)
+    _branch(data, npf.Line, 3, 2, 20.0)
+    generator = npf.Generator()
+    generator.bus = data.find_bus(1)
+    generator.pgen = 80.0
+    data.generators.append(generator)
+    for bus, p_mw in ((2, 50.0), (3, 30.0)):
+        demand = npf.Demand()
+        demand.bus = data.find_bus(bus)
+        demand.p_mw = p_mw
+        data.demands.append(demand)
+    return data
+
+
+def test_radial_angles_and_flows():
+    flow = _radial().dc_power_flow(base_mva=100.0)
+    assert flow.slack_buses == [1]
+    assert flow.injections.tolist() == [80.0, -50.0, -30.0]
+    angles = flow.solve()
+    # 0.8 pu over 0.1 pu, then 0.3 pu over 0.2 pu.
+    assert angles == pytest.approx([0.0, -0.08, -0.14])
+    # From bus 1 to bus 2, and from bus 3 to bus 2 against the flow.
+    assert flow.branches == [("lines", 0), ("lines", 1)]
+    assert flow.flows(angles) == pytest.approx([80.0, -30.0])
+
+
+def test_phase_shifter_drives_a_loop_flow():
+    data = _network(2)
+    _branch(data, npf.Line, 1, 2, 10.0)
+    shifter = _branch(data, npf.Transformer, 1, 2, 10.0)
+    shifter.phase = 10.0
+    flow = data.dc_power_flow()
+    angles = flow.solve(numpy.zeros(2))
+    shift = math.radians(10.0)
+    # Both branches have 10 pu of susceptance: the loop flow splits the
+    # shift evenly between them.
+    assert angles == pytest.approx([0.0, -shift / 2])
+    loop = 10.0 * shift / 2 * npf.MVABASE
+    assert flow.flows(angles) == pytest.approx([loop, -loop])
+
+
+def test_one_slack_bus_per_island():
+    data = _network(4)
+    _branch(data, npf.Line, 1, 2, 10.0)
+    _branch(data, npf.Line, 3, 4, 10.0)
+    assert data.dc_power_flow().slack_buses == [1, 3]
+    flow = data.dc_power_flow(slack=4)
+    assert flow.slack_buses == [1, 4]
+    angles = flow.solve([10.0, -10.0, 20.0, -20.0])
+    assert angles[0] == 0.0 and angles[3] == 0.0
+    assert angles[2] == pytest.approx(0.02)
+    assert data.dc_power_flow(slack=[2, 3]).slack_buses == [2, 3]
+    with pytest.raises(npf.NpfException):
+        data.dc_power_flow(slack=[1, 2])
+    with pytest.raises(npf.NpfException):
+        data.dc_power_flow(slack=5)
+
+
+def test_batch_solve():
+    flow = _radial().dc_power_flow()
+    cases = numpy.array([[80.0, -50.0, -30.0],
+                         [0.0, 40.0, -40.0],
+                         [10.0, 0.0, -10.0]]).T
+    angles = flow.solve(cases)
+    assert angles.shape == (3, 3)
+    flows = flow.flows(angles)
+    assert flows.shape == (2, 3)
+    for case in range(3):
+        assert angles[:, case] == pytest.approx(flow.solve(cases[:, case]))
+        assert flows[:, case] == pytest.approx(
+            flow.flows(angles[:, case]))
+    with pytest.raises(npf.NpfException):
+        flow.solve(numpy.zeros((2, 3)))
@@ -0,0 +1,62 @@
+import copy
+import pickle
+
+import pytest
+
+import psr.npf as npf
+
+
+def _edit(fork):
+    fork.demands[1].bus.name = "ZZZ"
+    fork.lines[2].x_pct = 99.0
+    return fork
+
+
+def test_elements_are_a_single_view(sample):
+    fork = sample.fork()
+    assert fork.buses[0] is fork.buses[0]
+    assert fork.buses[-1] is fork.buses[len(fork.buses) - 1]
+    demand = fork.demands[1]
+    bus = demand.bus
+    assert any(element is bus for element in fork.buses)
+    assert fork.find_bus(bus.number) is bus
+    demand.bus.name = "ZZZ"
+    assert demand.bus is bus and bus.name == "ZZZ"
+    assert sample.demands[1].bus.name != "ZZZ"
+    assert isinstance(bus, npf.Bus)
+
+
+def test_swapping_elements(sample):
+    data = sample
+    fork = _edit(data.fork())
+    fork.lines[0], fork.lines[1] = fork.lines[1], fork.lines[0]
+    assert str(fork.lines[0]) == str(data.lines[1])
+    assert str(fork.lines[1]) == str(data.lines[0])
+    fork.lines[0].x_pct = 12.5
+    assert data.lines[1].x_pct != 12.5
+
+
+@pytest.mark.parametrize("duplicate", [
+    copy.deepcopy,
+    lambda fork: pickle.loads(pickle.dumps(fork)),
+])
+def test_copies_write_the_fork(sample, duplicate):
+    data = sample
+    fork = _edit(data.fork())
+    text = str(fork)
+    duplicated = duplicate(fork)
+    assert "ZZZ" in text
+    assert str(duplicated) == text
+    bus = duplicated.demands[1].bus
+    assert any(element is bus for element in duplicated.buses)
+    assert "ZZZ" not in str(data)
+
+
+def test_fork_to_columnar(sample):
+    pytest.importorskip("numpy")
+    data = sample
+    fork = _edit(data.fork())
+    text = str(fork)
+    fork.to_columnar()
+    assert str(fork) == text
+    assert "ZZZ" not in str(data)
@@ -0,0 +1,54 @@
+import pytest
+
+import psr.npf as npf
+
+
+def test_rows_match_the_sample_file(sample, sample_path):
+    with open(sample_path) as sample_file:
+        rows = sample_file.read().splitlines()
+    first = rows.index("BUS") + 2
+    assert [str(bus) for bus in sample.buses] == \
+        rows[first:first + len(sample.buses)]
+    assert str(sample.buses[5]) == (
+        '     6,"B6, north   ","A",  230.00, 1, 1, 1,"1900/01/01","R",'
+        '   0.00,0,0,  1.0000,  0.0000,   1.200,   0.800,   1.200,   0.800,'
+        '1')
+
+
+def test_rows_match_str_format(sample):
+    line = sample.lines[0]
+    assert str(line) == line.row_format.format(
+        line.from_bus.number, line.to_bus.number,
+        line.parallel_circuit_number, line.op, line.metering_end,
+        line.r_pct, line.x_pct, line.mvar, line.normal_rating,
+        line.emergency_rating, line.power_factor, line.cost, line.date,
+        line.cnd, line.series_number, line.type, line.name,
+        line.env_factor, line.length_km, line.stt)
+
+
+@pytest.mark.parametrize("field, value, error", [
+    ("parallel_circuit_number", 2.5, ValueError),
+    ("name", None, TypeError),
+    ("name", 12, ValueError),
+])
+def test_values_rejected_by_str_format_are_rejected(sample, field, value,
+                                                    error):
+    data = sample
+    line = data.lines[0]
+    setattr(line, field, value)
+    with pytest.raises(error):
+        str(line)
+    with pytest.raises(error):
+        str(data)
+
+
+def test_missing_reference_defaults_only_at_the_first_step(sample):
+    data = sample
+    shunt = npf.LineShunt()
+    assert str(shunt).split(",")[3:5] == ["     0", "     0"]
+    shunt.circuit = npf.Line()
+    with pytest.raises(AttributeError):
+        str(shunt)
+    data.line_shunts.append(shunt)
+    with pytest.raises(AttributeError):
+        str(data)
@@ -0,0 +1,35 @@
+import pytest
+
+import psr.npf as npf
+
+pytest.importorskip("pandas")
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("to_columnar", [False, True])
+def test_round_trip_keeps_fractions(fractional_case, columnar, to_columnar):
+    data = fractional_case(500)
+    if columnar:
+        data.to_columnar()
+    frames = data.to_frames()
+    assert frames["buses"]["cost"].dtype.kind == "f"
+    assert frames["lines"]["length_km"].dtype.kind == "f"
+    loaded = npf.NpFile.from_frames(frames, to_columnar)
+    assert str(loaded) == str(data)
+
+
+@pytest.mark.parametrize("conversion", ["frames", "arrow"])
+def test_round_trip_keeps_the_header(sample, conversion):
+    if conversion == "arrow":
+        pytest.importorskip("pyarrow")
+    sample.revision = 3
+    sample.description = "Caso de referência, 2 áreas"
+    tables = getattr(sample, "to_" + conversion)()
+    loaded = getattr(npf.NpFile, "from_" + conversion)(tables)
+    assert (loaded.revision, loaded.description) == \
+        (sample.revision, sample.description)
+    assert str(loaded) == str(sample)
+
+    part = getattr(sample, "to_" + conversion)(["systems"])
+    loaded = getattr(npf.NpFile, "from_" + conversion)(part)
+    assert loaded.description == sample.description
@@ -0,0 +1,40 @@
+import pytest
+
+import psr.npf as npf
+
+
+def test_failed_section_stays_pending(sample, tmp_path):
+    data = sample
+    missing = data.lines[0].from_bus
+    data.buses.remove(missing)
+    path = str(tmp_path / "case.npf")
+    data.save(path)
+
+    loaded = npf.NpFile.from_file(path, lazy=True)
+    for _ in range(2):
+        with pytest.raises(npf.NpfException):
+            loaded.lines
+    loaded.buses.append(missing)
+    assert len(loaded.lines) == len(data.lines)
+
+
+def test_string_table_lives_as_long_as_the_parse(sample, tmp_path):
+    for bus in sample.buses:
+        bus.name = "Shared"
+    path = str(tmp_path / "case.npf")
+    sample.save(path)
+    loaded = npf.NpFile.from_file(path)
+    assert loaded.buses[0].name is loaded.buses[-1].name
+    assert loaded.buses[0].date is loaded.lines[0].date
+    name = loaded.buses[0].name
+    assert not any(isinstance(value, dict) and name in value
+                   for value in vars(loaded).values())
+
+    loaded = npf.NpFile.from_file(path, lazy=True)
+    buses = loaded.buses
+    assert buses[0].name is buses[-1].name
+    assert buses[0].name in loaded._lazy._strings
+    assert loaded.lines[0].date is buses[0].date
+    for collection in npf.NpFile.COLLECTIONS:
+        getattr(loaded, collection)
+    assert loaded._lazy._strings == {}
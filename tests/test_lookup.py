@@ -0,0 +1,81 @@
+import pytest
+
+import psr.npf as npf
+
+
+def _line(data, from_bus, to_bus, ncir):
+    line = npf.Line()
+    line.from_bus = data.find_bus(from_bus)
+    line.to_bus = data.find_bus(to_bus)
+    line.parallel_circuit_number = ncir
+    return line
+
+
+def test_lookups_match_a_linear_scan(sample):
+    for bus in sample.buses:
+        assert sample.find_bus(bus.number) is bus
+    for bus in sample.middlepoint_buses:
+        assert sample.find_bus(bus.number) is bus
+    for line in sample.lines:
+        assert sample.find_line(line.from_bus.number, line.to_bus.number,
+                                line.parallel_circuit_number) is line
+    for transformer in sample.transformers:
+        assert sample.find_transformer_by_name(transformer.name.strip()) \
+            is transformer
+
+
+def test_lookup_after_append(sample):
+    assert sample.find_line(1, 2, 9) is None
+    line = _line(sample, 1, 2, 9)
+    sample.lines.append(line)
+    assert sample.find_line(1, 2, 9) is line
+    bus = npf.Bus()
+    bus.number = 900
+    sample.buses.append(bus)
+    assert sample.find_bus(900) is bus
+
+
+def test_lookup_after_remove(sample):
+    line = sample.lines[3]
+    key = (line.from_bus.number, line.to_bus.number,
+           line.parallel_circuit_number)
+    assert sample.find_line(*key) is line
+    sample.lines.remove(line)
+    assert sample.find_line(*key) is None
+    bus = sample.buses.pop()
+    with pytest.raises(npf.NpfException):
+        sample.find_bus(bus.number)
+
+
+def test_lookup_after_renumbering_in_place(sample):
+    line = sample.lines[3]
+    assert sample.find_line(1, 2, 9) is None
+    line.parallel_circuit_number = 9
+    line.from_bus = sample.find_bus(1)
+    line.to_bus = sample.find_bus(2)
+    assert sample.find_line(1, 2, 9) is line
+
+    bus = sample.find_bus(7)
+    bus.number = 907
+    assert sample.find_bus(907) is bus
+    lines = [element for element in sample.lines
+             if element.from_bus is bus]
+    assert len(lines) > 0
+    assert sample.find_line(907, lines[0].to_bus.number,
+                            lines[0].parallel_circuit_number) is lines[0]
+
+    transformer = sample.transformers[0]
+    transformer.name = "Renamed"
+    assert sample.find_transformer_by_name("Renamed") is transformer
+
+
+def test_misses_do_not_rebuild_the_index(sample, monkeypatch):
+    assert sample.find_line(1, 2, 9) is None
+    rebuilds = []
+    rebuild = npf.rev1._Index._rebuild
+    monkeypatch.setattr(npf.rev1._Index, "_rebuild",
+                        lambda index, elements:
+                        rebuilds.append(None) or rebuild(index, elements))
+    for ncir in range(10, 20):
+        assert sample.find_line(1, 2, ncir) is None
+    assert rebuilds == []
@@ -0,0 +1,24 @@
+import os
+
+from psr.npf import __main__ as cli
+
+
+def _job(file_path, crash):
+    if crash:
+        os._exit(1)
+    return {"path": file_path, "ok": True, "seconds": 0.0, "records": 1,
+            "bytes": 0}
+
+
+def test_dead_worker_fails_only_its_job():
+    jobs = [("{}.npf".format(i), i == 3) for i in range(8)]
+    progress = []
+    results = cli.run(_job, jobs, workers=2,
+                      progress=lambda done, total, result:
+                      progress.append(done))
+    assert [result["path"] for result in results] == \
+        [job[0] for job in jobs]
+    assert [result["ok"] for result in results] == \
+        [not crash for _, crash in jobs]
+    assert "BrokenProcessPool" in results[3]["error"]
+    assert progress == list(range(1, 9))
@@ -0,0 +1,162 @@
+import cmath
+import math
+
+import pytest
+
+import psr.npf as npf
+
+
+numpy = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+
+def _network(bus_count):
+    data = npf.NpFile()
+    for number in range(1, bus_count + 1):
+        bus = npf.Bus()
+        bus.number = number
+        data.buses.append(bus)
+    return data
+
+
+def _branch(data, kind, from_bus, to_bus, ncir=1):
+    branch = kind()
+    branch.from_bus = data.find_bus(from_bus)
+    branch.to_bus = data.find_bus(to_bus)
+    branch.parallel_circuit_number = ncir
+    branch.x_pct = 10.0
+    return branch
+
+
+def _dc_link(data, ac_from, ac_to):
+    """Two converters and a DC line joining AC buses ac_from and ac_to."""
+    dcbuses = []
+    for _ in range(4):
+        dcbus = npf.DcBus()
+        dcbus.number = 100 + len(data.dcbuses)
+        data.dcbuses.append(dcbus)
+        dcbuses.append(dcbus)
+    line = npf.DcLine()
+    line.from_bus, line.to_bus = dcbuses[0], dcbuses[2]
+    data.dclines.append(line)
+    for ac_bus, dc_bus, neutral_bus in ((ac_from, dcbuses[0], dcbuses[1]),
+                                        (ac_to, dcbuses[2], dcbuses[3])):
+        converter = npf.AcDcConverterLcc()
+        converter.ac_bus = data.find_bus(ac_bus)
+        converter.dc_bus = dc_bus
+        converter.neutral_bus = neutral_bus
+        data.lcc_converters.append(converter)
+    return line
+
+
+def test_islands_follow_branches_in_service():
+    data = _network(6)
+    data.lines.append(_branch(data, npf.Line, 1, 2))
+    transformer = _branch(data, npf.Transformer, 2, 3)
+    data.transformers.append(transformer)
+    data.lines.append(_branch(data, npf.Line, 4, 5))
+    off = _branch(data, npf.Line, 3, 4)
+    off.stt = npf.STATUS_OFF
+    data.lines.append(off)
+    assert data.islands() == {1: 0, 2: 0, 3: 0, 4: 1, 5: 1, 6: 2}
+
+    transformer.stt = npf.STATUS_OFF
+    off.stt = npf.STATUS_ON
+    assert data.islands() == {1: 0, 2: 0, 3: 1, 4: 1, 5: 1, 6: 2}
+
+
+def test_islands_with_open_breakers_and_switches():
+    data = _network(4)
+    breaker = _branch(data, npf.Line, 1, 2)
+    breaker.type = npf.Line.LTYPE_BREAKER
+    switch = _branch(data, npf.Line, 2, 3)
+    switch.type = npf.Line.LTYPE_SWITCH
+    jumper = _branch(data, npf.Line, 3, 4)
+    jumper.type = npf.Line.LTYPE_JUMPER
+    data.lines.extend([breaker, switch, jumper])
+    assert set(data.islands().values()) == {0}
+    assert data.islands(open_breakers=True) == {1: 0, 2: 1, 3: 1, 4: 1}
+    assert data.islands(open_switches=True) == {1: 0, 2: 0, 3: 1, 4: 1}
+    assert data.islands(open_breakers=True, open_switches=True) == \
+        {1: 0, 2: 1, 3: 2, 4: 2}
+
+
+def test_dc_links_join_islands():
+    data = _network(4)
+    data.lines.append(_branch(data, npf.Line, 1, 2))
+    data.lines.append(_branch(data, npf.Line, 3, 4))
+    assert data.islands() == {1: 0, 2: 0, 3: 1, 4: 1}
+    line = _dc_link(data, 2, 4)
+    assert data.islands() == {1: 0, 2: 0, 3: 0, 4: 0}
+    line.stt = npf.STATUS_OFF
+    assert data.islands() == {1: 0, 2: 0, 3: 1, 4: 1}
+    line.stt = npf.STATUS_ON
+    data.lcc_converters[1].stt = npf.STATUS_OFF
+    assert data.islands() == {1: 0, 2: 0, 3: 1, 4: 1}
+
+
+def test_islands_of_the_sample(sample):
+    islands = sample.islands()
+    assert set(islands) == set(
+        bus.number
+        for bus in list(sample.buses) + list(sample.middlepoint_buses))
+    for line in sample.lines:
+        assert islands[line.from_bus.number] == islands[line.to_bus.number]
+    labels = [islands[bus.number] for bus in sample.buses]
+    assert labels[0] == 0
+    assert sorted(set(labels)) == list(range(max(labels) + 1))
+
+
+def _ybus_case():
+    data = _network(4)
+    first = _branch(data, npf.Line, 1, 2, 1)
+    first.r_pct, first.x_pct, first.mvar = 3.0, 4.0, 20.0
+    second = _branch(data, npf.Line, 1, 2, 2)
+    second.x_pct = 20.0
+    off = _branch(data, npf.Line, 3, 4)
+    off.stt = npf.STATUS_OFF
+    data.lines.extend([first, second, off])
+    transformer = _branch(data, npf.Transformer, 2, 3)
+    transformer.tap, transformer.phase = 1.1, 30.0
+    data.transformers.append(transformer)
+    for line, mvar in ((second, -10.0), (off, -10.0)):
+        shunt = npf.LineShunt()
+        shunt.circuit = line
+        shunt.terminal = npf.LineShunt.TERMINAL_TO
+        shunt.mvar = mvar
+        data.line_shunts.append(shunt)
+    # The sign of mvar, not the type, tells capacitors from reactors.
+    for bus, mvar, units_on, kind in ((4, 25.0, 2, npf.BusShunt.REACTOR),
+                                      (3, -15.0, 1, npf.BusShunt.REACTOR)):
+        shunt = npf.BusShunt()
+        shunt.bus = data.find_bus(bus)
+        shunt.mvar, shunt.units, shunt.units_on = mvar, 2, units_on
+        shunt.type = kind
+        data.bus_shunts.append(shunt)
+    return data
+
+
+def test_ybus_by_hand():
+    matrix, rows = _ybus_case().ybus(100.0)
+    assert rows == {1: 0, 2: 1, 3: 2, 4: 3}
+    # Lines 1-2: 1 / (0.03 + 0.04j) = 12 - 16j and 1 / 0.2j = -5j, with
+    # 0.2 pu of charging split between the ends of the first one.
+    # Transformer 2-3: -10j with the tap 1.1 at 30 degrees at bus 2.
+    # Line 3-4 and its shunt are out of service.
+    tap = cmath.rect(1.1, math.radians(30.0))
+    expected = [
+        [12 - 20.9j, -12 + 21j, 0, 0],
+        [-12 + 21j, 12 - 20.9j - 0.1j - 10j / 1.21, 10j / tap.conjugate(),
+         0],
+        [0, 10j / tap, -10j - 0.15j, 0],
+        [0, 0, 0, 0.5j]]
+    assert matrix.shape == (4, 4)
+    assert numpy.allclose(matrix.toarray(), expected, rtol=0, atol=1e-12)
+
+
+def test_bus_shunt_type_is_not_read():
+    data = _ybus_case()
+    matrix = data.ybus()[0]
+    for shunt in data.bus_shunts:
+        shunt.type = npf.BusShunt.CAPACITOR
+    assert (data.ybus()[0] != matrix).nnz == 0
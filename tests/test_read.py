@@ -0,0 +1,99 @@
+import pytest
+
+import psr.npf as npf
+
+
+def _text(file_path):
+    with open(file_path) as data_file:
+        return data_file.read()
+
+
+def test_read_and_write_back_unchanged(sample_path):
+    assert str(npf.NpFile.from_file(sample_path)) == _text(sample_path)
+
+
+def test_quoted_fields_keep_their_commas(sample):
+    assert sample.find_bus(6).name.strip() == "B6, north"
+
+
+def test_comments_and_blank_lines_in_sections_are_skipped(sample_path,
+                                                          tmp_path):
+    text = _text(sample_path)
+    lines = text.split("\n")
+    position = lines.index("BUS") + 3
+    lines[position:position] = ["# a comment", "", "   "]
+    file_path = str(tmp_path / "commented.npf")
+    with open(file_path, "w") as data_file:
+        data_file.write("\n".join(lines))
+    assert str(npf.NpFile.from_file(file_path)) == text
+
+
+def _sections_reordered(sample_path, tmp_path):
+    """The sample file with its BUS section moved to the end."""
+    text = _text(sample_path)
+    start = text.index("\nBUS\n")
+    stop = text.index("\nEND\n", start) + len("\nEND\n")
+    file_path = str(tmp_path / "reordered.npf")
+    with open(file_path, "w") as data_file:
+        data_file.write(text[:start] + text[stop:] + text[start:stop])
+    return file_path
+
+
+def test_deferred_references_to_later_sections(sample_path, tmp_path):
+    file_path = _sections_reordered(sample_path, tmp_path)
+    with pytest.raises(npf.NpfException):
+        npf.NpFile.from_file(file_path)
+    data = npf.NpFile.from_file(file_path, deferred=True)
+    assert str(data) == _text(sample_path)
+    for line in data.lines:
+        assert line.from_bus is data.find_bus(line.from_bus.number)
+
+
+def test_deferred_missing_reference_is_reported(sample_path, tmp_path):
+    text = _text(sample_path)
+    start = text.index("\nBUS\n")
+    start = text.index("\n", start + len("\nBUS\n") + 1) + 1
+    stop = text.index("\n", start) + 1
+    file_path = str(tmp_path / "missing.npf")
+    with open(file_path, "w") as data_file:
+        data_file.write(text[:start] + text[stop:])
+    with pytest.raises(npf.NpfException):
+        npf.NpFile.from_file(file_path, deferred=True)
+
+
+def test_parallel_parse_of_chunked_sections(sample_path, monkeypatch):
+    monkeypatch.setattr(npf.rev1, "_PARALLEL_CHUNK_ROWS", 7)
+    data = npf.NpFile.from_file(sample_path, workers=2)
+    assert str(data) == _text(sample_path)
+    for demand in data.demands:
+        assert demand.bus is data.find_bus(demand.bus.number)
+
+
+def _record_rows(text, headers=None):
+    """Record lines of the sections of an NPF text, in order."""
+    rows = []
+    header = None
+    for line in text.split("\n"):
+        if header is None:
+            if line in npf.rev1._SECTION_TYPES:
+                header = line
+        elif line == "END":
+            header = None
+        elif not line.startswith("#") and \
+                (headers is None or header in headers):
+            rows.append(line)
+    return rows
+
+
+def test_iter_records_in_file_order(sample_path):
+    records = list(npf.iter_records(sample_path))
+    assert [str(record) for record in records] == \
+        _record_rows(_text(sample_path))
+
+
+def test_iter_records_of_some_sections(sample_path):
+    records = list(npf.iter_records(sample_path, ("LINE", "DEMAND")))
+    assert [str(record) for record in records] == \
+        _record_rows(_text(sample_path), ("LINE", "DEMAND"))
+    with pytest.raises(npf.NpfException):
+        next(npf.iter_records(sample_path, ("NOT_A_SECTION",)))
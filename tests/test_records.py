@@ -0,0 +1,63 @@
+import tracemalloc
+import warnings
+
+import pytest
+
+import psr.npf as npf
+from psr.npf.rev1 import RecordType
+
+
+def _record_classes(klass=RecordType):
+    for subclass in klass.__subclasses__():
+        yield subclass
+        for descendant in _record_classes(subclass):
+            yield descendant
+
+
+class _DictLine(object):
+    """Line fields held in an instance dictionary, as before __slots__."""
+    def __init__(self):
+        line = npf.Line()
+        for name in npf.Line.field_names():
+            setattr(self, name, getattr(line, name))
+
+
+def _allocated(factory, count):
+    tracemalloc.start()
+    try:
+        records = [factory() for _ in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(records) == count
+    return size
+
+
+def test_records_have_no_instance_dictionary():
+    for klass in _record_classes():
+        assert not hasattr(klass(), "__dict__"), klass.__name__
+
+
+def test_slots_use_less_memory_than_instance_dictionaries():
+    count = 20000
+    slotted = _allocated(npf.Line, count)
+    with_dict = _allocated(_DictLine, count)
+    assert slotted < with_dict
+
+
+@pytest.mark.parametrize("klass, old_name, name", [
+    (npf.Line, "mvar_pct", "mvar"),
+    (npf.ControlledSeriesCapacitor, "cost_str", "cost"),
+    (npf.AcDcConverterVsc, "pwf", "power_factor"),
+])
+def test_former_field_names_are_deprecated_aliases(klass, old_name, name):
+    record = klass()
+    with pytest.warns(DeprecationWarning):
+        setattr(record, old_name, 12.5)
+    assert getattr(record, name) == 12.5
+    with pytest.warns(DeprecationWarning):
+        assert getattr(record, old_name) == 12.5
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert old_name not in klass.field_names()
+        assert getattr(record, name) == 12.5
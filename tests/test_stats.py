@@ -0,0 +1,37 @@
+import os
+
+import psr.npf as npf
+
+
+def test_section_sizes_are_encoded_bytes(case, tmp_path):
+    data = case(30)
+    data.buses[0].name = "São João"
+    data.description = "Caso de referência"
+    path = str(tmp_path / "case.npf")
+    stats = npf.NpfStats()
+    data.save(path, stats)
+    sections = stats.as_dict()["sections"]["write"]
+    header = "NPF_REVISION\n{}\nDESCRIPTION\n{}".format(data.revision,
+                                                       data.description)
+    with open(path) as npf_file:
+        encoding = npf_file.encoding
+    assert sum(section["bytes"] for section in sections.values()) + \
+        len(header.encode(encoding)) == os.path.getsize(path)
+
+    stats.clear()
+    npf.NpFile.from_file(path, stats=stats)
+    read = stats.as_dict()["sections"]["read"]
+    # From the end of the header line to the end of the END line.
+    with open(path, "rb") as npf_file:
+        contents = npf_file.read()
+    start = contents.index(b"\nBUS\n") + len(b"\nBUS\n")
+    end = contents.index(b"END\n", start) + len(b"END\n")
+    assert read["BUS"]["bytes"] == end - start
+
+
+def test_timed_lookups(sample):
+    data = sample
+    stats = npf.NpfStats()
+    bus = stats.timed(data).find_bus(data.buses[5].number)
+    assert bus is data.buses[5]
+    assert stats.lookups["find_bus"][0] == 1
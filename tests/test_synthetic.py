@@ -0,0 +1,67 @@
+import pytest
+
+import psr.npf as npf
+
+pytest.importorskip("numpy")
+
+
+def _connected(data):
+    neighbors = {bus.number: [] for bus in data.buses}
+    for collection in (data.lines, data.transformers):
+        for branch in collection:
+            neighbors[branch.from_bus.number].append(branch.to_bus.number)
+            neighbors[branch.to_bus.number].append(branch.from_bus.number)
+    reached = {data.buses[0].number}
+    pending = list(reached)
+    while pending:
+        for number in neighbors[pending.pop()]:
+            if number not in reached:
+                reached.add(number)
+                pending.append(number)
+    return len(reached) == len(neighbors)
+
+
+def test_same_arguments_build_the_same_case(case):
+    assert str(case(300, seed=4)) == str(case(300, seed=4))
+    assert str(case(300, seed=4)) != str(case(300, seed=5))
+
+
+@pytest.mark.parametrize("buses", [1, 2, 40, 3000])
+def test_cases_are_connected(case, buses):
+    data = case(buses, areas=min(buses, 3))
+    assert len(data.buses) == buses
+    assert _connected(data)
+
+
+def test_requested_counts(case):
+    data = case(1000, areas=4, regions=2, lines=1500, transformers=200,
+                three_winding_transformers=3, dclinks=2, demands=70,
+                generators=30)
+    assert (len(data.areas), len(data.regions)) == (4, 2)
+    assert (len(data.lines), len(data.transformers)) == (1500, 200)
+    assert len(data.three_winding_transformers) == 3
+    assert len(data.equivalent_transformers) == 9
+    assert len(data.middlepoint_buses) == 3
+    assert len(data.dclinks) == 2
+    assert len(data.dcbuses) == 8
+    assert (len(data.demands), len(data.generators)) == (70, 30)
+    dispatch = sum(generator.pgen for generator in data.generators)
+    demand = sum(demand.p_mw for demand in data.demands)
+    assert dispatch == pytest.approx(1.02 * demand)
+
+
+def test_parallel_circuits_are_numbered_per_bus_pair(case):
+    data = case(200, lines=600)
+    keys = [(branch.from_bus.number, branch.to_bus.number,
+             branch.parallel_circuit_number)
+            for collection in (data.lines, data.transformers)
+            for branch in collection]
+    assert len(set(keys)) == len(keys)
+    for line in data.lines:
+        assert data.find_line(line.from_bus.number, line.to_bus.number,
+                              line.parallel_circuit_number) is line
+
+
+def test_at_least_one_bus():
+    with pytest.raises(npf.NpfException):
+        npf.generate_case(0, 0)
@@ -0,0 +1,51 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+import pytest
+
+import psr.npf as npf
+
+
+class _RecordingStream(io.StringIO):
+    def __init__(self):
+        super(_RecordingStream, self).__init__()
+        self.sizes = []
+
+    def write(self, text):
+        self.sizes.append(len(text))
+        return super(_RecordingStream, self).write(text)
+
+
+def test_save_writes_the_text_of_the_file(sample, tmp_path):
+    file_path = str(tmp_path / "saved.npf")
+    sample.save(file_path)
+    with open(file_path) as data_file:
+        assert data_file.read() == str(sample)
+
+
+def test_sections_are_written_in_chunks(sample, monkeypatch):
+    text = str(sample)
+    monkeypatch.setattr(npf.rev1, "_WRITE_CHUNK_SIZE", 4)
+    stream = _RecordingStream()
+    sample.write_to(stream)
+    assert stream.getvalue() == text
+    assert len(stream.sizes) > len(sample.lines) // 4
+    assert max(stream.sizes) < len(text) // 10
+
+
+@pytest.mark.parametrize("extension, module", [
+    (".gz", gzip), (".bz2", bz2), (".xz", lzma)])
+def test_compressed_round_trip(sample, tmp_path, extension, module):
+    text = str(sample)
+    file_path = str(tmp_path / ("case.npf" + extension))
+    sample.save(file_path)
+    with module.open(file_path, "rb") as data_file:
+        assert data_file.read() == text.encode()
+    assert str(npf.NpFile.from_file(file_path)) == text
+    # Compressed files are recognized by their contents when read.
+    renamed = str(tmp_path / "case.dat")
+    os.rename(file_path, renamed)
+    assert str(npf.NpFile.from_file(renamed, lazy=True)) == text